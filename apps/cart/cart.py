@@ -3,134 +3,143 @@
 """
 from decimal import Decimal
 from django.conf import settings
+from apps.core.session_codec import pack_cart, unpack_cart
 from apps.products.models import Product
+from apps.products.pricing import get_price_tier
 
 
 class Cart:
-    """Кошик покупок"""
-    
+    """
+    Кошик покупок
+
+    У сесії зберігаються лише пари (id товару, кількість) - див. apps.core.session_codec.
+    Ціни обчислюються при читанні з актуальних даних товару.
+    """
+
     def __init__(self, request):
         """Ініціалізація кошика"""
+        self.request = request
         self.session = request.session
-        cart = self.session.get(settings.CART_SESSION_ID)
-        if not cart:
-            cart = self.session[settings.CART_SESSION_ID] = {}
-        
-        # Конвертуємо всі ціни у float (для сумісності зі старими сесіями)
-        for item in cart.values():
-            if 'price' in item and not isinstance(item['price'], float):
-                item['price'] = float(item['price'])
-        
-        self.cart = cart
+        # Порожній кошик не записуємо в сесію - інакше кожен відвідувач (і бот)
+        # отримує рядок у таблиці сесій
+        self.cart = unpack_cart(self.session.get(settings.CART_SESSION_ID))
+
         # Адміністратори НЕ є оптовими клієнтами
         if request.user.is_authenticated and not request.user.is_staff and not request.user.is_superuser:
             self.user = request.user
         else:
             self.user = None
-    
+        # Рівень цін визначається один раз на запит
+        self.price_tier = get_price_tier(request)
+
+    def _get_products(self):
+        """
+        Товари кошика одним запитом. Результат кешується на request,
+        тож кілька екземплярів Cart (view + context processors) не дублюють запит.
+        """
+        key = frozenset(self.cart)
+        cached = getattr(self.request, '_cart_products', None)
+        if cached is None or cached[0] != key:
+            products = Product.objects.filter(id__in=key).prefetch_related('images')
+            cached = (key, {p.id: p for p in products})
+            self.request._cart_products = cached
+        return cached[1]
+
+    def _invalidate_products(self):
+        self.request._cart_products = None
+
+    def get_item_price(self, product, quantity):
+        """Поточна ціна одиниці товару для цього користувача і кількості"""
+        return Decimal(str(product.get_price_for_tier(self.price_tier, quantity)))
+
+    def get_quantity(self, product_id):
+        """Кількість товару в кошику"""
+        return self.cart.get(int(product_id), 0)
+
     def add(self, product, quantity=1, override_quantity=False):
         """Додавання товару в кошик"""
-        product_id = str(product.id)
-        if product_id not in self.cart:
-            self.cart[product_id] = {
-                'quantity': 0,
-                'price': float(product.get_price_for_user(self.user))
-            }
         if override_quantity:
-            self.cart[product_id]['quantity'] = quantity
+            self.cart[product.id] = quantity
         else:
-            self.cart[product_id]['quantity'] += quantity
-        
-        # Оновлюємо ціну (може змінитися залежно від кількості)
-        self.cart[product_id]['price'] = float(
-            product.get_price_for_user(self.user, self.cart[product_id]['quantity'])
-        )
+            self.cart[product.id] = self.cart.get(product.id, 0) + quantity
+        if self.cart[product.id] <= 0:
+            del self.cart[product.id]
+        self._invalidate_products()
         self.save()
-    
+
     def save(self):
-        """Зберігання кошика в сесії"""
-        # Гарантуємо що всі ціни float
-        for item in self.cart.values():
-            if 'price' in item:
-                item['price'] = float(item['price'])
+        """Зберігання кошика в сесії (компактний формат)"""
+        if self.cart:
+            self.session[settings.CART_SESSION_ID] = pack_cart(self.cart)
+        else:
+            self.session.pop(settings.CART_SESSION_ID, None)
         self.session.modified = True
-    
+
     def remove(self, product):
         """Видалення товару з кошика"""
-        product_id = str(product.id)
-        if product_id in self.cart:
-            del self.cart[product_id]
+        if product.id in self.cart:
+            del self.cart[product.id]
+            self._invalidate_products()
             self.save()
-    
+
     def __iter__(self):
         """Ітерація по товарах в кошику"""
-        product_ids = self.cart.keys()
-        products = Product.objects.filter(id__in=product_ids)
-        products_dict = {str(p.id): p for p in products}
-        
-        for product_id, item in self.cart.items():
-            if product_id in products_dict:
-                # Створюємо новий словник для кожного item
+        products = self._get_products()
+
+        for product_id, quantity in self.cart.items():
+            product = products.get(product_id)
+            if product is not None:
+                price = self.get_item_price(product, quantity)
                 yield {
-                    'product': products_dict[product_id],
-                    'quantity': item['quantity'],
-                    'price': Decimal(str(item['price'])),
-                    'total_price': Decimal(str(item['price'])) * item['quantity']
+                    'product': product,
+                    'quantity': quantity,
+                    'price': price,
+                    'total_price': price * quantity
                 }
-    
+
     def __len__(self):
         """Кількість товарів в кошику"""
-        return sum(item['quantity'] for item in self.cart.values())
-    
+        return sum(self.cart.values())
+
     def get_total_price(self):
         """Загальна вартість кошика"""
-        return sum(
-            Decimal(str(item['price'])) * item['quantity'] 
-            for item in self.cart.values()
-        )
-    
+        if not self.cart:
+            return Decimal('0')
+        return sum((item['total_price'] for item in self), Decimal('0'))
+
     def get_original_total_price(self):
         """Повна вартість без знижок (завжди retail_price)"""
-        product_ids = self.cart.keys()
-        products = Product.objects.filter(id__in=product_ids)
-        products_dict = {str(p.id): p for p in products}
-        
+        products = self._get_products()
+
         total = Decimal('0')
-        for product_id, item in self.cart.items():
-            if product_id in products_dict:
-                product = products_dict[product_id]
-                original_price = product.retail_price
-                total += Decimal(str(original_price)) * item['quantity']
+        for product_id, quantity in self.cart.items():
+            product = products.get(product_id)
+            if product is not None:
+                total += Decimal(str(product.retail_price)) * quantity
         return total
-    
+
     def get_savings_amount(self):
         """Сума економії (різниця між оригінальною ціною та поточною)"""
         return self.get_original_total_price() - self.get_total_price()
-    
+
     def clear(self):
         """Очищення кошика"""
-        del self.session[settings.CART_SESSION_ID]
+        self.cart = {}
+        self._invalidate_products()
         self.save()
-    
+
     def get_item_count(self):
         """Кількість позицій в кошику"""
         return len(self.cart)
-    
+
     def update_quantities(self, product_quantities):
         """Оновлення кількості товарів"""
-        product_ids = [pid for pid in product_quantities.keys() if pid in self.cart]
-        products = Product.objects.filter(id__in=product_ids)
-        products_dict = {str(p.id): p for p in products}
-        
         for product_id, quantity in product_quantities.items():
+            product_id = int(product_id)
             if product_id in self.cart:
                 if quantity <= 0:
                     del self.cart[product_id]
                 else:
-                    self.cart[product_id]['quantity'] = quantity
-                    if product_id in products_dict:
-                        product = products_dict[product_id]
-                        self.cart[product_id]['price'] = float(
-                            product.get_price_for_user(self.user, quantity)
-                        )
+                    self.cart[product_id] = quantity
+        self._invalidate_products()
         self.save()
@@ -53,12 +53,8 @@ def cart_add(request, product_id):
     cart.add(product=product, quantity=quantity, override_quantity=override)
     
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-        product_id_str = str(product_id)
-        cart_item = cart.cart.get(product_id_str, {})
-        item_quantity = cart_item.get('quantity', 0)
-        item_price = cart_item.get('price', 0)
-        if not isinstance(item_price, (int, float)):
-            item_price = float(item_price) if item_price else 0.0
+        item_quantity = cart.get_quantity(product_id)
+        item_price = float(cart.get_item_price(product, item_quantity)) if item_quantity else 0.0
         
         return JsonResponse({
             'success': True,
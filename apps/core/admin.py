@@ -2,11 +2,15 @@
 Адміністративна панель для core додатку - банери та статті
 """
 from django.contrib import admin
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
 from django.utils.html import format_html, strip_tags
 from django.utils.safestring import mark_safe
 from django.db import models
 from ckeditor.widgets import CKEditorWidget
-from .models import Banner
+from django.utils import timezone
+from .models import Banner, Job, OutboxEmail, ProfileCapture
 from .admin_utils import get_image_preview, get_yes_no_icon, truncate_text, AdminMediaMixin
 from apps.blog.models import Article
 
@@ -213,6 +217,121 @@ class ArticleAdmin(AdminMediaMixin, admin.ModelAdmin):
     duplicate_articles.short_description = "Дублювати вибрані статті"
 
 
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    """Черга транзакційних листів (лише перегляд і повтор)"""
+    
+    list_display = ['to', 'kind', 'subject', 'status', 'attempts', 'created_at', 'available_at', 'sent_at']
+    list_filter = ['status', 'kind']
+    search_fields = ['to', 'subject']
+    date_hierarchy = 'created_at'
+    readonly_fields = [f.name for f in OutboxEmail._meta.fields]
+    actions = ['retry_now']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def retry_now(self, request, queryset):
+        """Поставити листи з помилкою/затримкою на негайну відправку"""
+        updated = queryset.exclude(status='sent').update(status='pending', available_at=timezone.now(), claimed_by='')
+        self.message_user(request, f"Повернуто в чергу {updated} листів")
+    retry_now.short_description = "🔁 Відправити повторно зараз"
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Черга фонових завдань: статус, час очікування та виконання"""
+    
+    list_display = ['task', 'status', 'priority', 'attempts', 'run_at', 'get_wait', 'get_duration', 'finished_at']
+    list_filter = ['status', 'task']
+    search_fields = ['task', 'dedupe_key']
+    date_hierarchy = 'created_at'
+    readonly_fields = [f.name for f in Job._meta.fields]
+    actions = ['retry_now']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def get_wait(self, obj):
+        wait = obj.wait_seconds
+        return '—' if wait is None else f'{wait:.1f} с'
+    get_wait.short_description = 'Очікування'
+    
+    def get_duration(self, obj):
+        return '—' if obj.duration_ms is None else f'{obj.duration_ms / 1000:.2f} с'
+    get_duration.short_description = 'Виконання'
+    
+    def retry_now(self, request, queryset):
+        """Повторити невдалі завдання"""
+        updated = queryset.filter(status='failed').update(
+            status='queued', run_at=timezone.now(), attempts=0, locked_by=''
+        )
+        self.message_user(request, f"Повернуто в чергу {updated} завдань")
+    retry_now.short_description = "🔁 Повторити невдалі завдання"
+
+
+@admin.register(ProfileCapture)
+class ProfileCaptureAdmin(admin.ModelAdmin):
+    """Профілі запитів: top-N функцій (cProfile) або flame graph (семплер)"""
+    
+    list_display = ['view_name', 'method', 'status_code', 'get_duration', 'mode', 'trigger', 'user', 'created_at']
+    list_filter = ['mode', 'trigger', 'view_name']
+    search_fields = ['view_name', 'path']
+    date_hierarchy = 'created_at'
+    readonly_fields = [
+        'view_name', 'path', 'method', 'mode', 'trigger', 'user', 'status_code', 'duration_ms',
+        'created_at', 'get_download', 'get_flame_graph', 'get_report',
+    ]
+    exclude = ['report', 'stacks', 'data']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def get_urls(self):
+        custom_urls = [
+            path('<int:capture_id>/download/', self.admin_site.admin_view(self.download_view), name='core_profilecapture_download'),
+        ]
+        return custom_urls + super().get_urls()
+    
+    def download_view(self, request, capture_id):
+        """Сирі дані pstats - для snakeviz / python -m pstats"""
+        capture = get_object_or_404(ProfileCapture, pk=capture_id, data__isnull=False)
+        response = HttpResponse(bytes(capture.data), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="profile-{capture.pk}.prof"'
+        return response
+    
+    def get_duration(self, obj):
+        return f'{obj.duration_ms} мс'
+    get_duration.short_description = 'Тривалість'
+    
+    def get_download(self, obj):
+        if obj.data is None:
+            return '—'
+        return format_html('<a href="{}">⬇️ profile-{}.prof</a>', reverse('admin:core_profilecapture_download', args=[obj.pk]), obj.pk)
+    get_download.short_description = 'Файл pstats'
+    
+    def get_flame_graph(self, obj):
+        from .profiling import render_flame_graph
+        
+        return render_flame_graph(obj.stacks) or '—'
+    get_flame_graph.short_description = 'Flame graph'
+    
+    def get_report(self, obj):
+        if not obj.report:
+            return '—'
+        return format_html('<pre style="font-size:11px;max-height:600px;overflow:auto">{}</pre>', obj.report)
+    get_report.short_description = 'Top-N функцій'
+
 # Налаштування відображення моделей в адмінці
 Banner._meta.verbose_name = "Банер"
 Banner._meta.verbose_name_plural = "Банери"
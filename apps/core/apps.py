@@ -5,3 +5,6 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
     verbose_name = 'Основні компоненти'
+
+    def ready(self):
+        from . import checks  # noqa: F401
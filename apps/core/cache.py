@@ -0,0 +1,27 @@
+"""
+Кеш-бекенд з лічильниками влучань/промахів (apps.core.metrics)
+"""
+from django.core.cache.backends.locmem import LocMemCache
+
+from . import metrics
+
+_MISSING = object()
+
+
+class MeteredLocMemCache(LocMemCache):
+    """
+    LocMemCache, що рахує hit/miss у shop_cache_requests_total.
+    get_many та get_or_set базового класу викликають get - теж враховуються.
+    """
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self.metrics_name = params.get('OPTIONS', {}).get('METRICS_NAME', 'default')
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            metrics.CACHE_REQUESTS.inc(cache=self.metrics_name, result='miss')
+            return default
+        metrics.CACHE_REQUESTS.inc(cache=self.metrics_name, result='hit')
+        return value
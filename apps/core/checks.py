@@ -0,0 +1,40 @@
+"""
+Системні перевірки налаштувань core
+"""
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, register
+from django.utils.module_loading import import_string
+
+SESSION_ENGINE = 'apps.core.session_backend'
+
+
+@register(Tags.caches)
+def check_session_cache(app_configs, **kwargs):
+    """
+    Write-through кеш сесій має бути окремим і спільним для всіх процесів:
+    з LocMemCache кожен процес бачить свою копію (застарілі читання, втрачені
+    зміни кошика), а тисячі кошиків витісняють решту записів кешу
+    """
+    if settings.SESSION_ENGINE != SESSION_ENGINE:
+        return []
+
+    alias = settings.SESSION_CACHE_ALIAS
+    if alias == 'default':
+        return [Error(
+            'SESSION_CACHE_ALIAS не може бути "default" - сесії витіснятимуть решту кешу',
+            hint='Додайте окремий alias у CACHES (Redis або DummyCache) і вкажіть його в SESSION_CACHE_ALIAS',
+            id='core.E001',
+        )]
+    if alias not in settings.CACHES:
+        return [Error(
+            f'SESSION_CACHE_ALIAS = "{alias}" відсутній у CACHES',
+            id='core.E002',
+        )]
+    if issubclass(import_string(settings.CACHES[alias]['BACKEND']), LocMemCache):
+        return [Error(
+            f'Кеш сесій "{alias}" живе в пам\'яті процесу - кілька процесів бачитимуть різні сесії',
+            hint='Використайте спільний кеш (RedisCache) або DummyCache (сесії читаються з БД)',
+            id='core.E003',
+        )]
+    return []
@@ -3,6 +3,7 @@
 """
 from apps.products.models import Category
 from apps.cart.cart import Cart
+from apps.products.pricing import TIER_WHOLESALE, get_price_tier
 
 
 def base_context(request):
@@ -15,6 +16,9 @@ def base_context(request):
         'site_phone': '(068) 175-26-54',
         'site_email': 'beauty_shop_monte@ukr.net',
         'site_address': 'вул. Соборна, 126д, м. Монастирище, 19101, Україна',
+        # Рівень цін визначається один раз, а не в кожній картці товару
+        'price_tier': get_price_tier(request),
+        'is_wholesale_tier': get_price_tier(request) == TIER_WHOLESALE,
     }
     
     # Додаємо кошик до контексту
@@ -0,0 +1,246 @@
+"""
+Потокові CSV-експорти для адмінки
+
+Експорт описується підкласом CSVExport (заголовок + rows(queryset)). Рядки
+читаються через iterator(chunk_size) і віддаються StreamingHttpResponse, тож
+пам'ять не росте з розміром вибірки, а перший байт іде клієнту одразу.
+
+Для дуже великих вибірок є фоновий режим: файл пише фоновий потік веб-процесу
+у EXPORTS_ROOT (поза публічним media - експорти містять персональні дані),
+і він з'являється на сторінці завантажень адмінки, коли готовий. Черга
+apps.core.jobs тут не підходить: worker run_jobs має власну файлову систему,
+і файл, записаний ним, веб-процес не побачить.
+"""
+import csv
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.exceptions import PermissionDenied
+from django.db import connections, transaction
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html
+
+logger = logging.getLogger(__name__)
+
+BOM = '\ufeff'  # для коректного відображення кирилиці в Excel
+PART_SUFFIX = '.part'
+SAFE_NAME = re.compile(r'^[\w.-]+\.csv$')
+PART_MAX_AGE = 24 * 60 * 60  # .part, який не дописався (перезапуск процесу), прибирається
+# Початок комірки, який Excel/LibreOffice сприймають як формулу (CSV injection)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def escape_cell(value):
+    """Дані клієнтів (ім'я, адреса, коментар) не мають виконуватись як формула в таблиці"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class _Echo:
+    """Псевдо-буфер для csv.writer: повертає рядок замість запису"""
+
+    def write(self, value):
+        return value
+
+
+class CSVExport:
+    """Базовий опис експорту"""
+
+    name = 'export'
+    header = []
+    chunk_size = 2000
+
+    def prepare(self, queryset):
+        """Оптимізація queryset під експорт (select_related / prefetch)"""
+        return queryset
+
+    def rows(self, queryset):
+        raise NotImplementedError
+
+    def iter_rows(self, queryset):
+        queryset = self.prepare(queryset)
+        return self.rows(queryset.iterator(chunk_size=self.chunk_size))
+
+    def iter_csv(self, queryset):
+        writer = csv.writer(_Echo())
+        yield BOM
+        yield writer.writerow(self.header)
+        for row in self.iter_rows(queryset):
+            yield writer.writerow([escape_cell(value) for value in row])
+
+    def filename(self):
+        return f"{self.name}_{timezone.localtime().strftime('%Y%m%d_%H%M%S')}.csv"
+
+
+def streaming_response(export, queryset):
+    response = StreamingHttpResponse(export.iter_csv(queryset), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{export.filename()}"'
+    return response
+
+
+def get_exports_root():
+    root = Path(getattr(settings, 'EXPORTS_ROOT', Path(settings.BASE_DIR) / 'exports'))
+    root.mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def write_export_file(export, queryset, filename=None):
+    """Пише експорт у файл (спочатку .part, потім атомарне перейменування)"""
+    target = get_exports_root() / (filename or export.filename())
+    partial = target.with_name(target.name + PART_SUFFIX)
+    started = time.monotonic()
+    try:
+        with open(partial, 'w', encoding='utf-8', newline='') as fh:
+            for chunk in export.iter_csv(queryset):
+                fh.write(chunk)
+        os.replace(partial, target)
+    except Exception:
+        logger.exception(f"Помилка фонового експорту {target.name}")
+        partial.unlink(missing_ok=True)
+        raise
+    logger.info(f"Експорт {target.name} готовий за {time.monotonic() - started:.1f} с")
+    return target
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='exports')
+        return _executor
+
+
+def _write_in_background(export, queryset, filename):
+    try:
+        write_export_file(export, queryset, filename)
+    except Exception:
+        pass  # вже залоговано у write_export_file, .part видалено
+    finally:
+        # Фоновий потік не проходить через request_finished - закриваємо з'єднання самі
+        connections.close_all()
+
+
+def start_background_export(export, queryset):
+    """
+    Запускає експорт у фоновому потоці цього процесу після коміту; повертає
+    ім'я майбутнього файлу. Потік отримує сам queryset (умови відбору), тож
+    вибір «усі на всіх сторінках» не перетворюється на список усіх pk.
+    """
+    filename = export.filename()
+    # Порожній .part одразу видно на сторінці експортів як "Готується"
+    partial = get_exports_root() / (filename + PART_SUFFIX)
+    partial.touch()
+    queryset = queryset.all()
+    transaction.on_commit(lambda: _get_executor().submit(_write_in_background, export, queryset, filename))
+    return filename
+
+
+def cleanup_exports():
+    """Видаляє готові файли, старші за EXPORTS_RETENTION_DAYS, і покинуті .part"""
+    max_age = getattr(settings, 'EXPORTS_RETENTION_DAYS', 7) * 86400
+    now = time.time()
+    for file in get_exports_root().glob('*.csv'):
+        if now - file.stat().st_mtime > max_age:
+            file.unlink(missing_ok=True)
+    for file in get_exports_root().glob('*.csv' + PART_SUFFIX):
+        if now - file.stat().st_mtime > PART_MAX_AGE:
+            file.unlink(missing_ok=True)
+
+
+def list_exports(prefix=''):
+    cleanup_exports()
+    root = get_exports_root()
+    files = []
+    for file in sorted(root.iterdir(), key=lambda f: f.stat().st_mtime, reverse=True):
+        if not file.name.startswith(prefix):
+            continue
+        ready = file.suffix == '.csv'
+        if not ready and not file.name.endswith('.csv' + PART_SUFFIX):
+            continue
+        stat = file.stat()
+        files.append({
+            'name': file.name if ready else file.name[:-len(PART_SUFFIX)],
+            'ready': ready,
+            'size_kb': round(stat.st_size / 1024, 1),
+            'modified': timezone.localtime(datetime.fromtimestamp(stat.st_mtime, tz=dt_timezone.utc)),
+        })
+    return files
+
+
+class ExportAdminMixin:
+    """
+    Дії адмінки «Експорт у CSV» (потоковий) та «Експорт у фоні» для export_class.
+    Працює і з вибором «усі на всіх сторінках». Назви дій додаються в actions адмінки:
+    'export_to_csv', 'export_csv_background'.
+    """
+
+    export_class = None
+
+    def export_to_csv(self, request, queryset):
+        return streaming_response(self.export_class(), queryset)
+    export_to_csv.short_description = "📊 Експортувати в CSV"
+
+    def export_csv_background(self, request, queryset):
+        filename = start_background_export(self.export_class(), queryset)
+        opts = self.model._meta
+        url = reverse(f'admin:{opts.app_label}_{opts.model_name}_exports')
+        self.message_user(
+            request,
+            format_html('Експорт {} готується у фоні. Файл з\'явиться на <a href="{}">сторінці експортів</a>.', filename, url),
+            messages.SUCCESS
+        )
+    export_csv_background.short_description = "📁 Експорт у CSV (у фоні, для великих вибірок)"
+
+    def get_urls(self):
+        urls = super().get_urls()
+        opts = self.model._meta
+        prefix = f'{opts.app_label}_{opts.model_name}'
+        return [
+            path('exports/', self.admin_site.admin_view(self.exports_view), name=f'{prefix}_exports'),
+            path('exports/<str:filename>', self.admin_site.admin_view(self.export_download_view), name=f'{prefix}_export_download'),
+        ] + urls
+
+    def _export_prefix(self):
+        return f'{self.export_class.name}_'
+
+    def exports_view(self, request):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        opts = self.model._meta
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Експорти CSV',
+            'opts': opts,
+            'files': list_exports(self._export_prefix()),
+            'download_url_name': f'admin:{opts.app_label}_{opts.model_name}_export_download',
+        }
+        return TemplateResponse(request, 'admin/exports.html', context)
+
+    def export_download_view(self, request, filename):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        # Кожна адмінка віддає лише власні експорти
+        if not SAFE_NAME.match(filename) or not filename.startswith(self._export_prefix()):
+            raise Http404
+        file = get_exports_root() / filename
+        if not file.exists():
+            messages.warning(request, f'Файл {filename} ще готується або вже видалений')
+            opts = self.model._meta
+            return redirect(f'admin:{opts.app_label}_{opts.model_name}_exports')
+        return FileResponse(open(file, 'rb'), as_attachment=True, filename=filename, content_type='text/csv')
@@ -0,0 +1,190 @@
+"""
+Інструментування запитів: кількість і час SQL, дублікати запитів (N+1),
+час рендеру шаблонів, розмір відповіді - по імені view
+
+Вимірюється лише вибірка запитів (INSTRUMENTATION_SAMPLE_RATE); при 0
+middleware одразу віддає запит далі. Перевищення порогів пишеться у лог одним
+JSON-рядком, а агреговані перцентилі (в межах процесу) віддає staff-ендпоінт.
+"""
+import contextvars
+import functools
+import json
+import logging
+import re
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('total_ms', 'db_ms', 'queries', 'render_ms', 'size')
+FINGERPRINT_MAX_LENGTH = 300
+IN_LIST = re.compile(r'IN \((?:%s(?:, )?)+\)')
+PLACEHOLDERS = re.compile(r'(?:%s(?:, )?){2,}')
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+_template_timer_installed = False
+_install_lock = threading.Lock()
+
+
+def fingerprint(sql):
+    """Нормалізований SQL: списки IN (%s, %s, ...) згортаються, щоб N+1 мали один відбиток"""
+    sql = IN_LIST.sub('IN (...)', sql)
+    sql = PLACEHOLDERS.sub('%s, ...', sql)
+    return sql[:FINGERPRINT_MAX_LENGTH]
+
+
+class RequestMetrics:
+    """Лічильники одного запиту; екземпляр - це також execute_wrapper для з'єднань БД"""
+
+    __slots__ = ('queries', 'db_time', 'fingerprints', 'render_time', 'render_depth')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.fingerprints = defaultdict(int)
+        self.render_time = 0.0
+        self.render_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self, threshold):
+        return {sql: count for sql, count in self.fingerprints.items() if count >= threshold}
+
+
+def current_metrics():
+    return _current.get()
+
+
+def activate(metrics):
+    return _current.set(metrics)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+def install_template_timer():
+    """
+    Обгортка Template.render бекенду Django-шаблонів: рахується лише зовнішній
+    рендер (render(), TemplateResponse, render_to_string), вкладені - ні.
+    Без активних метрик - один виклик ContextVar.get().
+    """
+    global _template_timer_installed
+    with _install_lock:
+        if _template_timer_installed:
+            return
+        from django.template.backends.django import Template
+
+        original = Template.render
+
+        @functools.wraps(original)
+        def render(self, context=None, request=None):
+            metrics = _current.get()
+            if metrics is None or metrics.render_depth:
+                return original(self, context, request)
+            metrics.render_depth += 1
+            started = time.perf_counter()
+            try:
+                return original(self, context, request)
+            finally:
+                metrics.render_depth -= 1
+                metrics.render_time += time.perf_counter() - started
+
+        Template.render = render
+        _template_timer_installed = True
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class StatsStore:
+    """Останні N вимірів на view (в пам'яті процесу)"""
+
+    def __init__(self, window=None):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, view_name, sample):
+        window = self.window or getattr(settings, 'INSTRUMENTATION_WINDOW', 500)
+        with self._lock:
+            samples = self._samples.get(view_name)
+            if samples is None:
+                samples = self._samples[view_name] = deque(maxlen=window)
+            samples.append(sample)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._samples.items()}
+        result = {}
+        for name, samples in sorted(snapshot.items()):
+            view = {'count': len(samples)}
+            for metric in METRICS:
+                values = sorted(sample[metric] for sample in samples)
+                view[metric] = {
+                    'p50': percentile(values, 50),
+                    'p95': percentile(values, 95),
+                    'p99': percentile(values, 99),
+                    'max': values[-1],
+                }
+            result[name] = view
+        return result
+
+
+store = StatsStore()
+
+
+def record(request, response, metrics, total_time):
+    """Зберігає вимір і пише структурований лог, якщо перевищено пороги"""
+    match = getattr(request, 'resolver_match', None)
+    view_name = match.view_name if match else 'unresolved'
+    sample = {
+        'total_ms': round(total_time * 1000, 1),
+        'db_ms': round(metrics.db_time * 1000, 1),
+        'queries': metrics.queries,
+        'render_ms': round(metrics.render_time * 1000, 1),
+        'size': 0 if getattr(response, 'streaming', False) else len(response.content),
+    }
+    store.add(view_name, sample)
+
+    problems = []
+    if sample['total_ms'] >= getattr(settings, 'INSTRUMENTATION_SLOW_MS', 800):
+        problems.append('slow')
+    if sample['queries'] >= getattr(settings, 'INSTRUMENTATION_MAX_QUERIES', 40):
+        problems.append('queries')
+    duplicates = metrics.duplicates(getattr(settings, 'INSTRUMENTATION_DUPLICATE_QUERIES', 5))
+    if duplicates:
+        problems.append('duplicates')
+
+    if problems:
+        logger.warning('request_metrics ' + json.dumps({
+            'view': view_name,
+            'path': request.path,
+            'method': request.method,
+            'status': response.status_code,
+            'problems': problems,
+            **sample,
+            'duplicates': [
+                {'sql': sql, 'count': count}
+                for sql, count in sorted(duplicates.items(), key=lambda item: -item[1])[:5]
+            ],
+        }, ensure_ascii=False))
+    return sample
@@ -0,0 +1,237 @@
+"""
+Черга фонових завдань у БД
+
+Завдання - функція, зареєстрована декоратором @task('app.name') у модулі
+tasks.py будь-якого застосунку. enqueue() пише рядок Job у поточній транзакції
+і повертається одразу. Виконують завдання:
+  * run_jobs - окремий процес-обробник (пріоритети, відкладений запуск,
+    періодичні команди з JOBS_PERIODIC);
+  * вбудований фоновий потік веб-процесу після коміту (JOBS_RUN_IN_PROCESS),
+    щоб сайт працював і без окремого обробника.
+
+Захоплення завдання: на PostgreSQL - SELECT ... FOR UPDATE SKIP LOCKED,
+на SQLite - умовний UPDATE кандидата (рядок отримує лише один обробник).
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = -10
+
+ERROR_MAX_LENGTH = 4000
+CLAIM_CANDIDATES = 10
+
+_registry = {}
+_discovered = False
+_discover_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class UnknownTask(LookupError):
+    pass
+
+
+def task(name):
+    """Реєструє функцію як фонове завдання; параметри - JSON-сумісні kwargs"""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def get_task(name):
+    global _discovered
+    if not _discovered:
+        with _discover_lock:
+            if not _discovered:
+                autodiscover_modules('tasks')
+                _discovered = True
+    try:
+        return _registry[name]
+    except KeyError:
+        raise UnknownTask(f"Невідоме фонове завдання: {name}")
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def enqueue(task_name, payload=None, priority=PRIORITY_NORMAL, run_at=None, max_attempts=None, dedupe_key=''):
+    """
+    Ставить завдання в чергу. З dedupe_key повертає вже активне завдання
+    з тим самим ключем замість створення дубліката.
+    """
+    get_task(task_name)
+    fields = {
+        'task': task_name,
+        'payload': payload or {},
+        'priority': priority,
+        'run_at': run_at or timezone.now(),
+        'max_attempts': max_attempts or getattr(settings, 'JOBS_MAX_ATTEMPTS', 3),
+        'dedupe_key': dedupe_key,
+    }
+    if dedupe_key:
+        try:
+            with transaction.atomic():
+                job = Job.objects.create(**fields)
+        except IntegrityError:
+            return Job.objects.filter(dedupe_key=dedupe_key, status__in=Job.ACTIVE_STATUSES).first()
+    else:
+        job = Job.objects.create(**fields)
+
+    if getattr(settings, 'JOBS_RUN_IN_PROCESS', True) and job.run_at <= timezone.now():
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_process))
+    return job
+
+
+def _ready_condition(now):
+    stale = now - timedelta(seconds=getattr(settings, 'JOBS_STALE_AFTER', 30 * 60))
+    return Q(status='queued', run_at__lte=now) | Q(status='running', locked_at__lt=stale)
+
+
+def claim(worker=None):
+    """Захоплює найпріоритетніше готове завдання або повертає None"""
+    worker = worker or worker_id()
+    now = timezone.now()
+    candidates = Job.objects.filter(_ready_condition(now)).order_by('-priority', 'run_at', 'pk')
+    running = {'status': 'running', 'locked_by': worker, 'locked_at': now, 'started_at': now}
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = candidates.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            for field, value in running.items():
+                setattr(job, field, value)
+            job.save(update_fields=list(running))
+            return job
+
+    # SQLite: блокувань рядків немає - UPDATE з повторною перевіркою умови
+    for pk in candidates.values_list('pk', flat=True)[:CLAIM_CANDIDATES]:
+        if Job.objects.filter(_ready_condition(now), pk=pk).update(**running) == 1:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def backoff_delay(attempts):
+    base = getattr(settings, 'JOBS_BACKOFF_BASE', 60)
+    return min(base * 2 ** max(attempts - 1, 0), 6 * 60 * 60)
+
+
+def _json_result(value):
+    try:
+        json.dumps(value)
+        return value
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def execute(job):
+    """Виконує захоплене завдання, зберігає тривалість, результат або помилку"""
+    job.attempts += 1
+    started = time.monotonic()
+    try:
+        if job.attempts > job.max_attempts:
+            raise RuntimeError('Перевищено кількість спроб (обробник завершився під час виконання)')
+        result = get_task(job.task)(**job.payload)
+    except Exception as exc:
+        job.last_error = traceback.format_exc()[-ERROR_MAX_LENGTH:]
+        retry = job.attempts < job.max_attempts and not isinstance(exc, UnknownTask)
+        if retry:
+            job.status = 'queued'
+            job.run_at = timezone.now() + timedelta(seconds=backoff_delay(job.attempts))
+        else:
+            job.status = 'failed'
+        logger.warning(
+            f"Завдання {job.task} #{job.pk} завершилось помилкою (спроба {job.attempts}/{job.max_attempts}"
+            f"{', повтор о ' + timezone.localtime(job.run_at).strftime('%H:%M:%S') if retry else ''}): {exc}"
+        )
+    else:
+        job.status = 'done'
+        job.result = _json_result(result)
+        job.last_error = ''
+
+    job.duration_ms = int((time.monotonic() - started) * 1000)
+    job.finished_at = timezone.now()
+    job.locked_by = ''
+    job.save(update_fields=[
+        'status', 'attempts', 'run_at', 'result', 'last_error', 'duration_ms', 'finished_at', 'locked_by'
+    ])
+    logger.info(f"Завдання {job.task} #{job.pk}: {job.status} за {job.duration_ms} мс")
+    return job
+
+
+def run_pending(max_jobs=None, worker=None):
+    """Виконує готові завдання, поки черга не спорожніє; повертає кількість виконаних"""
+    worker = worker or worker_id()
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        job = claim(worker)
+        if job is None:
+            break
+        execute(job)
+        processed += 1
+    return processed
+
+
+def schedule_periodic(now=None):
+    """
+    Ставить у чергу періодичні команди з JOBS_PERIODIC ({команда: інтервал, с}).
+    Наступний запуск - через інтервал після завершення попереднього.
+    """
+    now = now or timezone.now()
+    for command, interval in getattr(settings, 'JOBS_PERIODIC', {}).items():
+        key = f'periodic:{command}'
+        if Job.objects.filter(dedupe_key=key, status__in=Job.ACTIVE_STATUSES).exists():
+            continue
+        last_finished = (
+            Job.objects.filter(dedupe_key=key).exclude(finished_at__isnull=True)
+            .order_by('-finished_at').values_list('finished_at', flat=True).first()
+        )
+        run_at = max(now, last_finished + timedelta(seconds=interval)) if last_finished else now
+        enqueue('core.call_command', {'name': command}, priority=PRIORITY_LOW, run_at=run_at, dedupe_key=key)
+
+
+def cleanup(days=None):
+    """Видаляє завершені завдання, старші за JOBS_RETENTION_DAYS"""
+    days = days or getattr(settings, 'JOBS_RETENTION_DAYS', 7)
+    return Job.objects.filter(
+        status__in=['done', 'failed'], finished_at__lt=timezone.now() - timedelta(days=days)
+    ).delete()[0]
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='jobs')
+        return _executor
+
+
+def _run_in_process():
+    try:
+        run_pending(max_jobs=getattr(settings, 'JOBS_IN_PROCESS_BATCH', 5))
+    except Exception:
+        logger.exception('Вбудований обробник фонових завдань завершився помилкою')
+    finally:
+        # Фоновий потік не проходить через request_finished - закриваємо з'єднання самі
+        connections.close_all()
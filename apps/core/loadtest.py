@@ -0,0 +1,300 @@
+"""
+Навантажувальне тестування: зважені сценарії покупців проти запущеного сервера
+
+Кожен віртуальний покупець - окрема HTTP-сесія (cookies, CSRF, кошик), яка до
+кінця тесту виконує випадкові сценарії з JOURNEYS за їх вагою. Кожен крок
+сценарію - окремий вимір (час, помилка). Запуск: manage.py load_test.
+
+Нова Пошта підмінюється заглушкою (start_np_stub): сервер під навантаженням
+треба запустити з NOVA_POSHTA_API_URL, що вказує на неї.
+"""
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from .instrumentation import percentile
+
+# {сценарій: вага}
+JOURNEYS = {
+    'browse': 40,
+    'search': 15,
+    'cart': 15,
+    'checkout_cash': 15,
+    'checkout_liqpay': 5,
+    'novaposhta': 10,
+}
+
+LIQPAY_DATA = re.compile(r'name="data" value="([^"]+)"')
+STUB_CITY_REF = '8d5a980d-391c-11dd-90d9-001a92567626'
+
+
+def load_catalog(limit=500):
+    """Категорії і товари в наявності, з якими працюють покупці"""
+    from apps.products.models import Category, Product
+
+    products = list(
+        Product.objects.filter(is_active=True, stock__gt=0)
+        .order_by('?').values('id', 'slug', 'name')[:limit]
+    )
+    if not products:
+        raise ValueError('У базі немає активних товарів у наявності')
+    return {
+        'categories': list(Category.objects.filter(is_active=True).values_list('slug', flat=True)),
+        'products': products,
+        'search_terms': sorted({product['name'].split()[0] for product in products if product['name']}),
+    }
+
+
+def ensure_promo_code(code):
+    """Активний промокод для сценарію кошика"""
+    from apps.promotions.models import PromoCode
+
+    now = timezone.now()
+    PromoCode.objects.update_or_create(code=code, defaults={
+        'discount_type': 'percentage',
+        'discount_value': 5,
+        'max_uses': None,
+        'min_order_amount': None,
+        'start_date': now - timedelta(days=1),
+        'end_date': now + timedelta(days=365),
+    })
+
+
+class Shopper:
+    """Віртуальний покупець: одна HTTP-сесія, виміри всіх кроків"""
+
+    def __init__(self, number, base_url, catalog, promo_code, timeout=30):
+        self.number = number
+        self.base_url = base_url.rstrip('/')
+        self.catalog = catalog
+        self.promo_code = promo_code
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.samples = []
+        self.journeys = 0
+        self.orders = 0
+
+    def request(self, step, method, path, expect=(200,), ajax=False, **kwargs):
+        headers = kwargs.pop('headers', {})
+        if method == 'POST':
+            headers['X-CSRFToken'] = self.session.cookies.get(settings.CSRF_COOKIE_NAME, '')
+        if ajax:
+            headers['X-Requested-With'] = 'XMLHttpRequest'
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, self.base_url + path, headers=headers, timeout=self.timeout,
+                allow_redirects=False, **kwargs
+            )
+            status = response.status_code
+            ok = status in expect
+        except requests.RequestException:
+            response, status, ok = None, 'error', False
+        self.samples.append((step, time.perf_counter() - started, ok, status))
+        return response if ok else None
+
+    def product(self):
+        return random.choice(self.catalog['products'])
+
+    def ensure_csrf(self):
+        if settings.CSRF_COOKIE_NAME not in self.session.cookies:
+            self.request('home', 'GET', '/')
+
+    def add_to_cart(self, product, quantity=1):
+        return self.request('cart_add', 'POST', f"/cart/add/{product['id']}/", data={'quantity': quantity}, ajax=True)
+
+    def checkout_form(self, payment_method):
+        return {
+            'first_name': 'Тест',
+            'last_name': 'Навантаження',
+            'email': f'loadtest+{self.number}-{self.journeys}@example.com',
+            'phone': '+380501234567',
+            'delivery_method': 'nova_poshta',
+            'delivery_type': 'warehouse',
+            'delivery_city': 'Київ',
+            'delivery_address': 'Відділення №1',
+            'np_city_ref': STUB_CITY_REF,
+            'payment_method': payment_method,
+        }
+
+    def journey_browse(self):
+        self.request('home', 'GET', '/')
+        if self.catalog['categories']:
+            slug = random.choice(self.catalog['categories'])
+            self.request('category', 'GET', f'/products/category/{slug}/')
+            self.request('category_filtered', 'GET', f'/products/category/{slug}/', params={
+                'price_min': 50, 'price_max': 1000, 'availability': 'in_stock', 'sort': 'price_asc',
+            })
+        for _ in range(random.randint(1, 3)):
+            self.request('product_detail', 'GET', f"/products/product/{self.product()['slug']}/")
+
+    def journey_search(self):
+        self.request('search', 'GET', '/search/', params={'q': random.choice(self.catalog['search_terms'])})
+        self.request('sale', 'GET', '/products/sale/')
+
+    def journey_cart(self):
+        self.ensure_csrf()
+        product = self.product()
+        self.request('product_detail', 'GET', f"/products/product/{product['slug']}/")
+        self.add_to_cart(product)
+        self.request('cart_update', 'POST', f"/cart/add/{product['id']}/", data={'quantity': 3, 'override': 'true'}, ajax=True)
+        self.request('cart_detail', 'GET', '/cart/')
+        self.request('apply_promo', 'POST', '/cart/apply-promo/', data={'code': self.promo_code}, ajax=True)
+
+    def journey_checkout_cash(self):
+        self.ensure_csrf()
+        self.add_to_cart(self.product())
+        self.request('checkout_page', 'GET', '/orders/create/')
+        if self.request('order_create', 'POST', '/orders/create/', expect=(302,), data=self.checkout_form('cash')):
+            self.orders += 1
+            self.request('order_success', 'GET', '/orders/success/')
+
+    def journey_checkout_liqpay(self):
+        self.ensure_csrf()
+        self.add_to_cart(self.product())
+        if not self.request('order_create', 'POST', '/orders/create/', expect=(302,), data=self.checkout_form('liqpay')):
+            return
+        page = self.request('liqpay_pending', 'GET', '/orders/liqpay-pending/')
+        match = LIQPAY_DATA.search(page.text) if page is not None else None
+        if match is None:
+            self.samples.append(('liqpay_callback', 0, False, 'no_data'))
+            return
+        # Як це робить LiqPay: підписаний callback з order_id платежу
+        order_id = json.loads(base64.b64decode(match.group(1)))['order_id']
+        data = base64.b64encode(json.dumps({
+            'order_id': order_id, 'status': 'success', 'transaction_id': f'load-{self.number}-{self.journeys}',
+        }).encode('utf-8')).decode('utf-8')
+        key = settings.LIQPAY_PRIVATE_KEY
+        signature = base64.b64encode(hashlib.sha1((key + data + key).encode('utf-8')).digest()).decode('utf-8')
+        started = time.perf_counter()
+        try:
+            # Окремо від сесії покупця - це запит від серверів LiqPay
+            callback = requests.post(
+                f'{self.base_url}/orders/liqpay-callback/', data={'data': data, 'signature': signature},
+                timeout=self.timeout,
+            )
+            ok = callback.status_code == 200 and callback.json().get('success', False)
+            status = callback.status_code
+        except (requests.RequestException, ValueError):
+            ok, status = False, 'error'
+        self.samples.append(('liqpay_callback', time.perf_counter() - started, ok, status))
+        if ok:
+            self.orders += 1
+
+    def journey_novaposhta(self):
+        self.request('np_search_cities', 'GET', '/orders/np/search-cities/', params={'query': 'Київ'})
+        self.request('np_get_warehouses', 'GET', '/orders/np/get-warehouses/', params={'city_ref': STUB_CITY_REF})
+
+    def run(self, deadline, weights):
+        names, values = list(weights), list(weights.values())
+        while time.monotonic() < deadline:
+            getattr(self, f'journey_{random.choices(names, values)[0]}')()
+            self.journeys += 1
+
+
+def run_load(base_url, users, duration, catalog, promo_code, weights=None, ramp_up=0):
+    """Запускає users покупців на duration секунд; повертає (покупці, фактична тривалість)"""
+    weights = weights or JOURNEYS
+    shoppers = [Shopper(number, base_url, catalog, promo_code) for number in range(users)]
+    started = time.monotonic()
+    deadline = started + ramp_up + duration
+
+    def start(shopper):
+        if ramp_up:
+            time.sleep(ramp_up * shopper.number / users)
+        shopper.run(deadline, weights)
+
+    with ThreadPoolExecutor(max_workers=users, thread_name_prefix='shopper') as executor:
+        list(executor.map(start, shoppers))
+    return shoppers, time.monotonic() - started
+
+
+def summarize(shoppers, elapsed):
+    """Пропускна здатність, перцентилі затримки і частка помилок по кроках"""
+    by_step = {}
+    for shopper in shoppers:
+        for step, seconds, ok, status in shopper.samples:
+            by_step.setdefault(step, []).append((seconds * 1000, ok, status))
+
+    steps = {}
+    for step, samples in sorted(by_step.items()):
+        latencies = sorted(ms for ms, _, _ in samples)
+        errors = [status for _, ok, status in samples if not ok]
+        steps[step] = {
+            'count': len(samples),
+            'errors': len(errors),
+            'error_rate': round(len(errors) / len(samples), 4),
+            'statuses': {str(status): errors.count(status) for status in set(errors)},
+            'p50_ms': round(percentile(latencies, 50), 1),
+            'p95_ms': round(percentile(latencies, 95), 1),
+            'p99_ms': round(percentile(latencies, 99), 1),
+            'max_ms': round(latencies[-1], 1),
+        }
+
+    total = sum(step['count'] for step in steps.values())
+    errors = sum(step['errors'] for step in steps.values())
+    all_latencies = sorted(ms for samples in by_step.values() for ms, _, _ in samples)
+    return {
+        'users': len(shoppers),
+        'duration_seconds': round(elapsed, 1),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 2) if elapsed else 0,
+        'errors': errors,
+        'error_rate': round(errors / total, 4) if total else 0,
+        'journeys': sum(shopper.journeys for shopper in shoppers),
+        'orders': sum(shopper.orders for shopper in shoppers),
+        'p50_ms': round(percentile(all_latencies, 50), 1),
+        'p95_ms': round(percentile(all_latencies, 95), 1),
+        'p99_ms': round(percentile(all_latencies, 99), 1),
+        'steps': steps,
+    }
+
+
+class NovaPoshtaStubHandler(BaseHTTPRequestHandler):
+    """Відповіді у форматі API Нової Пошти для getCities / getWarehouses"""
+
+    latency = 0
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if self.latency:
+            time.sleep(self.latency)
+        method = payload.get('calledMethod')
+        if method == 'getCities':
+            data = [{'Ref': STUB_CITY_REF, 'Description': 'Київ', 'Area': 'Київська', 'SettlementType': 'місто'}]
+        elif method == 'getWarehouses':
+            data = [
+                {'Ref': f'stub-warehouse-{number}', 'Description': f'Відділення №{number}', 'Number': str(number),
+                 'ShortAddress': f'Київ, вул. Тестова, {number}', 'TypeOfWarehouse': 'Branch'}
+                for number in range(1, 51)
+            ]
+        else:
+            data = []
+        body = json.dumps({'success': True, 'data': data, 'errors': []}, ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_np_stub(port=0, latency_ms=0):
+    """Запускає заглушку Нової Пошти у фоновому потоці; повертає сервер (server.server_port)"""
+    handler = type('NovaPoshtaStub', (NovaPoshtaStubHandler,), {'latency': latency_ms / 1000})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, name='np-stub', daemon=True).start()
+    return server
@@ -0,0 +1,51 @@
+"""
+Відправка черги транзакційних листів (OutboxEmail)
+
+Запускати з cron раз на хвилину, або --loop як окремий процес.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core import outbox
+
+
+class Command(BaseCommand):
+    help = 'Відправляє листи з черги outbox пачками з повторами та експоненційною затримкою'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Листів у пачці (за замовчуванням EMAIL_OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--loop', action='store_true', help='Працювати постійно')
+        parser.add_argument('--interval', type=float, default=5, help='Пауза між проходами в режимі --loop, секунд')
+        parser.add_argument('--stats', action='store_true', help='Лише показати метрики черги')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.print_stats()
+            return
+
+        while True:
+            sent, failed = outbox.drain(batch_size=options['batch_size'])
+            removed = outbox.cleanup()
+            if sent or failed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f'✅ Відправлено: {sent}'))
+                if failed:
+                    self.stdout.write(self.style.WARNING(f'⚠️ Відкладено/помилок: {failed}'))
+                if removed:
+                    self.stdout.write(f'🗑️ Видалено старих листів: {removed}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.print_stats()
+
+    def print_stats(self):
+        stats = outbox.queue_stats()
+        self.stdout.write(
+            f"📬 У черзі: {stats['pending']} (з них повторів: {stats['retrying']}), "
+            f"відправляється: {stats['sending']}, помилок: {stats['failed']}"
+        )
+        self.stdout.write(
+            f"⏱️ Найстаріший лист у черзі: {stats['oldest_pending_seconds']:.0f} с, "
+            f"затримка доставки: середня {stats['latency_avg_seconds']:.1f} с, p95 {stats['latency_p95_seconds']:.1f} с"
+        )
@@ -0,0 +1,103 @@
+"""
+Навантажувальний тест: зважені сценарії покупців проти запущеного сервера
+
+    python manage.py load_test --np-stub 8765   # заглушка НП, сервер - з NOVA_POSHTA_API_URL
+    NOVA_POSHTA_API_URL=http://127.0.0.1:8765/ gunicorn beautyshop.wsgi --workers=1 --threads=4
+    python manage.py load_test --url http://127.0.0.1:8000 --users 20 --duration 60 --json report.json
+
+Сценарії оформлення створюють справжні замовлення - запускати лише проти
+локальної/тестової бази.
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core import loadtest
+
+
+class Command(BaseCommand):
+    help = 'Навантажувальний тест сценаріями покупців: пропускна здатність, перцентилі затримки, помилки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Адреса сервера під навантаженням')
+        parser.add_argument('--users', type=int, default=10, help='Одночасних покупців')
+        parser.add_argument('--duration', type=float, default=30, help='Тривалість, секунд')
+        parser.add_argument('--ramp-up', type=float, default=0, help='Поступовий старт покупців, секунд')
+        parser.add_argument('--journeys', default='', help='Ваги сценаріїв, напр. browse=50,checkout_cash=10')
+        parser.add_argument('--promo-code', default='LOADTEST', help='Промокод для сценарію кошика (буде створено)')
+        parser.add_argument('--np-stub', type=int, default=None, metavar='PORT', help='Запустити заглушку Нової Пошти на порту')
+        parser.add_argument('--np-latency-ms', type=int, default=50, help='Затримка відповіді заглушки НП, мс')
+        parser.add_argument('--stub-only', action='store_true', help='Лише тримати заглушку НП запущеною')
+        parser.add_argument('--json', default='', help='Зберегти звіт у JSON-файл')
+
+    def handle(self, *args, **options):
+        if options['np_stub'] is not None:
+            server = loadtest.start_np_stub(options['np_stub'], options['np_latency_ms'])
+            self.stdout.write(
+                f"🧪 Заглушка Нової Пошти: NOVA_POSHTA_API_URL=http://127.0.0.1:{server.server_port}/"
+            )
+            if options['stub_only']:
+                self.stdout.write('⏳ Ctrl+C для зупинки')
+                try:
+                    while True:
+                        time.sleep(3600)
+                except KeyboardInterrupt:
+                    return
+
+        weights = self.parse_weights(options['journeys'])
+        try:
+            catalog = loadtest.load_catalog()
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        loadtest.ensure_promo_code(options['promo_code'])
+
+        self.stdout.write(
+            f"🚀 {options['users']} покупців × {options['duration']:.0f} с → {options['url']} "
+            f"(товарів: {len(catalog['products'])}, категорій: {len(catalog['categories'])})"
+        )
+        shoppers, elapsed = loadtest.run_load(
+            options['url'], options['users'], options['duration'], catalog,
+            options['promo_code'], weights=weights, ramp_up=options['ramp_up'],
+        )
+        report = loadtest.summarize(shoppers, elapsed)
+        report['journey_weights'] = weights
+        self.print_report(report)
+
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"💾 Звіт збережено: {options['json']}")
+
+    def parse_weights(self, value):
+        if not value:
+            return dict(loadtest.JOURNEYS)
+        weights = {}
+        for part in value.split(','):
+            name, _, weight = part.partition('=')
+            name = name.strip()
+            if name not in loadtest.JOURNEYS:
+                raise CommandError(f"Невідомий сценарій: {name}. Доступні: {', '.join(loadtest.JOURNEYS)}")
+            try:
+                weights[name] = float(weight or 1)
+            except ValueError:
+                raise CommandError(f"Некоректна вага сценарію {name}: {weight}")
+        return weights
+
+    def print_report(self, report):
+        self.stdout.write(self.style.SUCCESS(
+            f"\n📊 Запитів: {report['requests']} за {report['duration_seconds']} с - "
+            f"{report['throughput_rps']} запит/с, сценаріїв: {report['journeys']}, замовлень: {report['orders']}"
+        ))
+        self.stdout.write(
+            f"⏱️ Затримка: p50 {report['p50_ms']} мс, p95 {report['p95_ms']} мс, p99 {report['p99_ms']} мс"
+        )
+        style = self.style.WARNING if report['errors'] else self.style.SUCCESS
+        self.stdout.write(style(f"{'⚠️' if report['errors'] else '✅'} Помилок: {report['errors']} ({report['error_rate']:.2%})"))
+
+        self.stdout.write(f"\n{'Крок':<20}{'К-ть':>7}{'Помилок':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+        for step, stats in report['steps'].items():
+            self.stdout.write(
+                f"{step:<20}{stats['count']:>7}{stats['errors']:>9}{stats['p50_ms']:>9}"
+                f"{stats['p95_ms']:>9}{stats['p99_ms']:>9}{stats['max_ms']:>9}"
+            )
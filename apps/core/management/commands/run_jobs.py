@@ -0,0 +1,58 @@
+"""
+Обробник черги фонових завдань (apps.core.jobs)
+
+На Render - окремий background worker: python manage.py run_jobs
+"""
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Виконує фонові завдання з черги (пріоритети, відкладений запуск, повтори, періодичні команди)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Виконати готові завдання і завершитись')
+        parser.add_argument('--max-jobs', type=int, default=None, help='Завершитись після N завдань')
+        parser.add_argument('--sleep', type=float, default=2, help='Пауза при порожній черзі, секунд')
+        parser.add_argument('--no-periodic', action='store_true', help='Не планувати періодичні команди з JOBS_PERIODIC')
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        worker = jobs.worker_id()
+        processed = 0
+        last_housekeeping = 0
+        self.stdout.write(self.style.SUCCESS(f'🚀 Обробник {worker} запущено'))
+
+        while not self.stopping:
+            if time.monotonic() - last_housekeeping > 30:
+                if not options['no_periodic']:
+                    jobs.schedule_periodic()
+                jobs.cleanup()
+                last_housekeeping = time.monotonic()
+
+            job = jobs.claim(worker)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            jobs.execute(job)
+            processed += 1
+            icon = '✅' if job.status == 'done' else '🔁' if job.status == 'queued' else '❌'
+            self.stdout.write(f'{icon} {job.task} #{job.pk}: {job.get_status_display()} за {job.duration_ms} мс')
+            if options['max_jobs'] and processed >= options['max_jobs']:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f'🏁 Виконано завдань: {processed}'))
+
+    def stop(self, signum, frame):
+        # Поточне завдання доробляється, нове не береться
+        self.stopping = True
@@ -0,0 +1,332 @@
+"""
+Метрики у форматі Prometheus (text exposition) - без зовнішніх залежностей
+
+Реєстр живе в пам'яті процесу і спільний для всіх потоків gunicorn. При
+кількох воркерах кожен процес раз на METRICS_FLUSH_INTERVAL скидає свій знімок
+у METRICS_MULTIPROCESS_DIR/<pid>.json, а /metrics підсумовує файли всіх
+процесів (лічильники і гістограми додаються). Показники, які краще рахувати
+при зборі (глибина черги листів), задаються функцією collect і не
+агрегуються.
+"""
+import atexit
+import functools
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    kind = ''
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: очікувані мітки {self.labelnames}, отримано {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), self._copy(value)] for key, value in self._values.items()]
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    @staticmethod
+    def merge_value(left, right):
+        return left + right
+
+    def samples(self, values):
+        for key, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """Значення на момент збору; з collect - обчислюється функцією при кожному /metrics"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), collect=None, registry=None):
+        self.collect = collect
+        super().__init__(name, documentation, labelnames, registry)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    @staticmethod
+    def _copy(value):
+        return [list(value[0]), value[1], value[2]]
+
+    @staticmethod
+    def merge_value(left, right):
+        return [[a + b for a, b in zip(left[0], right[0])], left[1] + right[1], left[2] + right[2]]
+
+    def samples(self, values):
+        for key, (bucket_counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket', _format_labels(self.labelnames, key, ('le', _format_value(bound))), cumulative
+            yield f'{self.name}_bucket', _format_labels(self.labelnames, key, ('le', '+Inf')), count
+            yield f'{self.name}_sum', _format_labels(self.labelnames, key), total
+            yield f'{self.name}_count', _format_labels(self.labelnames, key), count
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._last_flush = 0
+        self._flush_lock = threading.Lock()
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Метрику {metric.name} вже зареєстровано")
+        self.metrics[metric.name] = metric
+
+    def snapshot(self):
+        """Знімок локальних значень процесу (без collect-показників)"""
+        return {
+            name: metric.snapshot()
+            for name, metric in self.metrics.items()
+            if not getattr(metric, 'collect', None)
+        }
+
+    def _directory(self):
+        return getattr(settings, 'METRICS_MULTIPROCESS_DIR', '')
+
+    def flush(self):
+        directory = self._directory()
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+        self._last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        """Скидає знімок не частіше ніж раз на METRICS_FLUSH_INTERVAL (викликається після запиту)"""
+        if not self._directory():
+            return
+        if time.monotonic() - self._last_flush < getattr(settings, 'METRICS_FLUSH_INTERVAL', 5):
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self.flush()
+        except OSError as exc:
+            logger.warning(f"Не вдалося зберегти метрики процесу: {exc}")
+        finally:
+            self._flush_lock.release()
+
+    def _other_processes(self):
+        directory = self._directory()
+        if not directory:
+            return []
+        own = os.path.join(directory, f'{os.getpid()}.json')
+        stale_before = time.time() - getattr(settings, 'METRICS_STALE_AFTER', 24 * 60 * 60)
+        snapshots = []
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            if path == own:
+                continue
+            try:
+                if os.path.getmtime(path) < stale_before:
+                    os.remove(path)
+                    continue
+                with open(path, encoding='utf-8') as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def collect(self):
+        """{метрика: {мітки: значення}} - поточний процес + знімки інших процесів"""
+        merged = {}
+        for snapshot in [self.snapshot()] + self._other_processes():
+            for name, entries in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                values = merged.setdefault(name, {})
+                for key, value in entries:
+                    key = tuple(key)
+                    values[key] = metric.merge_value(values[key], value) if key in values else value
+
+        for name, metric in self.metrics.items():
+            if getattr(metric, 'collect', None):
+                try:
+                    merged[name] = {tuple(map(str, key)): value for key, value in metric.collect().items()}
+                except Exception:
+                    logger.exception(f"Помилка збору метрики {name}")
+        return merged
+
+    def render(self):
+        """Текстовий формат Prometheus"""
+        collected = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {_escape(metric.documentation)}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for sample_name, labels, value in metric.samples(collected.get(name, {})):
+                lines.append(f'{sample_name}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+atexit.register(lambda: REGISTRY.flush() if REGISTRY._directory() else None)
+
+
+def timed(histogram, methods=None):
+    """Декоратор view: тривалість у histogram (лише для methods, якщо задано)"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if methods and request.method not in methods:
+                return view(request, *args, **kwargs)
+            with histogram.time():
+                return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _email_queue_depth():
+    from .outbox import queue_stats
+
+    stats = queue_stats(latency_sample=0)
+    return {(status,): stats[status] for status in ('pending', 'sending', 'failed', 'retrying')}
+
+
+def _email_oldest_pending():
+    from .outbox import queue_stats
+
+    return {(): queue_stats(latency_sample=0)['oldest_pending_seconds']}
+
+
+# Запити
+# Метод задає клієнт - нестандартні зводяться до 'other', щоб не роздувати кількість серій
+HTTP_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE', 'CONNECT'})
+
+
+def method_label(method):
+    return method if method in HTTP_METHODS else 'other'
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'shop_http_request_duration_seconds', 'Тривалість обробки запиту', ['view', 'method'],
+)
+HTTP_REQUESTS = Counter('shop_http_requests_total', 'Запити за статусом відповіді', ['view', 'method', 'status'])
+DB_QUERIES = Histogram(
+    'shop_db_queries_per_request', 'SQL-запитів на HTTP-запит', ['view'],
+    buckets=(1, 2, 5, 10, 20, 30, 50, 100, 200),
+)
+CACHE_REQUESTS = Counter('shop_cache_requests_total', 'Звернення до кешу', ['cache', 'result'])
+
+# Інтеграції
+NOVA_POSHTA_SECONDS = Histogram('shop_novaposhta_request_duration_seconds', 'Запити до API Нової Пошти', ['method'])
+NOVA_POSHTA_ERRORS = Counter('shop_novaposhta_errors_total', 'Помилки API Нової Пошти', ['method', 'kind'])
+LIQPAY_CALLBACK_SECONDS = Histogram('shop_liqpay_callback_duration_seconds', 'Обробка callback LiqPay')
+
+# Бізнес
+ORDER_CREATE_SECONDS = Histogram('shop_order_create_duration_seconds', 'Оформлення замовлення (POST)')
+ORDERS_CREATED = Counter('shop_orders_created_total', 'Створені замовлення', ['payment_method'])
+CART_SIZE = Histogram(
+    'shop_cart_items_at_checkout', 'Кількість товарів у кошику при оформленні',
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+)
+EMAIL_QUEUE = Gauge(
+    'shop_email_outbox_messages', 'Листи в черзі outbox за статусом', ['status'], collect=_email_queue_depth,
+)
+EMAIL_QUEUE_OLDEST = Gauge(
+    'shop_email_outbox_oldest_pending_seconds', 'Вік найстарішого невідправленого листа', collect=_email_oldest_pending,
+)
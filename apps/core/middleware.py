@@ -1,6 +1,16 @@
 """
 Security middleware для додаткових заголовків безпеки
 """
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+from . import instrumentation, metrics
 
 
 class SecurityHeadersMiddleware:
@@ -64,3 +74,101 @@ class PrivatePagesCacheMiddleware:
         
         return response
 
+
+class RequestInstrumentationMiddleware:
+    """
+    Вимірює вибірку запитів: SQL (кількість, час, дублікати), рендер шаблонів,
+    розмір відповіді. INSTRUMENTATION_SAMPLE_RATE = 0 - вимкнено
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 0)
+        if self.sample_rate:
+            instrumentation.install_template_timer()
+
+    def __call__(self, request):
+        if not self.sample_rate or (self.sample_rate < 1 and random.random() >= self.sample_rate):
+            return self.get_response(request)
+
+        metrics = instrumentation.RequestMetrics()
+        token = instrumentation.activate(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            instrumentation.deactivate(token)
+
+        instrumentation.record(request, response, metrics, time.perf_counter() - started)
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Профіль запиту на вимогу персоналу (?_profile=1) або для кожного N-го
+    запиту view (apps.core.profiling). Без PROFILING_ENABLED не підключається
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from . import profiling
+
+        mode, trigger = profiling.requested_mode(request), 'request'
+        if mode is None:
+            # Без семплювання звичайні запити не резолвимо зайвий раз
+            if not profiling.sampling_enabled():
+                return self.get_response(request)
+            try:
+                view_name = resolve(request.path_info).view_name
+            except Resolver404:
+                return self.get_response(request)
+            if not profiling.should_sample(view_name):
+                return self.get_response(request)
+            mode, trigger = 'sampling', 'sampled'
+
+        response, fields = profiling.run_profiled(mode, lambda: self.get_response(request))
+        match = getattr(request, 'resolver_match', None)
+        profiling.save_capture(request, response, match.view_name if match else request.path, mode, trigger, fields)
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Тривалість, статус і кількість SQL-запитів кожного запиту по view
+    (apps.core.metrics). Без METRICS_ENABLED не підключається
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = [0]
+
+        def count_query(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else 'unresolved'
+        method = metrics.method_label(request.method)
+        metrics.HTTP_REQUEST_SECONDS.observe(elapsed, view=view_name, method=method)
+        metrics.HTTP_REQUESTS.inc(view=view_name, method=method, status=f'{response.status_code // 100}xx')
+        metrics.DB_QUERIES.observe(queries[0], view=view_name)
+        metrics.REGISTRY.maybe_flush()
+        return response
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.24 on 2026-10-19 18:34
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_newsletter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(blank=True, max_length=50, verbose_name='Тип листа')),
+                ('to', models.EmailField(max_length=254, verbose_name='Отримувач')),
+                ('subject', models.CharField(max_length=255, verbose_name='Тема')),
+                ('body', models.TextField(verbose_name='Текст')),
+                ('html_body', models.TextField(blank=True, verbose_name='HTML')),
+                ('status', models.CharField(choices=[('pending', 'В черзі'), ('sending', 'Відправляється'), ('sent', 'Відправлено'), ('failed', 'Помилка')], default='pending', max_length=10, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Спроб')),
+                ('last_error', models.TextField(blank=True, verbose_name='Остання помилка')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Наступна спроба')),
+                ('claimed_by', models.CharField(blank=True, max_length=32, verbose_name='Обробник')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True, verbose_name='Взято в роботу')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Створено')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Відправлено')),
+            ],
+            options={
+                'verbose_name': 'Лист у черзі',
+                'verbose_name_plural': 'Черга листів',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'available_at'], name='core_outbox_ready_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.24 on 2026-10-19 18:37
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_email_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=100, verbose_name='Завдання')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Параметри')),
+                ('priority', models.SmallIntegerField(default=0, help_text='Більше значення - виконується раніше', verbose_name='Пріоритет')),
+                ('dedupe_key', models.CharField(blank=True, max_length=150, verbose_name='Ключ унікальності')),
+                ('status', models.CharField(choices=[('queued', 'В черзі'), ('running', 'Виконується'), ('done', 'Виконано'), ('failed', 'Помилка')], default='queued', max_length=10, verbose_name='Статус')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Запуск не раніше')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Спроб')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='Макс. спроб')),
+                ('last_error', models.TextField(blank=True, verbose_name='Остання помилка')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='Результат')),
+                ('locked_by', models.CharField(blank=True, max_length=64, verbose_name='Обробник')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Взято в роботу')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Початок')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершення')),
+                ('duration_ms', models.PositiveIntegerField(blank=True, null=True, verbose_name='Тривалість, мс')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Створено')),
+            ],
+            options={
+                'verbose_name': 'Фонове завдання',
+                'verbose_name_plural': 'Фонові завдання',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'run_at', 'priority'], name='core_job_ready_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running']), models.Q(('dedupe_key', ''), _negated=True)), fields=('dedupe_key',), name='core_job_active_dedupe_uniq'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.24 on 2026-10-19 18:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0007_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileCapture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view_name', models.CharField(db_index=True, max_length=200, verbose_name='View')),
+                ('path', models.CharField(max_length=500, verbose_name='Шлях')),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('mode', models.CharField(choices=[('cprofile', 'cProfile'), ('sampling', 'Семплер стеків')], max_length=10, verbose_name='Профайлер')),
+                ('trigger', models.CharField(choices=[('request', 'На запит персоналу'), ('sampled', 'Вибірка 1 з N')], max_length=10, verbose_name='Запуск')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='Статус відповіді')),
+                ('duration_ms', models.PositiveIntegerField(verbose_name='Тривалість, мс')),
+                ('report', models.TextField(blank=True, verbose_name='Top-N функцій')),
+                ('stacks', models.JSONField(blank=True, default=dict, verbose_name='Згорнуті стеки')),
+                ('data', models.BinaryField(blank=True, null=True, verbose_name='pstats')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Створено')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Користувач')),
+            ],
+            options={
+                'verbose_name': 'Профіль запиту',
+                'verbose_name_plural': 'Профілі запитів',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -1,7 +1,9 @@
 """
 Моделі для core додатку - банери головної сторінки
 """
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from django.core.validators import FileExtensionValidator
 
 
@@ -98,3 +100,142 @@ class Newsletter(models.Model):
     
     def __str__(self):
         return self.email
+
+
+class OutboxEmail(models.Model):
+    """
+    Черга транзакційних листів (коди підтвердження, відновлення паролю тощо).
+    Рядок пишеться в тій же транзакції, що й зміна користувача/замовлення,
+    відправляє - drain_email_outbox (або фоновий потік після коміту).
+    """
+    
+    STATUS_CHOICES = [
+        ('pending', 'В черзі'),
+        ('sending', 'Відправляється'),
+        ('sent', 'Відправлено'),
+        ('failed', 'Помилка'),
+    ]
+    
+    kind = models.CharField('Тип листа', max_length=50, blank=True)
+    to = models.EmailField('Отримувач')
+    subject = models.CharField('Тема', max_length=255)
+    body = models.TextField('Текст')
+    html_body = models.TextField('HTML', blank=True)
+    
+    status = models.CharField('Статус', max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField('Спроб', default=0)
+    last_error = models.TextField('Остання помилка', blank=True)
+    available_at = models.DateTimeField('Наступна спроба', default=timezone.now)
+    claimed_by = models.CharField('Обробник', max_length=32, blank=True)
+    claimed_at = models.DateTimeField('Взято в роботу', null=True, blank=True)
+    created_at = models.DateTimeField('Створено', auto_now_add=True)
+    sent_at = models.DateTimeField('Відправлено', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Лист у черзі'
+        verbose_name_plural = 'Черга листів'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='core_outbox_ready_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind or 'email'} → {self.to} ({self.get_status_display()})"
+
+
+class Job(models.Model):
+    """
+    Фонове завдання (apps.core.jobs). Виконує run_jobs або вбудований
+    фоновий потік веб-процесу; зберігає час очікування/виконання та помилки.
+    """
+    
+    STATUS_CHOICES = [
+        ('queued', 'В черзі'),
+        ('running', 'Виконується'),
+        ('done', 'Виконано'),
+        ('failed', 'Помилка'),
+    ]
+    ACTIVE_STATUSES = ('queued', 'running')
+    
+    task = models.CharField('Завдання', max_length=100)
+    payload = models.JSONField('Параметри', default=dict, blank=True)
+    priority = models.SmallIntegerField('Пріоритет', default=0, help_text='Більше значення - виконується раніше')
+    dedupe_key = models.CharField('Ключ унікальності', max_length=150, blank=True)
+    
+    status = models.CharField('Статус', max_length=10, choices=STATUS_CHOICES, default='queued')
+    run_at = models.DateTimeField('Запуск не раніше', default=timezone.now)
+    attempts = models.PositiveSmallIntegerField('Спроб', default=0)
+    max_attempts = models.PositiveSmallIntegerField('Макс. спроб', default=3)
+    last_error = models.TextField('Остання помилка', blank=True)
+    result = models.JSONField('Результат', null=True, blank=True)
+    
+    locked_by = models.CharField('Обробник', max_length=64, blank=True)
+    locked_at = models.DateTimeField('Взято в роботу', null=True, blank=True)
+    started_at = models.DateTimeField('Початок', null=True, blank=True)
+    finished_at = models.DateTimeField('Завершення', null=True, blank=True)
+    duration_ms = models.PositiveIntegerField('Тривалість, мс', null=True, blank=True)
+    created_at = models.DateTimeField('Створено', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Фонове завдання'
+        verbose_name_plural = 'Фонові завдання'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_at', 'priority'], name='core_job_ready_idx'),
+        ]
+        constraints = [
+            # Одне активне завдання на ключ (періодичні завдання не дублюються)
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=models.Q(status__in=['queued', 'running']) & ~models.Q(dedupe_key=''),
+                name='core_job_active_dedupe_uniq',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.get_status_display()})"
+    
+    @property
+    def wait_seconds(self):
+        if not self.started_at:
+            return None
+        return max((self.started_at - self.run_at).total_seconds(), 0)
+
+
+class ProfileCapture(models.Model):
+    """
+    Профіль одного запиту (apps.core.profiling): cProfile - таблиця top-N і
+    сирі дані pstats; семплер стеків - згорнуті стеки для flame graph.
+    """
+    
+    MODE_CHOICES = [
+        ('cprofile', 'cProfile'),
+        ('sampling', 'Семплер стеків'),
+    ]
+    TRIGGER_CHOICES = [
+        ('request', 'На запит персоналу'),
+        ('sampled', 'Вибірка 1 з N'),
+    ]
+    
+    view_name = models.CharField('View', max_length=200, db_index=True)
+    path = models.CharField('Шлях', max_length=500)
+    method = models.CharField('Метод', max_length=10)
+    mode = models.CharField('Профайлер', max_length=10, choices=MODE_CHOICES)
+    trigger = models.CharField('Запуск', max_length=10, choices=TRIGGER_CHOICES)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Користувач'
+    )
+    status_code = models.PositiveSmallIntegerField('Статус відповіді')
+    duration_ms = models.PositiveIntegerField('Тривалість, мс')
+    report = models.TextField('Top-N функцій', blank=True)
+    stacks = models.JSONField('Згорнуті стеки', default=dict, blank=True)
+    data = models.BinaryField('pstats', null=True, blank=True)
+    created_at = models.DateTimeField('Створено', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Профіль запиту'
+        verbose_name_plural = 'Профілі запитів'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.view_name} {self.duration_ms} мс ({self.get_mode_display()})"
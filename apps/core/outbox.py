@@ -0,0 +1,217 @@
+"""
+Транзакційна черга листів (outbox)
+
+enqueue_email() лише пише рядок OutboxEmail у поточній транзакції - HTTP-запит
+не чекає на SMTP, а лист не губиться, якщо транзакцію відкотили чи пошта
+недоступна. Відправляє drain(): бере пачку готових листів (з позначкою
+обробника, тож кілька обробників не відправлять лист двічі), шле через одне
+з'єднання і при помилці відкладає лист з експоненційною затримкою.
+"""
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connections, transaction
+from django.db.models import Count, Min, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+ERROR_MAX_LENGTH = 1000
+STALE_CLAIM = timedelta(minutes=10)  # лист "завис" у відправці (обробник впав)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, f'EMAIL_OUTBOX_{name}', default)
+
+
+def enqueue_email(to, subject, html_message=None, message=None, kind=''):
+    """Ставить лист у чергу в поточній транзакції; відправка - після коміту"""
+    email = OutboxEmail.objects.create(
+        kind=kind,
+        to=to,
+        subject=subject,
+        body=message if message is not None else strip_tags(html_message or ''),
+        html_body=html_message or '',
+    )
+    if _setting('ASYNC', True):
+        transaction.on_commit(lambda: _get_executor().submit(_drain_in_background))
+    return email
+
+
+def enqueue_template_email(to, subject, template_name, context, kind=''):
+    return enqueue_email(to, subject, html_message=render_to_string(template_name, context), kind=kind)
+
+
+def backoff_delay(attempts):
+    """Затримка перед наступною спробою: base * 2^(attempts-1), не більше max"""
+    base = _setting('BACKOFF_BASE', 30)
+    return min(base * 2 ** max(attempts - 1, 0), _setting('BACKOFF_MAX', 3600))
+
+
+def _ready_condition(now):
+    return (
+        Q(status='pending', available_at__lte=now)
+        | Q(status='sending', claimed_at__lt=now - STALE_CLAIM)
+    )
+
+
+def claim_batch(batch_size=None):
+    """Позначає пачку готових листів за цим обробником і повертає їх"""
+    batch_size = batch_size or _setting('BATCH_SIZE', 50)
+    now = timezone.now()
+    ids = list(
+        OutboxEmail.objects.filter(_ready_condition(now))
+        .order_by('available_at', 'pk')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    # Повторна перевірка умови в UPDATE - паралельний обробник міг забрати частину рядків
+    OutboxEmail.objects.filter(_ready_condition(now), pk__in=ids).update(
+        status='sending', claimed_by=token, claimed_at=now
+    )
+    return list(OutboxEmail.objects.filter(claimed_by=token, status='sending'))
+
+
+def _build_message(email, connection):
+    msg = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[email.to],
+        connection=connection,
+    )
+    if email.html_body:
+        msg.attach_alternative(email.html_body, 'text/html')
+    return msg
+
+
+def _send(emails):
+    """Відправка пачки через одне з'єднання; повертає {pk: помилка} для невдалих"""
+    errors = {}
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        logger.warning(f"Поштовий сервер недоступний: {exc}")
+        return {email.pk: str(exc) for email in emails}
+    try:
+        for email in emails:
+            try:
+                connection.send_messages([_build_message(email, connection)])
+            except Exception as exc:
+                errors[email.pk] = str(exc)
+    finally:
+        connection.close()
+    return errors
+
+
+def _record(emails, errors):
+    now = timezone.now()
+    sent_ids = [email.pk for email in emails if email.pk not in errors]
+    if sent_ids:
+        OutboxEmail.objects.filter(pk__in=sent_ids).update(
+            status='sent', sent_at=now, last_error='', claimed_by=''
+        )
+
+    max_attempts = _setting('MAX_ATTEMPTS', 8)
+    failed = []
+    for email in emails:
+        if email.pk not in errors:
+            continue
+        email.attempts += 1
+        email.last_error = errors[email.pk][:ERROR_MAX_LENGTH]
+        email.claimed_by = ''
+        if email.attempts >= max_attempts:
+            email.status = 'failed'
+            logger.error(f"Лист {email.pk} ({email.kind}) на {email.to} не відправлено після {email.attempts} спроб: {email.last_error}")
+        else:
+            email.status = 'pending'
+            email.available_at = now + timedelta(seconds=backoff_delay(email.attempts))
+        failed.append(email)
+    OutboxEmail.objects.bulk_update(failed, ['status', 'attempts', 'last_error', 'available_at', 'claimed_by'])
+    return len(sent_ids), len(failed)
+
+
+def drain(batch_size=None, max_batches=None):
+    """Відправляє готові листи пачками, поки черга не спорожніє. Повертає (sent, failed)"""
+    sent = failed = batches = 0
+    while max_batches is None or batches < max_batches:
+        emails = claim_batch(batch_size)
+        if not emails:
+            break
+        batch_sent, batch_failed = _record(emails, _send(emails))
+        sent += batch_sent
+        failed += batch_failed
+        batches += 1
+        if batch_failed and not batch_sent:
+            # Пошта лежить - не крутимо цикл, решту відправить наступний запуск
+            break
+    if sent or failed:
+        logger.info(f"Outbox: відправлено {sent}, відкладено/помилок {failed}")
+    return sent, failed
+
+
+def cleanup(days=None):
+    """Видаляє відправлені листи, старші за EMAIL_OUTBOX_RETENTION_DAYS"""
+    days = days or _setting('RETENTION_DAYS', 14)
+    return OutboxEmail.objects.filter(
+        status='sent', sent_at__lt=timezone.now() - timedelta(days=days)
+    ).delete()[0]
+
+
+def queue_stats(latency_sample=200):
+    """Метрики черги: глибина за статусами, вік найстарішого листа, затримка доставки"""
+    now = timezone.now()
+    stats = OutboxEmail.objects.aggregate(
+        pending=Count('pk', filter=Q(status='pending')),
+        sending=Count('pk', filter=Q(status='sending')),
+        failed=Count('pk', filter=Q(status='failed')),
+        retrying=Count('pk', filter=Q(status='pending', attempts__gt=0)),
+        oldest=Min('created_at', filter=Q(status__in=['pending', 'sending'])),
+    )
+    oldest = stats.pop('oldest')
+    stats['oldest_pending_seconds'] = (now - oldest).total_seconds() if oldest else 0
+
+    latencies = sorted(
+        (sent_at - created_at).total_seconds()
+        for created_at, sent_at in OutboxEmail.objects.filter(status='sent')
+        .order_by('-sent_at').values_list('created_at', 'sent_at')[:latency_sample]
+    )
+    if latencies:
+        stats['latency_avg_seconds'] = sum(latencies) / len(latencies)
+        stats['latency_p95_seconds'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    else:
+        stats['latency_avg_seconds'] = stats['latency_p95_seconds'] = 0
+    return stats
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='email-outbox')
+        return _executor
+
+
+def _drain_in_background():
+    try:
+        drain(max_batches=1)
+    except Exception:
+        logger.exception('Фонова відправка черги листів завершилась помилкою')
+    finally:
+        # Фоновий потік не проходить через request_finished - закриваємо з'єднання самі
+        connections.close_all()
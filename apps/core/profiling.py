@@ -0,0 +1,171 @@
+"""
+Профілювання окремих запитів у продакшені
+
+Вимкнено за замовчуванням (PROFILING_ENABLED) - тоді ProfilingMiddleware
+не підключається взагалі. Увімкнено:
+  * персонал додає ?_profile=1 (або заголовок X-Profile: 1) - запит іде під
+    cProfile; ?_profile=sampling - під семплером стеків;
+  * PROFILING_SAMPLE_EVERY = N - кожен N-й запит кожного view знімається
+    семплером (мала накладна, придатний для постійної роботи).
+Результат - ProfileCapture в адмінці: top-N функцій або flame graph.
+"""
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+
+from django.conf import settings
+from django.utils.html import format_html, format_html_join
+
+from .models import ProfileCapture
+
+MODES = ('cprofile', 'sampling')
+SAMPLE_MAX_DEPTH = 64
+
+_counters = Counter()
+_counters_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, f'PROFILING_{name}', default)
+
+
+def requested_mode(request):
+    """Режим, якщо профіль замовив персонал, інакше None"""
+    value = request.GET.get('_profile') or request.headers.get('X-Profile')
+    if not value:
+        return None
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_active or not user.is_staff:
+        return None
+    return value if value in MODES else 'cprofile'
+
+
+def sampling_enabled():
+    return bool(_setting('SAMPLE_EVERY', 0))
+
+
+def should_sample(view_name):
+    """Кожен N-й запит view (лічильник у межах процесу)"""
+    every = _setting('SAMPLE_EVERY', 0)
+    if not every:
+        return False
+    with _counters_lock:
+        _counters[view_name] += 1
+        return _counters[view_name] % every == 0
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    """
+    Семплер стеків одного потоку: фоновий потік кожні interval секунд
+    читає sys._current_frames() і рахує згорнуті стеки (корінь;...;лист)
+    """
+
+    def __init__(self, thread_id=None, interval=None):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval or _setting('SAMPLE_INTERVAL', 0.005)
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None and len(labels) < SAMPLE_MAX_DEPTH:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.stacks[';'.join(reversed(labels))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_profiled(mode, func):
+    """Виконує func під профайлером; повертає (результат, поля ProfileCapture)"""
+    started = time.perf_counter()
+    if mode == 'sampling':
+        with StackSampler() as sampler:
+            result = func()
+        fields = {'stacks': dict(sampler.stacks)}
+    else:
+        profiler = cProfile.Profile()
+        result = profiler.runcall(func)
+        profiler.create_stats()
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(_setting('TOP_N', 40))
+        fields = {'report': report.getvalue(), 'data': marshal.dumps(profiler.stats)}
+    fields['duration_ms'] = int((time.perf_counter() - started) * 1000)
+    return result, fields
+
+
+def save_capture(request, response, view_name, mode, trigger, fields):
+    user = getattr(request, 'user', None)
+    capture = ProfileCapture.objects.create(
+        view_name=view_name[:200],
+        path=request.get_full_path()[:500],
+        method=request.method,
+        mode=mode,
+        trigger=trigger,
+        user=user if user is not None and user.is_authenticated else None,
+        status_code=response.status_code,
+        **fields,
+    )
+    keep = _setting('KEEP', 200)
+    stale = ProfileCapture.objects.order_by('-created_at').values_list('pk', flat=True)[keep:keep + 100]
+    ProfileCapture.objects.filter(pk__in=list(stale)).delete()
+    return capture
+
+
+def flame_tree(stacks):
+    """Згорнуті стеки -> дерево {'name', 'value', 'children'}"""
+    root = {'name': 'all', 'value': 0, 'children': {}}
+    for stack, count in stacks.items():
+        root['value'] += count
+        node = root
+        for label in stack.split(';'):
+            node = node['children'].setdefault(label, {'name': label, 'value': 0, 'children': {}})
+            node['value'] += count
+    return root
+
+
+def render_flame_graph(stacks, min_percent=0.5):
+    """HTML flame graph (вкладені блоки, ширина - частка семплів)"""
+    root = flame_tree(stacks)
+    if not root['value']:
+        return ''
+    total = root['value']
+
+    def render(node, parent_value):
+        children = sorted(node['children'].values(), key=lambda child: -child['value'])
+        visible = [child for child in children if child['value'] * 100 / total >= min_percent]
+        return format_html(
+            '<div style="flex:0 0 {}%;min-width:0;overflow:hidden">'
+            '<div title="{} - {} семплів ({}%)" style="background:hsl({},80%,65%);border:1px solid #fff;'
+            'font:11px monospace;white-space:nowrap;overflow:hidden;padding:1px 2px">{}</div>'
+            '<div style="display:flex">{}</div></div>',
+            round(node['value'] * 100 / parent_value, 3),
+            node['name'], node['value'], round(node['value'] * 100 / total, 1),
+            zlib.crc32(node['name'].encode()) % 40 + 10,
+            node['name'],
+            format_html_join('', '{}', ((render(child, node['value']),) for child in visible)),
+        )
+
+    return format_html('<div style="display:flex;width:100%">{}</div>', render(root, total))
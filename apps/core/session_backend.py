@@ -0,0 +1,129 @@
+"""
+Сесії: write-through кеш поверх БД із пропуском незмінних записів
+
+SESSION_SAVE_EVERY_REQUEST = True потрібен для ковзного терміну дії (iOS Safari),
+але стандартний db-бекенд тоді робить UPDATE на кожен запит. Цей бекенд:
+- читає сесію з кешу, у БД іде лише при промаху;
+- не пише, якщо серіалізовані дані не змінились, а термін дії в БД
+  оновлює не частіше ніж раз на SESSION_REFRESH_INTERVAL;
+- при записі оновлює і БД, і кеш (write-through).
+
+Кеш - окремий alias SESSION_CACHE_ALIAS, спільний для всіх процесів (Redis);
+з DummyCache сесії читаються з БД. Process-local кеш відхиляє перевірка core.E003.
+"""
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.cache import caches
+from django.utils import timezone
+
+KEY_PREFIX = 'beautyshop.session.'
+
+
+class SessionStore(DBStore):
+    """DB-сесія з кешем і пропуском незмінних записів"""
+
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        self._cache = caches[settings.SESSION_CACHE_ALIAS]
+        self._loaded_fingerprint = None
+        self._loaded_expiry = None
+        super().__init__(session_key)
+
+    @property
+    def cache_key(self):
+        return self.cache_key_prefix + self._get_or_create_session_key()
+
+    def _fingerprint(self, data):
+        return hashlib.sha1(self.serializer().dumps(data)).hexdigest()
+
+    def _cache_set(self, data, expiry):
+        try:
+            self._cache.set(
+                self.cache_key,
+                {'data': data, 'expiry': expiry.timestamp()},
+                max(0, int((expiry - timezone.now()).total_seconds())),
+            )
+        except Exception:
+            # Недоступний кеш не повинен ламати сесії - БД залишається джерелом істини
+            pass
+
+    def load(self):
+        try:
+            cached = self._cache.get(self.cache_key)
+        except Exception:
+            cached = None
+
+        now = timezone.now()
+        if cached is not None and cached['expiry'] > now.timestamp():
+            data = cached['data']
+            expiry = datetime.fromtimestamp(cached['expiry'], tz=dt_timezone.utc if settings.USE_TZ else None)
+        else:
+            s = self._get_session_from_db()
+            if s is None:
+                self._loaded_fingerprint = None
+                return {}
+            data = self.decode(s.session_data)
+            expiry = s.expire_date
+            self._cache_set(data, expiry)
+
+        self._loaded_fingerprint = self._fingerprint(data)
+        self._loaded_expiry = expiry
+        return data
+
+    def _needs_expiry_refresh(self, data):
+        """Чи відстає збережений у БД термін дії від ковзного більше ніж на інтервал"""
+        if self._loaded_expiry is None:
+            return True
+        interval = getattr(settings, 'SESSION_REFRESH_INTERVAL', 60 * 60 * 24)
+        new_expiry = self.get_expiry_date(expiry=data.get('_session_expiry'))
+        return (new_expiry - self._loaded_expiry).total_seconds() > interval
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+
+        data = self._get_session(no_load=must_create)
+        if (not must_create
+                and self._loaded_fingerprint is not None
+                and self._fingerprint(data) == self._loaded_fingerprint
+                and not self._needs_expiry_refresh(data)):
+            # Дані ті самі, термін дії ще свіжий - запис у БД не потрібен
+            return
+
+        super().save(must_create=must_create)
+
+        expiry = self.get_expiry_date(expiry=data.get('_session_expiry'))
+        self._cache_set(data, expiry)
+        self._loaded_fingerprint = self._fingerprint(data)
+        self._loaded_expiry = expiry
+
+    def exists(self, session_key):
+        try:
+            if self._cache.get(self.cache_key_prefix + session_key) is not None:
+                return True
+        except Exception:
+            pass
+        return super().exists(session_key)
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        try:
+            self._cache.delete(self.cache_key_prefix + session_key)
+        except Exception:
+            pass
+        super().delete(session_key)
+
+    def flush(self):
+        """Як у cached_db: видаляє сесію з кешу і БД та скидає ключ"""
+        self.clear()
+        self.delete(self.session_key)
+        self._session_key = None
+        self._loaded_fingerprint = None
+        self._loaded_expiry = None
@@ -0,0 +1,68 @@
+"""
+Компактне представлення кошика та списку бажань у сесії
+
+Кошик (схема v2): плаский масив [2, id1, qty1, id2, qty2, ...] - лише id та кількість,
+ціни обчислюються при читанні з актуальних даних товару.
+Список бажань: відсортований масив int id.
+
+Старі сесії (кошик {"id": {"quantity": n, "price": x}}, список бажань зі str id)
+читаються прозоро і перезаписуються в новому форматі при наступному збереженні.
+"""
+
+CART_SCHEMA_VERSION = 2
+
+
+def pack_cart(lines):
+    """{product_id: quantity} -> [версія, id, qty, ...] (порядок додавання зберігається)"""
+    packed = [CART_SCHEMA_VERSION]
+    for product_id, quantity in lines.items():
+        packed.append(int(product_id))
+        packed.append(int(quantity))
+    return packed
+
+
+def unpack_cart(raw):
+    """Будь-яка збережена версія кошика -> {product_id(int): quantity(int)}"""
+    if not raw:
+        return {}
+
+    # Схема v1: {"<id>": {"quantity": n, "price": float}}
+    if isinstance(raw, dict):
+        lines = {}
+        for product_id, item in raw.items():
+            try:
+                quantity = int(item.get('quantity', 0))
+                product_id = int(product_id)
+            except (AttributeError, TypeError, ValueError):
+                continue
+            if quantity > 0:
+                lines[product_id] = quantity
+        return lines
+
+    if isinstance(raw, list) and raw and raw[0] == CART_SCHEMA_VERSION:
+        body = raw[1:]
+        return {
+            int(product_id): int(quantity)
+            for product_id, quantity in zip(body[0::2], body[1::2])
+            if int(quantity) > 0
+        }
+
+    # Невідома схема - безпечніше почати з порожнього кошика
+    return {}
+
+
+def pack_wishlist(product_ids):
+    return sorted({int(product_id) for product_id in product_ids})
+
+
+def unpack_wishlist(raw):
+    """Список str id (стара схема) або int id -> відсортований список int"""
+    if not raw:
+        return []
+    ids = set()
+    for product_id in raw:
+        try:
+            ids.add(int(product_id))
+        except (TypeError, ValueError):
+            continue
+    return sorted(ids)
@@ -0,0 +1,19 @@
+"""
+Фонові завдання core: management-команди
+"""
+from io import StringIO
+
+from django.core.management import call_command
+
+from .jobs import task
+
+OUTPUT_MAX_LENGTH = 2000
+
+
+@task('core.call_command')
+def run_command(name, args=None, options=None):
+    """Management-команда (імпорти, update_promotions, monitor_payments...) у черзі"""
+    out = StringIO()
+    call_command(name, *(args or []), stdout=out, stderr=out, **(options or {}))
+    return out.getvalue()[-OUTPUT_MAX_LENGTH:]
+
@@ -1,7 +1,7 @@
 """
 Smoke тести для критичних флоу Beauty Shop
 """
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from apps.products.models import Product, Category
 from apps.users.models import CustomUser
@@ -180,3 +180,660 @@ class PerformanceTests(TestCase):
             )
             self.assertEqual(response.status_code, 200)
 
+
+
+class SessionTests(TestCase):
+    """Тести сесій: анонімні відвідувачі без кошика не створюють рядків у БД"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.category = Category.objects.create(
+            name='Тестова категорія',
+            slug='test-category',
+            is_active=True
+        )
+        self.product = Product.objects.create(
+            name='Тестовий товар',
+            slug='test-product',
+            category=self.category,
+            retail_price=100.00,
+            stock=10,
+            is_active=True
+        )
+    
+    def test_anonymous_visit_creates_no_session(self):
+        """Тест: перегляд сторінок без кошика не створює сесію"""
+        from django.contrib.sessions.models import Session
+        
+        self.client.get(reverse('core:home'))
+        self.client.get(reverse('products:category', kwargs={'slug': self.category.slug}))
+        self.assertEqual(Session.objects.count(), 0)
+    
+    def test_unchanged_session_is_not_rewritten(self):
+        """Тест: незмінна сесія не перезаписується на кожному запиті"""
+        from django.contrib.sessions.models import Session
+        from apps.core.session_backend import SessionStore
+        
+        session = SessionStore()
+        session['cart'] = {str(self.product.id): {'quantity': 1, 'price': 100.0}}
+        session.create()
+        
+        loaded = SessionStore(session.session_key)
+        self.assertEqual(loaded['cart'][str(self.product.id)]['quantity'], 1)
+        with self.assertNumQueries(0):
+            loaded.save()
+        
+        loaded['cart'] = {}
+        loaded.save()
+        self.assertEqual(
+            SessionStore(session.session_key).load().get('cart'), {}
+        )
+        self.assertEqual(Session.objects.count(), 1)
+    
+    def test_process_local_session_cache_is_rejected(self):
+        """Тест: LocMemCache для сесій не проходить системну перевірку"""
+        from apps.core.checks import check_session_cache
+        
+        self.assertEqual(check_session_cache(None), [])
+        with override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+            'sessions': {'BACKEND': 'apps.core.cache.MeteredLocMemCache'},
+        }):
+            self.assertEqual([error.id for error in check_session_cache(None)], ['core.E003'])
+        with override_settings(SESSION_CACHE_ALIAS='default'):
+            self.assertEqual([error.id for error in check_session_cache(None)], ['core.E001'])
+    
+    def test_legacy_cart_and_wishlist_migrate(self):
+        """Тест: старий формат кошика/списку бажань читається і перезаписується компактно"""
+        session = self.client.session
+        session['cart'] = {str(self.product.id): {'quantity': 2, 'price': 1.0}}
+        session['wishlist'] = [str(self.product.id)]
+        session.save()
+        
+        response = self.client.post(
+            reverse('cart:add', kwargs={'product_id': self.product.id}),
+            {'quantity': 1},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        data = response.json()
+        self.assertEqual(data['item']['quantity'], 3)
+        # Ціна береться з товару, а не зі збереженої в сесії
+        self.assertEqual(data['cart']['total_price'], 300.0)
+        self.assertEqual(self.client.session['cart'], [2, self.product.id, 3])
+        
+        self.client.post(reverse('wishlist:remove', kwargs={'product_id': self.product.id}))
+        self.assertNotIn('wishlist', self.client.session)
+
+
+class AuthGenerationTests(TestCase):
+    """Тести перевірки сесії без повторного запиту користувача"""
+    
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='wholesale',
+            email='wholesale@example.com',
+            password='TestPass123!',
+            is_active=True
+        )
+        self.client.force_login(self.user)
+    
+    def test_validation_does_not_refetch_user(self):
+        """Тест: middleware не робить додаткового запиту користувача"""
+        from django.test import RequestFactory
+        from apps.users.middleware import ValidateUserMiddleware
+        
+        request = RequestFactory().get('/')
+        request.session = self.client.session
+        request.session.keys()  # завантаження сесії (з БД при DummyCache) не рахуємо
+        # Користувача вже завантажив AuthenticationMiddleware
+        request.user = CustomUser.objects.get(pk=self.user.pk)
+        middleware = ValidateUserMiddleware(lambda r: None)
+        with self.assertNumQueries(0):
+            middleware(request)
+        self.assertEqual(request.user, self.user)
+    
+    def test_deactivated_user_is_logged_out(self):
+        """Тест: деактивація користувача анулює його сесію"""
+        from django.contrib.auth import SESSION_KEY
+        
+        self.user.is_active = False
+        self.user.save()
+        
+        self.client.get(reverse('core:home'))
+        self.assertNotIn(SESSION_KEY, self.client.session)
+    
+    def test_saving_inactive_user_does_not_bump_generation(self):
+        """Тест: покоління змінюється лише при деактивації, а не при кожному save() неактивного"""
+        inactive = CustomUser.objects.create_user(
+            username='pending', email='pending@example.com', password='TestPass123!', is_active=False
+        )
+        inactive = CustomUser.objects.get(pk=inactive.pk)
+        inactive.first_name = 'Новий'
+        inactive.save()
+        inactive.generate_email_verification_code()
+        self.assertEqual(CustomUser.objects.get(pk=inactive.pk).auth_generation, 0)
+        
+        user = CustomUser.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        user.save()
+        self.assertEqual(CustomUser.objects.get(pk=self.user.pk).auth_generation, 1)
+    
+    def test_generation_is_durable_and_shared(self):
+        """Тест: очищення кешу не розлогінює, а зміна покоління з іншого процесу - так"""
+        from django.contrib.auth import SESSION_KEY
+        from django.core.cache import cache
+        from apps.users.auth_generation import bump_generation
+        
+        cache.clear()
+        self.client.get(reverse('core:home'))
+        self.assertIn(SESSION_KEY, self.client.session)
+        
+        # Як з run_jobs або shell: окремий екземпляр користувача
+        bump_generation(CustomUser.objects.get(pk=self.user.pk))
+        self.client.get(reverse('core:home'))
+        self.assertNotIn(SESSION_KEY, self.client.session)
+
+
+@override_settings(
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'sessions': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    },
+    LOGIN_FAILURE_LIMIT=3,
+)
+class LoginLookupTests(TestCase):
+    """Тести пошуку користувача при вході та обмеження спроб"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.admin = CustomUser.objects.create_user(
+            username='Manager',
+            email='Manager@Example.com',
+            phone='+380501234567',
+            password='TestPass123!',
+            is_staff=True
+        )
+    
+    def test_admin_lookup_single_query(self):
+        """Тест: логін, email та телефон знаходяться одним запитом"""
+        from apps.users.backends import resolve_user
+        
+        for identifier in ('manager', 'manager@example.com', '050 123 45 67', '380501234567'):
+            with self.assertNumQueries(1):
+                self.assertEqual(resolve_user(identifier), self.admin)
+    
+    def test_failed_attempts_are_throttled(self):
+        """Тест: після ліміту невдалих спроб вхід блокується навіть з вірним паролем"""
+        from django.contrib.auth import authenticate
+        from django.test import RequestFactory
+        
+        request = RequestFactory().post('/admin/login/')
+        for _ in range(3):
+            self.assertIsNone(authenticate(request, username='manager', password='wrong'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(authenticate(request, username='manager', password='TestPass123!'))
+    
+    def test_lockout_is_per_ip(self):
+        """Тест: невдалі спроби з чужої IP не блокують вхід адміністратора"""
+        from django.contrib.auth import authenticate
+        from django.test import RequestFactory
+        
+        attacker = RequestFactory().post('/admin/login/', REMOTE_ADDR='203.0.113.5')
+        for _ in range(3):
+            self.assertIsNone(authenticate(attacker, username='manager', password='wrong'))
+        
+        owner = RequestFactory().post('/admin/login/', REMOTE_ADDR='198.51.100.7')
+        self.assertEqual(authenticate(owner, username='manager', password='TestPass123!'), self.admin)
+    
+    def test_cabinet_login_failure_single_user_query(self):
+        """Тест: невдалий вхід у кабінет - один пошук користувача, причина без повторного запиту"""
+        from django.contrib.messages import get_messages
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        CustomUser.objects.create_user(
+            username='client', email='client@example.com', password='TestPass123!', is_wholesale=True
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('users:login'), {
+                'username': 'Client@Example.com', 'password': 'wrong',
+            })
+        self.assertEqual(response.status_code, 200)
+        user_queries = [q for q in ctx.captured_queries if 'FROM "users_customuser"' in q['sql']]
+        self.assertEqual(len(user_queries), 1)
+        self.assertIn('Невірний пароль', [str(m) for m in get_messages(response.wsgi_request)][0])
+        
+        response = self.client.post(reverse('users:login'), {
+            'username': 'client@example.com', 'password': 'TestPass123!',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(int(self.client.session['_auth_user_id']), CustomUser.objects.get(username='client').pk)
+    
+    def test_cabinet_login_rejects_staff(self):
+        """Тест: адміністратор не входить у кабінет навіть з вірним паролем"""
+        from django.contrib.messages import get_messages
+        
+        response = self.client.post(reverse('users:login'), {
+            'username': 'manager@example.com', 'password': 'TestPass123!',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('_auth_user_id', self.client.session)
+        self.assertIn('/admin/', [str(m) for m in get_messages(response.wsgi_request)][0])
+    
+    @override_settings(TRUSTED_PROXY_COUNT=1)
+    def test_client_ip_ignores_spoofed_forwarded_for(self):
+        """Тест: IP береться із запису проксі, а не з підробленого лівого X-Forwarded-For"""
+        from django.test import RequestFactory
+        from apps.users.login_throttle import get_client_ip
+        
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='1.2.3.4, 203.0.113.5', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(get_client_ip(request), '203.0.113.5')
+        with override_settings(TRUSTED_PROXY_COUNT=0):
+            self.assertEqual(get_client_ip(request), '10.0.0.1')
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_OUTBOX_ASYNC=False,
+)
+class EmailOutboxTests(TestCase):
+    """Тести черги транзакційних листів"""
+    
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='client',
+            email='client@example.com',
+            password='TestPass123!'
+        )
+    
+    def test_code_email_is_queued_not_sent_inline(self):
+        """Тест: код підтвердження ставиться в чергу разом зі збереженням коду"""
+        from django.core import mail
+        from apps.core.models import OutboxEmail
+        from apps.users.utils import send_verification_code_email
+        
+        self.assertTrue(send_verification_code_email(self.user, None))
+        self.assertEqual(mail.outbox, [])
+        
+        queued = OutboxEmail.objects.get()
+        self.assertEqual((queued.to, queued.kind, queued.status), ('client@example.com', 'verification_code', 'pending'))
+        self.assertIn(self.user.email_verification_code, queued.html_body)
+    
+    def test_drain_sends_and_marks_sent(self):
+        """Тест: обробник відправляє пачку і позначає листи відправленими"""
+        from django.core import mail
+        from apps.core import outbox
+        from apps.core.models import OutboxEmail
+        
+        for i in range(3):
+            outbox.enqueue_email(f'user{i}@example.com', 'Тема', html_message='<p>Текст</p>')
+        
+        self.assertEqual(outbox.drain(batch_size=2), (3, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].body, 'Текст')
+        self.assertFalse(OutboxEmail.objects.exclude(status='sent').exists())
+        self.assertEqual(outbox.queue_stats()['pending'], 0)
+    
+    def test_smtp_outage_backs_off(self):
+        """Тест: недоступна пошта не губить лист, а відкладає його з затримкою"""
+        from unittest import mock
+        from apps.core import outbox
+        from apps.core.models import OutboxEmail
+        
+        email = outbox.enqueue_email('user@example.com', 'Тема', message='Текст')
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('SMTP down')):
+            self.assertEqual(outbox.drain(), (0, 1))
+        
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertIn('SMTP down', email.last_error)
+        self.assertGreater(email.available_at, email.created_at)
+        # Затримка ще не минула - повторної спроби немає
+        self.assertEqual(outbox.drain(), (0, 0))
+        
+        OutboxEmail.objects.update(available_at=email.created_at)
+        self.assertEqual(outbox.drain(), (1, 0))
+
+
+class JobQueueTests(TestCase):
+    """Тести черги фонових завдань"""
+    
+    def setUp(self):
+        from apps.core import jobs
+        self.calls = calls = []
+        
+        @jobs.task('tests.record')
+        def record(value, fail=False):
+            calls.append(value)
+            if fail:
+                raise ValueError('boom')
+            return {'value': value}
+    
+    def test_priority_and_schedule(self):
+        """Тест: пріоритетні завдання першими, відкладені - не раніше часу"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.core import jobs
+        
+        jobs.enqueue('tests.record', {'value': 'low'}, priority=jobs.PRIORITY_LOW)
+        jobs.enqueue('tests.record', {'value': 'high'}, priority=jobs.PRIORITY_HIGH)
+        later = jobs.enqueue('tests.record', {'value': 'later'}, run_at=timezone.now() + timedelta(hours=1))
+        
+        self.assertEqual(jobs.run_pending(), 2)
+        self.assertEqual(self.calls, ['high', 'low'])
+        later.refresh_from_db()
+        self.assertEqual(later.status, 'queued')
+    
+    def test_retry_with_backoff_then_fail(self):
+        """Тест: помилка - повтор із затримкою, після max_attempts - failed"""
+        from apps.core import jobs
+        from apps.core.models import Job
+        
+        job = jobs.enqueue('tests.record', {'value': 1, 'fail': True}, max_attempts=2)
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertIn('boom', job.last_error)
+        self.assertEqual(jobs.run_pending(), 0)
+        
+        Job.objects.update(run_at=job.created_at)
+        jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertIsNotNone(job.duration_ms)
+    
+    def test_dedupe_key(self):
+        """Тест: одне активне завдання на ключ"""
+        from apps.core import jobs
+        
+        first = jobs.enqueue('tests.record', {'value': 1}, dedupe_key='same')
+        second = jobs.enqueue('tests.record', {'value': 2}, dedupe_key='same')
+        self.assertEqual(first.pk, second.pk)
+        jobs.run_pending()
+        self.assertNotEqual(jobs.enqueue('tests.record', {'value': 3}, dedupe_key='same').pk, first.pk)
+    
+    def test_claim_is_exclusive(self):
+        """Тест: захоплене завдання не бере інший обробник"""
+        from apps.core import jobs
+        
+        jobs.enqueue('tests.record', {'value': 1})
+        self.assertIsNotNone(jobs.claim('worker-a'))
+        self.assertIsNone(jobs.claim('worker-b'))
+    
+    @override_settings(
+        EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        CAMPAIGN_WORKERS=1,
+        CAMPAIGN_RATE_LIMITS={'default': 0},
+    )
+    def test_campaign_send_is_enqueued(self):
+        """Тест: відправка розсилки з адмінки лише ставить завдання в чергу"""
+        from django.core import mail
+        from apps.core import jobs
+        from apps.core.models import Job, Newsletter
+        from apps.orders.campaigns import start_campaign
+        from apps.orders.models import EmailCampaign
+        
+        Newsletter.objects.create(email='reader@example.com')
+        campaign = EmailCampaign.objects.create(name='Акція', subject='Акція', content='-', recipients=['newsletter'])
+        
+        self.assertTrue(start_campaign(campaign))
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(Job.objects.get().task, 'orders.send_campaign')
+        
+        jobs.run_pending()
+        self.assertEqual([m.to[0] for m in mail.outbox], ['reader@example.com'])
+        self.assertEqual(Job.objects.get().result['sent'], 1)
+
+
+class InstrumentationTests(TestCase):
+    """Тести інструментування запитів"""
+    
+    def setUp(self):
+        from apps.core import instrumentation
+        
+        instrumentation.store.clear()
+        self.addCleanup(instrumentation.store.clear)
+    
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_disabled_records_nothing(self):
+        """Тест: при вимкненій вибірці нічого не вимірюється"""
+        from apps.core import instrumentation
+        
+        self.client.get(reverse('core:about'))
+        self.assertEqual(instrumentation.store.summary(), {})
+    
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=1, INSTRUMENTATION_SLOW_MS=0)
+    def test_sampled_request_is_recorded_and_logged(self):
+        """Тест: вимір по імені view, структурований лог при перевищенні порогу"""
+        import json
+        from apps.core import instrumentation
+        
+        with self.assertLogs('apps.core.instrumentation', level='WARNING') as logs:
+            response = self.client.get(reverse('core:about'))
+        
+        stats = instrumentation.store.summary()['core:about']
+        self.assertEqual(stats['count'], 1)
+        self.assertEqual(stats['size']['max'], len(response.content))
+        self.assertGreater(stats['render_ms']['max'], 0)
+        
+        line = json.loads(logs.records[0].getMessage().split(' ', 1)[1])
+        self.assertEqual(line['view'], 'core:about')
+        self.assertIn('slow', line['problems'])
+    
+    def test_fingerprint_groups_in_lists(self):
+        """Тест: запити з різною довжиною IN (...) мають один відбиток"""
+        from apps.core.instrumentation import fingerprint
+        
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s)'),
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s, %s)'),
+        )
+    
+    def test_stats_endpoint_is_staff_only(self):
+        """Тест: перцентилі доступні лише персоналу"""
+        url = reverse('core:performance_stats')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        
+        staff = CustomUser.objects.create_user(
+            username='staff', email='staff@example.com', password='TestPass123!', is_staff=True
+        )
+        self.client.force_login(staff)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('views', response.json())
+
+
+class LoadTestToolTests(TestCase):
+    """Тести інструмента навантажувального тестування"""
+    
+    def test_novaposhta_stub_serves_api_client(self):
+        """Тест: клієнт Нової Пошти працює із заглушкою через NOVA_POSHTA_API_URL"""
+        from apps.core.loadtest import STUB_CITY_REF, start_np_stub
+        from apps.orders.novaposhta import NovaPoshtaAPI
+        
+        server = start_np_stub(latency_ms=0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        
+        with override_settings(NOVA_POSHTA_API_URL=f'http://127.0.0.1:{server.server_port}/'):
+            api = NovaPoshtaAPI()
+            cities = api.search_cities('Київ')
+            warehouses = api.get_warehouses(STUB_CITY_REF)
+        
+        self.assertEqual(cities[0]['ref'], STUB_CITY_REF)
+        self.assertEqual(len(warehouses), 50)
+    
+    def test_summary_reports_throughput_percentiles_and_errors(self):
+        """Тест: звіт рахує пропускну здатність, перцентилі і помилки по кроках"""
+        from apps.core.loadtest import Shopper, summarize
+        
+        shopper = Shopper(0, 'http://testserver', {'products': []}, 'LOADTEST')
+        shopper.samples = [('home', 0.1, True, 200)] * 9 + [('home', 1.0, False, 500)]
+        shopper.journeys = 5
+        
+        report = summarize([shopper], elapsed=2)
+        
+        self.assertEqual(report['requests'], 10)
+        self.assertEqual(report['throughput_rps'], 5)
+        self.assertEqual(report['error_rate'], 0.1)
+        self.assertEqual(report['steps']['home']['statuses'], {'500': 1})
+        self.assertEqual(report['steps']['home']['p50_ms'], 100)
+        self.assertEqual(report['steps']['home']['max_ms'], 1000)
+
+
+class ProfilingTests(TestCase):
+    """Тести профілювання запитів"""
+    
+    def setUp(self):
+        self.staff = CustomUser.objects.create_user(
+            username='staff', email='staff@example.com', password='TestPass123!', is_staff=True, is_superuser=True
+        )
+    
+    def test_disabled_by_default(self):
+        """Тест: без PROFILING_ENABLED запит персоналу не профілюється"""
+        from apps.core.models import ProfileCapture
+        
+        self.client.force_login(self.staff)
+        self.client.get(reverse('core:about'), {'_profile': '1'})
+        self.assertFalse(ProfileCapture.objects.exists())
+    
+    @override_settings(PROFILING_ENABLED=True)
+    def test_only_staff_can_request_profile(self):
+        """Тест: анонімний ?_profile=1 ігнорується"""
+        from apps.core.models import ProfileCapture
+        
+        self.client.get(reverse('core:about'), {'_profile': '1'})
+        self.assertFalse(ProfileCapture.objects.exists())
+    
+    @override_settings(PROFILING_ENABLED=True)
+    def test_staff_profile_is_stored_and_shown_in_admin(self):
+        """Тест: cProfile-профіль зберігається, відкривається в адмінці і завантажується"""
+        from apps.core.models import ProfileCapture
+        
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('core:about'), HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        
+        capture = ProfileCapture.objects.get()
+        self.assertEqual((capture.view_name, capture.mode, capture.trigger), ('core:about', 'cprofile', 'request'))
+        self.assertIn('cumulative', capture.report)
+        
+        page = self.client.get(reverse('admin:core_profilecapture_change', args=[capture.pk]))
+        self.assertContains(page, 'profile-')
+        download = self.client.get(reverse('admin:core_profilecapture_download', args=[capture.pk]))
+        self.assertEqual(download['Content-Type'], 'application/octet-stream')
+    
+    @override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_EVERY=2, PROFILING_SAMPLE_INTERVAL=0.001)
+    def test_every_nth_request_is_sampled(self):
+        """Тест: кожен N-й запит view знімається семплером"""
+        from apps.core import profiling
+        from apps.core.models import ProfileCapture
+        
+        profiling._counters.clear()
+        for _ in range(4):
+            self.client.get(reverse('core:about'))
+        
+        self.assertEqual(ProfileCapture.objects.filter(mode='sampling', trigger='sampled').count(), 2)
+    
+    @override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_EVERY=0)
+    def test_no_resolve_without_sampling(self):
+        """Тест: без семплювання middleware не резолвить URL запиту"""
+        from unittest import mock
+        from apps.core import middleware
+        
+        with mock.patch.object(middleware, 'resolve', wraps=middleware.resolve) as resolve:
+            response = self.client.get(reverse('core:about'))
+        self.assertEqual(response.status_code, 200)
+        resolve.assert_not_called()
+    
+    def test_flame_graph_widths_follow_sample_counts(self):
+        """Тест: flame graph будується зі згорнутих стеків"""
+        from apps.core.profiling import flame_tree, render_flame_graph
+        
+        stacks = {'main;view;render': 3, 'main;view;query': 1}
+        tree = flame_tree(stacks)
+        self.assertEqual(tree['children']['main']['children']['view']['children']['render']['value'], 3)
+        self.assertIn('flex:0 0 75.0%', render_flame_graph(stacks))
+
+
+class MetricsTests(TestCase):
+    """Тести метрик у форматі Prometheus"""
+    
+    def test_histogram_rendering(self):
+        """Тест: гістограма рендериться з кумулятивними bucket, _sum і _count"""
+        from apps.core.metrics import Histogram, Registry
+        
+        registry = Registry()
+        histogram = Histogram('test_seconds', 'Тест', ['view'], buckets=(0.1, 1), registry=registry)
+        histogram.observe(0.05, view='a')
+        histogram.observe(0.5, view='a')
+        histogram.observe(5, view='a')
+        
+        text = registry.render()
+        self.assertIn('# TYPE test_seconds histogram', text)
+        self.assertIn('test_seconds_bucket{view="a",le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{view="a",le="1"} 2', text)
+        self.assertIn('test_seconds_bucket{view="a",le="+Inf"} 3', text)
+        self.assertIn('test_seconds_sum{view="a"} 5.55', text)
+        self.assertIn('test_seconds_count{view="a"} 3', text)
+    
+    def test_snapshots_of_other_processes_are_merged(self):
+        """Тест: /metrics підсумовує знімки інших воркерів з METRICS_MULTIPROCESS_DIR"""
+        import json
+        import os
+        import tempfile
+        from apps.core.metrics import Counter, Registry
+        
+        registry = Registry()
+        counter = Counter('test_total', 'Тест', ['status'], registry=registry)
+        counter.inc(2, status='ok')
+        
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_MULTIPROCESS_DIR=directory):
+            with open(os.path.join(directory, f'{os.getpid() + 1}.json'), 'w', encoding='utf-8') as f:
+                json.dump({'test_total': [[['ok'], 3], [['error'], 1]]}, f)
+            registry.flush()
+            self.assertTrue(os.path.exists(os.path.join(directory, f'{os.getpid()}.json')))
+            
+            collected = registry.collect()
+        
+        self.assertEqual(collected['test_total'], {('ok',): 5, ('error',): 1})
+    
+    def test_endpoint_requires_staff_or_token(self):
+        """Тест: /metrics закритий для анонімів, відкритий персоналу і за токеном"""
+        url = reverse('core:metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        
+        with override_settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            response = self.client.get(url, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertContains(response, 'shop_email_outbox_messages{status="pending"} 0')
+        
+        staff = CustomUser.objects.create_user(
+            username='staff', email='staff@example.com', password='TestPass123!', is_staff=True
+        )
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
+    
+    @override_settings(METRICS_ENABLED=True)
+    def test_requests_are_counted_per_view(self):
+        """Тест: middleware рахує запити і SQL по view"""
+        from apps.core import metrics
+        
+        before = metrics.HTTP_REQUESTS.value(view='core:about', method='GET', status='2xx')
+        self.client.get(reverse('core:about'))
+        self.assertEqual(metrics.HTTP_REQUESTS.value(view='core:about', method='GET', status='2xx'), before + 1)
+        self.assertIn(['core:about'], [key for key, _ in metrics.DB_QUERIES.snapshot()])
+    
+    @override_settings(METRICS_ENABLED=True)
+    def test_unknown_methods_share_one_label(self):
+        """Тест: довільний метод запиту не створює нову серію метрик"""
+        from apps.core import metrics
+        
+        before = metrics.HTTP_REQUESTS.value(view='core:about', method='other', status='4xx')
+        self.client.generic('FOOBAR', reverse('core:about'))
+        self.assertEqual(metrics.HTTP_REQUESTS.value(view='core:about', method='other', status='4xx'), before + 1)
+        self.assertNotIn('FOOBAR', [key[1] for key, _ in metrics.HTTP_REQUESTS.snapshot()])
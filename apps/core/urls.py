@@ -19,5 +19,8 @@ urlpatterns = [
     # Нові юридичні сторінки
     path('terms/', views.TermsView.as_view(), name='terms'),
     path('privacy/', views.PrivacyView.as_view(), name='privacy'),
+
+    path('internal/performance/', views.performance_stats, name='performance_stats'),
+    path('metrics', views.metrics_view, name='metrics'),
     
 ]
@@ -1,13 +1,18 @@
 """
 Core Views - основні представлення сайту
 """
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
 from django.shortcuts import render
 from django.views.generic import TemplateView
 from django.views.decorators.csrf import ensure_csrf_cookie
+from django.utils.crypto import constant_time_compare
 from django.utils.decorators import method_decorator
 from django.db.models import Q
 from apps.products.models import Product, Category, NewProduct
 from apps.blog.models import Article
+from . import instrumentation, metrics
 from .models import Banner
 
 
@@ -113,3 +118,27 @@ class SearchView(TemplateView):
             })
         
         return context
+
+
+@staff_member_required
+def performance_stats(request):
+    """Перцентилі часу, SQL і розміру відповіді по view (лише поточний процес)"""
+    if request.method == 'POST':
+        instrumentation.store.clear()
+    return JsonResponse({
+        'sample_rate': getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 0),
+        'views': instrumentation.store.summary(),
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+def metrics_view(request):
+    """Метрики у форматі Prometheus: персонал або Authorization: Bearer METRICS_TOKEN"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    authorization = request.headers.get('Authorization', '')
+    allowed = (
+        (request.user.is_authenticated and request.user.is_staff)
+        or (token and constant_time_compare(authorization, f'Bearer {token}'))
+    )
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
@@ -4,13 +4,18 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
-from django.db.models import Q, Count, Max
+from django.db.models import Q, Count, F, Max, OuterRef, Subquery, Window
+from django.db.models.functions import Coalesce, Lower
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.urls import path, reverse
 from datetime import datetime, timedelta
-from .models import Order, OrderItem, RetailClient, EmailCampaign, PendingPayment
+from .models import Order, OrderItem, RetailClient, EmailCampaign, PendingPayment, CustomerStats
+from . import campaigns, customer_stats
+from .dashboard import get_dashboard
+from .exports import OrderExport
 from apps.core.admin_utils import AdminMediaMixin
+from apps.core.exports import ExportAdminMixin
 
 
 class OrderItemInline(admin.TabularInline):
@@ -27,7 +32,7 @@ class OrderItemInline(admin.TabularInline):
 
 
 @admin.register(Order)
-class OrderAdmin(AdminMediaMixin, admin.ModelAdmin):
+class OrderAdmin(ExportAdminMixin, AdminMediaMixin, admin.ModelAdmin):
     """Адміністрування замовлень з розширеними фільтрами"""
     
     list_display = [
@@ -84,8 +89,10 @@ class OrderAdmin(AdminMediaMixin, admin.ModelAdmin):
     
     actions = [
         'mark_as_confirmed', 'mark_as_shipped', 'mark_as_delivered',
-        'mark_as_completed', 'mark_as_cancelled'
+        'mark_as_completed', 'mark_as_cancelled',
+        'export_to_csv', 'export_csv_background'
     ]
+    export_class = OrderExport
     
     def get_queryset(self, request):
         """Оптимізуємо запити"""
@@ -288,39 +295,36 @@ class OrderAdmin(AdminMediaMixin, admin.ModelAdmin):
     
     def mark_as_confirmed(self, request, queryset):
         """Підтвердити замовлення"""
-        updated = queryset.update(status='confirmed')
+        updated = customer_stats.update_orders(queryset, status='confirmed')
         self.message_user(request, f"Підтверджено {updated} замовлень")
     mark_as_confirmed.short_description = "✓ Підтвердити замовлення"
     
     def mark_as_shipped(self, request, queryset):
         """Відправити замовлення"""
-        updated = queryset.update(status='shipped')
+        updated = customer_stats.update_orders(queryset, status='shipped')
         self.message_user(request, f"Відправлено {updated} замовлень")
     mark_as_shipped.short_description = "📦 Відправити замовлення"
     
     def mark_as_delivered(self, request, queryset):
         """Доставлено замовлення"""
-        updated = queryset.update(status='delivered')
+        updated = customer_stats.update_orders(queryset, status='delivered')
         self.message_user(request, f"Доставлено {updated} замовлень")
     mark_as_delivered.short_description = "🚚 Доставлено"
     
     def mark_as_completed(self, request, queryset):
         """Завершити замовлення"""
-        updated = queryset.update(status='completed', is_paid=True)
+        updated = customer_stats.update_orders(queryset, status='completed', is_paid=True)
         self.message_user(request, f"Завершено {updated} замовлень (автоматично позначено як оплачені)")
     mark_as_completed.short_description = "✅ Завершено замовлення"
     
     def mark_as_cancelled(self, request, queryset):
         """Скасувати замовлення"""
-        updated = queryset.update(status='cancelled')
+        updated = customer_stats.update_orders(queryset, status='cancelled')
         self.message_user(request, f"Скасовано {updated} замовлень")
     mark_as_cancelled.short_description = "✗ Скасувати замовлення"
     
     def changelist_view(self, request, extra_context=None):
-        """Додаємо статистику зверху"""
-        from django.utils import timezone
-        from datetime import datetime
-        
+        """Додаємо статистику зверху (один агрегатний запит, кеш - див. apps.orders.dashboard)"""
         response = super().changelist_view(request, extra_context)
         
         try:
@@ -328,27 +332,7 @@ class OrderAdmin(AdminMediaMixin, admin.ModelAdmin):
         except (AttributeError, KeyError):
             return response
         
-        today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_qs = qs.filter(created_at__gte=today_start)
-        
-        stats = {
-            'pending': qs.filter(status='pending').count(),
-            'in_progress': qs.filter(status__in=['confirmed', 'shipped', 'delivered']).count(),
-            'completed': qs.filter(status='completed').count(),
-        }
-        
-        today_stats = {
-            'new_orders': today_qs.count(),
-            'total_amount': sum(order.total for order in today_qs),
-            'shipped': today_qs.filter(status='shipped').count(),
-            'cancelled': today_qs.filter(status='cancelled').count(),
-            'date': timezone.now().strftime('%d.%m.%Y'),
-        }
-        
-        extra_context = extra_context or {}
-        extra_context['order_stats'] = stats
-        extra_context['today_stats'] = today_stats
-        response.context_data.update(extra_context)
+        response.context_data.update(get_dashboard(request, qs))
         
         return response
 
@@ -386,20 +370,26 @@ class RetailClientAdmin(AdminMediaMixin, admin.ModelAdmin):
     ]
     
     def get_queryset(self, request):
-        """Показуємо тільки замовлення без користувача (унікальні по email)"""
+        """
+        Показуємо останнє замовлення кожного гостя (унікальні по email).
+        Статистика підтягується з CustomerStats підзапитами в тому ж SQL.
+        """
         qs = super().get_queryset(request)
-        guest_orders = qs.filter(user__isnull=True).order_by('email', '-created_at')
-        
-        seen_emails = set()
-        unique_orders_ids = []
-        
-        for order in guest_orders:
-            email_lower = order.email.lower()
-            if email_lower not in seen_emails:
-                seen_emails.add(email_lower)
-                unique_orders_ids.append(order.id)
-        
-        return qs.filter(id__in=unique_orders_ids).order_by('-created_at')
+        stats = CustomerStats.objects.filter(user__isnull=True, email=Lower(OuterRef('email')))
+        
+        def stat(field):
+            return Subquery(stats.values(field)[:1])
+        
+        return qs.filter(
+            user__isnull=True,
+            id__in=CustomerStats.objects.filter(user__isnull=True).values('last_order_id')
+        ).annotate(
+            orders_count=Coalesce(stat('orders_count'), 0),
+            total_spent=stat('total_spent'),
+            paid_count=Coalesce(stat('paid_count'), 0),
+            completed_count=Coalesce(stat('completed_count'), 0),
+            last_order_date=stat('last_order_at'),
+        ).order_by('-created_at')
     
     def get_full_name_display(self, obj):
         """Повне ім'я для таблиці"""
@@ -428,42 +418,36 @@ class RetailClientAdmin(AdminMediaMixin, admin.ModelAdmin):
     
     def get_orders_count(self, obj):
         """Кількість замовлень клієнта"""
-        count = Order.objects.filter(user__isnull=True, email=obj.email).count()
-        return format_html('<strong>{}</strong>', count)
+        return format_html('<strong>{}</strong>', obj.orders_count)
     get_orders_count.short_description = 'Замовлень'
+    get_orders_count.admin_order_field = 'orders_count'
     
     def get_total_amount(self, obj):
         """Загальна сума всіх замовлень"""
-        from django.db.models import Sum
-        result = Order.objects.filter(user__isnull=True, email=obj.email).aggregate(Sum('total'))
-        total = result['total__sum']
-        if total:
-            amount = float(total)
+        if obj.total_spent:
+            amount = float(obj.total_spent)
             return format_html('<strong>{} ₴</strong>', f'{amount:.2f}')
         return '—'
     get_total_amount.short_description = 'Загальна сума'
+    get_total_amount.admin_order_field = 'total_spent'
     
     def get_avg_order(self, obj):
         """Середній чек"""
-        from django.db.models import Avg
-        result = Order.objects.filter(user__isnull=True, email=obj.email).aggregate(Avg('total'))
-        avg = result['total__avg']
-        if avg:
-            amount = float(avg)
+        if obj.orders_count and obj.total_spent:
+            amount = float(obj.total_spent) / obj.orders_count
             return format_html('<strong>{} ₴</strong>', f'{amount:.2f}')
         return '—'
     get_avg_order.short_description = 'Середній чек'
     
     def get_last_order_date(self, obj):
         """Дата останнього замовлення"""
-        last_order = Order.objects.filter(user__isnull=True, email=obj.email).order_by('-created_at').first()
-        if last_order:
+        if obj.last_order_date:
             from django.utils import timezone
             now = timezone.now()
-            diff = now - last_order.created_at
+            diff = now - obj.last_order_date
             days = diff.days
             
-            date_str = last_order.created_at.strftime('%d.%m.%Y о %H:%M')
+            date_str = obj.last_order_date.strftime('%d.%m.%Y о %H:%M')
             if days == 0:
                 return format_html('<span style="color: #28a745;">{} (сьогодні)</span>', date_str)
             elif days < 7:
@@ -472,23 +456,32 @@ class RetailClientAdmin(AdminMediaMixin, admin.ModelAdmin):
                 return date_str
         return 'немає замовлень'
     get_last_order_date.short_description = 'Останнє замовлення'
+    get_last_order_date.admin_order_field = 'last_order_date'
     
     def get_most_common_delivery(self, obj):
-        """Найчастіше використовувані дані доставки"""
-        from collections import Counter
-        
-        orders = Order.objects.filter(user__isnull=True, email=obj.email)
+        """
+        Найчастіше використовувані дані доставки.
+        Один запит: віконні COUNT(*) OVER (PARTITION BY ...) по кожному полю,
+        DISTINCT зводить рядки до унікальних комбінацій.
+        """
+        rows = list(
+            Order.objects.filter(user__isnull=True, email__iexact=obj.email)
+            .annotate(
+                city_n=Window(Count('id'), partition_by=[F('delivery_city')]),
+                address_n=Window(Count('id'), partition_by=[F('delivery_address')]),
+                method_n=Window(Count('id'), partition_by=[F('delivery_method')]),
+            )
+            .order_by()
+            .values_list('delivery_city', 'city_n', 'delivery_address', 'address_n', 'delivery_method', 'method_n')
+            .distinct()
+        )
         
-        if not orders.exists():
+        if not rows:
             return format_html('<p style="color: #6c757d;">Немає замовлень</p>')
         
-        cities = Counter(orders.values_list('delivery_city', flat=True))
-        addresses = Counter(orders.values_list('delivery_address', flat=True))
-        methods = Counter(orders.values_list('delivery_method', flat=True))
-        
-        most_common_city = cities.most_common(1)[0] if cities else ('—', 0)
-        most_common_address = addresses.most_common(1)[0] if addresses else ('—', 0)
-        most_common_method = methods.most_common(1)[0] if methods else ('—', 0)
+        most_common_city = max(((row[0], row[1]) for row in rows), key=lambda pair: pair[1])
+        most_common_address = max(((row[2], row[3]) for row in rows), key=lambda pair: pair[1])
+        most_common_method = max(((row[4], row[5]) for row in rows), key=lambda pair: pair[1])
         
         method_display = dict(Order.DELIVERY_METHOD_CHOICES).get(most_common_method[0], most_common_method[0])
         
@@ -509,21 +502,17 @@ class RetailClientAdmin(AdminMediaMixin, admin.ModelAdmin):
     get_most_common_delivery.short_description = 'Найчастіші дані доставки'
     
     def get_retail_orders_stats(self, obj):
-        """Детальна статистика замовлень роздрібного клієнта"""
-        from django.db.models import Sum
-        
-        orders = Order.objects.filter(user__isnull=True, email=obj.email)
-        count = orders.count()
+        """Детальна статистика замовлень роздрібного клієнта (з анотацій get_queryset)"""
+        count = obj.orders_count
         
         if not count:
             return format_html('<p style="color: #6c757d;">Клієнт ще не робив замовлень</p>')
         
-        total = orders.aggregate(Sum('total'))['total__sum']
-        total = float(total) if total else 0
+        total = float(obj.total_spent) if obj.total_spent else 0
         avg = total / count if count else 0
         
-        paid_count = orders.filter(is_paid=True).count()
-        completed_count = orders.filter(status='completed').count()
+        paid_count = obj.paid_count
+        completed_count = obj.completed_count
         
         html = f'''
         <div style="background: #f8f9fa; padding: 15px; border-radius: 8px; border-left: 4px solid #007bff;">
@@ -549,7 +538,9 @@ class RetailClientAdmin(AdminMediaMixin, admin.ModelAdmin):
     
     def get_retail_orders_timeline(self, obj):
         """Останні 5 замовлень роздрібного клієнта"""
-        orders = Order.objects.filter(user__isnull=True, email=obj.email).order_by('-created_at')[:5]
+        orders = list(
+            Order.objects.filter(user__isnull=True, email__iexact=obj.email).order_by('-created_at')[:5]
+        )
         
         if not orders:
             return format_html('<p style="color: #6c757d;">Немає замовлень</p>')
@@ -580,7 +571,7 @@ class RetailClientAdmin(AdminMediaMixin, admin.ModelAdmin):
         
         html += '</table></div>'
         
-        total_count = Order.objects.filter(user__isnull=True, email=obj.email).count()
+        total_count = obj.orders_count
         if total_count > 5:
             from django.urls import reverse
             url = reverse('admin:orders_order_changelist') + f'?email={obj.email}'
@@ -620,7 +611,8 @@ class EmailCampaignAdmin(AdminMediaMixin, admin.ModelAdmin):
     search_fields = ['name', 'subject', 'content']
     ordering = ['-created_at']
     list_per_page = 30
-    readonly_fields = ['status', 'sent_count', 'failed_count', 'created_at', 'updated_at', 'sent_at', 'created_by', 'get_recipients_count']
+    readonly_fields = ['status', 'sent_count', 'failed_count', 'get_delivery_stats', 'created_at', 'updated_at', 'sent_at', 'created_by', 'get_recipients_count']
+    actions = ['retry_failed_deliveries']
     
     def get_fieldsets(self, request, obj=None):
         """Динамічні fieldsets в залежності від наявності об'єкта"""
@@ -642,7 +634,7 @@ class EmailCampaignAdmin(AdminMediaMixin, admin.ModelAdmin):
         if obj and obj.pk:
             fieldsets.append(
                 ('Статистика', {
-                    'fields': ('status', 'sent_count', 'failed_count', 'created_at', 'updated_at', 'sent_at', 'created_by'),
+                    'fields': ('status', 'sent_count', 'failed_count', 'get_delivery_stats', 'created_at', 'updated_at', 'sent_at', 'created_by'),
                     'classes': ('collapse',)
                 })
             )
@@ -692,7 +684,7 @@ class EmailCampaignAdmin(AdminMediaMixin, admin.ModelAdmin):
     def get_recipients_count(self, obj):
         """Кількість отримувачів"""
         if obj.pk:
-            count = len(obj.get_recipients_list())
+            count = obj.get_recipients_count()
             return format_html(
                 '<strong style="color: green;">{} адрес</strong>',
                 count
@@ -708,11 +700,37 @@ class EmailCampaignAdmin(AdminMediaMixin, admin.ModelAdmin):
                 '<a class="button" href="{}" style="background: #4CAF50; color: white; padding: 5px 15px; border-radius: 3px; text-decoration: none;">✉️ Відправити</a>',
                 url
             )
+        elif obj.status == 'sending':
+            return format_html('<span style="color: orange;">⏳ Відправляється</span>')
         elif obj.status == 'sent':
             return format_html('<span style="color: green;">✓ Відправлено</span>')
         return '-'
     get_actions_display.short_description = 'Дії'
     
+    def get_delivery_stats(self, obj):
+        """Статуси доставки по отримувачах (одним запитом)"""
+        if not obj.pk:
+            return '-'
+        stats = obj.deliveries.aggregate(
+            pending=Count('pk', filter=Q(status='pending')),
+            sent=Count('pk', filter=Q(status='sent')),
+            failed=Count('pk', filter=Q(status='failed')),
+        )
+        return format_html(
+            'Очікують: {} · Відправлено: {} · Помилок: {}',
+            stats['pending'], stats['sent'], stats['failed']
+        )
+    get_delivery_stats.short_description = 'Доставка'
+    
+    def retry_failed_deliveries(self, request, queryset):
+        """Повторна відправка на адреси з помилками"""
+        started = sum(1 for campaign in queryset if campaigns.start_campaign(campaign, retry_failed=True))
+        if started:
+            self.message_user(request, f"Повторну відправку запущено для {started} розсилок", messages.SUCCESS)
+        else:
+            self.message_user(request, "Немає розсилок, які можна повторити", messages.WARNING)
+    retry_failed_deliveries.short_description = "🔁 Повторити відправку на адреси з помилками"
+    
     def send_campaign_view(self, request, campaign_id):
         """View для відправки розсилки"""
         from django.template.response import TemplateResponse
@@ -720,14 +738,14 @@ class EmailCampaignAdmin(AdminMediaMixin, admin.ModelAdmin):
         campaign = EmailCampaign.objects.get(pk=campaign_id)
         
         if request.method == 'POST':
-            success = campaign.send_campaign()
+            success = campaigns.start_campaign(campaign)
             if success:
-                messages.success(request, f'Розсилку "{campaign.name}" успішно відправлено!')
+                messages.success(request, f'Розсилку "{campaign.name}" запущено. Статус оновиться у списку розсилок.')
             else:
                 messages.error(request, 'Помилка при відправці розсилки')
             return redirect('admin:orders_emailcampaign_changelist')
         
-        recipients_count = len(campaign.get_recipients_list())
+        recipients_count = campaign.get_recipients_count()
         
         context = {
             'campaign': campaign,
@@ -751,9 +769,9 @@ class EmailCampaignAdmin(AdminMediaMixin, admin.ModelAdmin):
         scheduled_at = obj.scheduled_at
         
         if send_type == 'now' and not scheduled_at and obj.status == 'draft':
-            success = obj.send_campaign()
+            success = campaigns.start_campaign(obj)
             if success:
-                messages.success(request, f'Розсилку "{obj.name}" успішно відправлено! Відправлено: {obj.sent_count}, помилок: {obj.failed_count}')
+                messages.success(request, f'Розсилку "{obj.name}" запущено. Статус оновиться у списку розсилок.')
             else:
                 messages.error(request, 'Помилка при відправці розсилки')
         elif send_type == 'scheduled' and scheduled_at:
@@ -0,0 +1,278 @@
+"""
+Доставка email-розсилок
+
+Шаблон листа рендериться один раз на розсилку (адреса отримувача
+підставляється в готовий HTML), листи йдуть пакетами через одне SMTP-з'єднання
+на пакет, пакети обробляє пул потоків з лімітом швидкості на поштового
+провайдера отримувача. Статус кожного отримувача зберігається в CampaignDelivery,
+тож перервану розсилку можна продовжити, а невдалі адреси - повторити.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connections
+from django.db.models import Count, F, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import escape
+
+from apps.core.jobs import enqueue
+
+from .models import CampaignDelivery, EmailCampaign
+from .recipients import iter_recipient_chunks
+
+logger = logging.getLogger(__name__)
+
+STARTABLE_STATUSES = ('draft', 'scheduled')
+RECIPIENT_PLACEHOLDER = '__campaign_recipient_email__'
+ERROR_MAX_LENGTH = 1000
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class RateLimiter:
+    """Рівномірний ліміт: не більше rate листів за секунду (0 - без обмежень)"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_at)
+            self._next_at = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def provider_for(email):
+    return email.rsplit('@', 1)[-1].lower()
+
+
+def get_limiter(provider):
+    limits = getattr(settings, 'CAMPAIGN_RATE_LIMITS', {})
+    rate = limits.get(provider, limits.get('default', 0))
+    with _limiters_lock:
+        limiter = _limiters.get((provider, rate))
+        if limiter is None:
+            limiter = _limiters[(provider, rate)] = RateLimiter(rate)
+        return limiter
+
+
+def render_campaign(campaign):
+    """Рендер листа один раз; адреса підставляється пізніше через RECIPIENT_PLACEHOLDER"""
+    html = render_to_string('emails/campaign.html', {
+        'campaign': campaign,
+        'email': RECIPIENT_PLACEHOLDER,
+    })
+    return {
+        'subject': campaign.subject,
+        'body': campaign.content,
+        'html': html,
+    }
+
+
+def build_message(rendered, email, connection=None):
+    msg = EmailMultiAlternatives(
+        subject=rendered['subject'],
+        body=rendered['body'],
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[email],
+        connection=connection,
+    )
+    msg.attach_alternative(rendered['html'].replace(RECIPIENT_PLACEHOLDER, escape(email)), 'text/html')
+    return msg
+
+
+def prepare_deliveries(campaign):
+    """Створює рядки доставки для нових отримувачів (існуючі статуси не чіпає)"""
+    for chunk in iter_recipient_chunks(campaign.recipients):
+        CampaignDelivery.objects.bulk_create(
+            [CampaignDelivery(campaign=campaign, email=email) for email in chunk],
+            ignore_conflicts=True,
+        )
+
+
+def outstanding_deliveries(campaign, retry_failed=False):
+    condition = Q(status='pending')
+    if retry_failed:
+        condition |= Q(status='failed', attempts__lt=getattr(settings, 'CAMPAIGN_MAX_ATTEMPTS', 3))
+    return campaign.deliveries.filter(condition)
+
+
+def make_batches(deliveries):
+    """Пакети (provider, [(pk, email), ...]) - один провайдер на пакет"""
+    batch_size = getattr(settings, 'CAMPAIGN_BATCH_SIZE', 100)
+    by_provider = defaultdict(list)
+    for pk, email in deliveries.order_by('pk').values_list('pk', 'email'):
+        by_provider[provider_for(email)].append((pk, email))
+    return [
+        (provider, rows[start:start + batch_size])
+        for provider, rows in by_provider.items()
+        for start in range(0, len(rows), batch_size)
+    ]
+
+
+def send_batch(rendered, provider, batch):
+    """
+    Відправляє пакет через одне з'єднання get_connection().
+    Повертає (список pk відправлених, список (pk, помилка)).
+    """
+    limiter = get_limiter(provider)
+    sent, failed = [], []
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        logger.warning(f"Не вдалося відкрити поштове з'єднання для пакета {provider}: {exc}")
+        return sent, [(pk, str(exc)) for pk, _ in batch]
+
+    try:
+        for pk, email in batch:
+            limiter.wait()
+            try:
+                # З'єднання вже відкрите - send_messages його не закриває між листами
+                connection.send_messages([build_message(rendered, email, connection)])
+                sent.append(pk)
+            except Exception as exc:
+                logger.warning(f"Помилка відправки розсилки на {email}: {exc}")
+                failed.append((pk, str(exc)))
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def record_results(sent, failed):
+    now = timezone.now()
+    if sent:
+        CampaignDelivery.objects.filter(pk__in=sent).update(
+            status='sent', sent_at=now, error='', attempts=F('attempts') + 1, updated_at=now
+        )
+    if failed:
+        CampaignDelivery.objects.bulk_update(
+            [
+                CampaignDelivery(
+                    pk=pk, status='failed', error=error[:ERROR_MAX_LENGTH],
+                    attempts=F('attempts') + 1, updated_at=now,
+                )
+                for pk, error in failed
+            ],
+            ['status', 'error', 'attempts', 'updated_at'],
+        )
+
+
+def _heartbeat(campaign_pk):
+    """Продовжує оренду розсилки - паралельний resume не вважатиме її покинутою"""
+    EmailCampaign.objects.filter(pk=campaign_pk, status='sending').update(locked_at=timezone.now())
+
+
+def _process_batch(campaign_pk, rendered, provider, batch, in_worker):
+    try:
+        record_results(*send_batch(rendered, provider, batch))
+        _heartbeat(campaign_pk)
+    finally:
+        if in_worker:
+            connections.close_all()
+
+
+def _claim(campaign, allowed_statuses, resume=False):
+    """
+    Атомарний перехід у 'sending' - одну розсилку не відправляють двічі паралельно.
+    resume забирає розсилку в 'sending' лише тоді, коли її оренда протермінована
+    (процес, що відправляв, не оновлював locked_at довше за CAMPAIGN_LEASE_TIMEOUT).
+    """
+    now = timezone.now()
+    condition = Q(status__in=allowed_statuses)
+    if resume:
+        stale_before = now - timedelta(seconds=getattr(settings, 'CAMPAIGN_LEASE_TIMEOUT', 600))
+        condition |= Q(status='sending') & (Q(locked_at__isnull=True) | Q(locked_at__lt=stale_before))
+    return EmailCampaign.objects.filter(condition, pk=campaign.pk).update(
+        status='sending', locked_at=now, updated_at=now
+    ) == 1
+
+
+def _finish(campaign):
+    stats = campaign.deliveries.aggregate(
+        sent=Count('pk', filter=Q(status='sent')),
+        failed=Count('pk', filter=Q(status='failed')),
+    )
+    campaign.sent_count = stats['sent']
+    campaign.failed_count = stats['failed']
+    campaign.status = 'failed' if stats['failed'] and not stats['sent'] else 'sent'
+    campaign.sent_at = timezone.now()
+    campaign.locked_at = None
+    campaign.save(update_fields=['sent_count', 'failed_count', 'status', 'sent_at', 'locked_at', 'updated_at'])
+
+
+def deliver_campaign(campaign, resume=False, retry_failed=False, workers=None):
+    """
+    Відправляє розсилку. resume - продовжити розсилку, що зависла в 'sending'
+    (лише з протермінованою орендою, див. _claim), retry_failed - повторити невдалі адреси вже відправленої розсилки.
+    """
+    allowed = STARTABLE_STATUSES
+    if retry_failed:
+        allowed += ('sent', 'failed')
+    if not _claim(campaign, allowed, resume=resume):
+        return False
+    campaign.status = 'sending'
+
+    if workers is None:
+        workers = getattr(settings, 'CAMPAIGN_WORKERS', 4)
+
+    started = time.monotonic()
+    try:
+        prepare_deliveries(campaign)
+        rendered = render_campaign(campaign)
+        batches = make_batches(outstanding_deliveries(campaign, retry_failed))
+
+        if workers > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='campaign') as pool:
+                futures = [pool.submit(_process_batch, campaign.pk, rendered, provider, batch, True) for provider, batch in batches]
+                for future in futures:
+                    future.result()
+        else:
+            for provider, batch in batches:
+                _process_batch(campaign.pk, rendered, provider, batch, False)
+    except Exception:
+        logger.exception(f"Помилка розсилки {campaign.pk}")
+        EmailCampaign.objects.filter(pk=campaign.pk).update(
+            status='failed', locked_at=None, updated_at=timezone.now()
+        )
+        campaign.status = 'failed'
+        return False
+
+    _finish(campaign)
+    logger.info(
+        f"Розсилка {campaign.pk}: відправлено {campaign.sent_count}, помилок {campaign.failed_count} "
+        f"за {time.monotonic() - started:.1f} с"
+    )
+    return True
+
+
+def start_campaign(campaign, retry_failed=False):
+    """
+    Ставить розсилку в чергу фонових завдань (CAMPAIGN_ASYNC=False - синхронно).
+    Повертає False, якщо розсилку в поточному статусі запускати не можна.
+    """
+    allowed = STARTABLE_STATUSES + (('sent', 'failed') if retry_failed else ())
+    if campaign.status not in allowed:
+        return False
+    if not getattr(settings, 'CAMPAIGN_ASYNC', True):
+        return deliver_campaign(campaign, retry_failed=retry_failed)
+    enqueue(
+        'orders.send_campaign',
+        {'campaign_id': campaign.pk, 'retry_failed': retry_failed},
+        dedupe_key=f'campaign:{campaign.pk}',
+    )
+    return True
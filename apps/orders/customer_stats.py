@@ -0,0 +1,218 @@
+"""
+Статистика замовлень клієнтів (таблиця CustomerStats)
+
+Ключ клієнта - ('user', id) для зареєстрованих або ('email', email.lower()) для гостей.
+Створення та зміна замовлення оновлюють рядок статистики інкрементально (F-вирази,
+один UPDATE); видалення замовлення, зміна клієнта та масові queryset.update()
+в адмінці перераховують статистику агрегатним запитом (recompute).
+
+Запис статистики з сигналів іде в точці збереження (_safely): помилка
+відкочує лише статистику, оформлення замовлення не зривається.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce, Lower
+
+from .models import CustomerStats, Order
+
+logger = logging.getLogger(__name__)
+
+KEY_USER = 'user'
+KEY_EMAIL = 'email'
+
+STATS_AGGREGATES = {
+    'orders_count': Count('id'),
+    'total_spent': Coalesce(Sum('total'), Value(Decimal('0'))),
+    'paid_count': Count('id', filter=Q(is_paid=True)),
+    'completed_count': Count('id', filter=Q(status='completed')),
+    'last_order_at': Max('created_at'),
+    # id зростає разом з created_at (auto_now_add), тож Max('id') - останнє замовлення
+    'last_order_id': Max('id'),
+}
+
+
+def customer_key(user_id, email):
+    if user_id:
+        return (KEY_USER, user_id)
+    return (KEY_EMAIL, (email or '').strip().lower())
+
+
+def order_key(order):
+    return customer_key(order.user_id, order.email)
+
+
+def _stats_lookup(key):
+    kind, value = key
+    if kind == KEY_USER:
+        return Q(user_id=value)
+    return Q(user__isnull=True, email=value)
+
+
+def _orders_lookup(key):
+    kind, value = key
+    if kind == KEY_USER:
+        return Q(user_id=value)
+    return Q(user__isnull=True, email_key=value)
+
+
+def get_stats(key):
+    """Рядок статистики клієнта (None якщо замовлень немає)"""
+    return CustomerStats.objects.filter(_stats_lookup(key)).first()
+
+
+def recompute(keys=None):
+    """
+    Перераховує статистику для ключів (або всіх клієнтів, якщо keys=None).
+    Два згрупованих агрегатних запити (оптові / гості) незалежно від кількості клієнтів.
+    """
+    if keys is not None:
+        keys = set(keys)
+        if not keys:
+            return
+    orders = Order.objects.annotate(email_key=Lower('email'))
+    stats_rows = CustomerStats.objects.all()
+    if keys is not None:
+        orders_filter = Q()
+        stats_filter = Q()
+        for key in keys:
+            orders_filter |= _orders_lookup(key)
+            stats_filter |= _stats_lookup(key)
+        orders = orders.filter(orders_filter)
+        stats_rows = stats_rows.filter(stats_filter)
+
+    user_rows = (
+        orders.filter(user__isnull=False)
+        .order_by().values('user_id').annotate(**STATS_AGGREGATES)
+    )
+    guest_rows = (
+        orders.filter(user__isnull=True)
+        .order_by().values('email_key').annotate(**STATS_AGGREGATES)
+    )
+
+    objects = [
+        CustomerStats(user_id=row.pop('user_id'), **row) for row in user_rows
+    ] + [
+        CustomerStats(email=row.pop('email_key'), **row) for row in guest_rows
+    ]
+
+    # Без власної точки збереження: з сигналів її вже відкриває _safely
+    with transaction.atomic(savepoint=False):
+        stats_rows.delete()
+        CustomerStats.objects.bulk_create(objects, batch_size=500)
+
+
+def refresh_for_orders(queryset):
+    """Перерахунок для клієнтів замовлень (після queryset.update() в адмінці)"""
+    keys = {
+        customer_key(user_id, email)
+        for user_id, email in queryset.order_by().values_list('user_id', 'email').distinct()
+    }
+    recompute(keys)
+
+
+def update_orders(queryset, **fields):
+    """
+    Масовий update() з перерахунком статистики; повертає кількість оновлених.
+    Queryset дії адмінки несе фільтри changelist (напр. ?status__exact=pending) -
+    після UPDATE він уже нічого не знаходить, тож замовлення фіксуються до нього.
+    """
+    ids = list(queryset.order_by().values_list('pk', flat=True))
+    updated = Order.objects.filter(pk__in=ids).update(**fields)
+    refresh_for_orders(Order.objects.filter(pk__in=ids))
+    return updated
+
+
+def snapshot(order):
+    """Значення замовлення, що впливають на статистику (без дозавантаження відкладених полів)"""
+    values = order.__dict__
+    if any(name not in values for name in ('user_id', 'email', 'total', 'is_paid', 'status')):
+        return None
+    return {
+        'key': customer_key(values['user_id'], values['email']),
+        'total': Decimal(str(values['total'] or 0)),
+        'is_paid': bool(values['is_paid']),
+        'completed': values['status'] == 'completed',
+    }
+
+
+def _apply(key, orders=0, total=Decimal('0'), paid=0, completed=0, last_order=None):
+    fields = {
+        'orders_count': F('orders_count') + orders,
+        'total_spent': F('total_spent') + total,
+        'paid_count': F('paid_count') + paid,
+        'completed_count': F('completed_count') + completed,
+    }
+    if last_order is not None:
+        fields['last_order'] = last_order
+        fields['last_order_at'] = last_order.created_at
+    if not CustomerStats.objects.filter(_stats_lookup(key)).update(**fields):
+        # Рядка ще немає - агрегат уже враховує збережене замовлення
+        recompute([key])
+
+
+def _recompute_quietly(keys):
+    try:
+        recompute(keys)
+    except Exception:
+        logger.exception(f"Не вдалося перерахувати статистику клієнтів {keys}")
+
+
+def _safely(keys, func, *args, **kwargs):
+    """
+    Виконує запис статистики в точці збереження. IntegrityError - паралельне
+    перше замовлення того ж клієнта вже створило рядок: повтор оновить його.
+    Інші помилки лише логуються, клієнти перераховуються після коміту.
+    """
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                func(*args, **kwargs)
+            return
+        except IntegrityError as exc:
+            error = exc
+        except Exception as exc:
+            error = exc
+            break
+    logger.error(f"Помилка оновлення статистики клієнтів {keys}, перерахунок після коміту", exc_info=error)
+    transaction.on_commit(lambda: _recompute_quietly(keys))
+
+
+def order_saved(order, created):
+    current = snapshot(order)
+    previous = order.__dict__.get('_stats_snapshot')
+
+    if current is None:
+        key = order_key(order)
+        _safely([key], recompute, [key])
+    elif created:
+        _safely(
+            [current['key']],
+            _apply,
+            current['key'],
+            orders=1,
+            total=current['total'],
+            paid=int(current['is_paid']),
+            completed=int(current['completed']),
+            last_order=order,
+        )
+    elif previous is None or previous['key'] != current['key']:
+        keys = {current['key']} | ({previous['key']} if previous else set())
+        _safely(list(keys), recompute, keys)
+    else:
+        deltas = {
+            'total': current['total'] - previous['total'],
+            'paid': int(current['is_paid']) - int(previous['is_paid']),
+            'completed': int(current['completed']) - int(previous['completed']),
+        }
+        if any(deltas.values()):
+            _safely([current['key']], _apply, current['key'], **deltas)
+
+    order._stats_snapshot = current
+
+
+def order_deleted(order):
+    key = order_key(order)
+    _safely([key], recompute, [key])
@@ -0,0 +1,61 @@
+"""
+CSV-експорт замовлень з позиціями (див. apps.core.exports)
+"""
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from apps.core.exports import CSVExport
+from .models import OrderItem
+
+
+class OrderExport(CSVExport):
+    """Замовлення - один рядок на позицію замовлення"""
+
+    name = 'orders'
+    chunk_size = 500
+    header = [
+        'Номер', 'Дата', 'Статус', 'ПІБ', 'Email', 'Телефон', 'Оптовий клієнт',
+        'Доставка', 'Місто', 'Адреса', 'Оплата', 'Оплачено',
+        'Сума товарів', 'Знижка', 'Вартість доставки', 'Загальна сума',
+        'SKU', 'Товар', 'Кількість', 'Ціна', 'Сума позиції'
+    ]
+
+    def prepare(self, queryset):
+        # iterator(chunk_size) виконує prefetch для кожної порції окремо
+        return queryset.select_related('user').prefetch_related(None).prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('product').only(
+                'id', 'order_id', 'quantity', 'price', 'product__id', 'product__sku', 'product__name'
+            ))
+        )
+
+    def rows(self, orders):
+        for order in orders:
+            head = [
+                order.order_number,
+                timezone.localtime(order.created_at).strftime('%d.%m.%Y %H:%M'),
+                order.get_status_display(),
+                ' '.join(filter(None, [order.last_name, order.first_name, order.middle_name])),
+                order.email,
+                order.phone,
+                'Так' if order.user_id else 'Ні',
+                order.get_delivery_method_display(),
+                order.delivery_city,
+                order.delivery_address,
+                order.get_payment_method_display(),
+                'Так' if order.is_paid else 'Ні',
+                order.subtotal,
+                order.discount,
+                order.delivery_cost,
+                order.total,
+            ]
+            items = order.items.all()
+            if not items:
+                yield head + [''] * 5
+            for item in items:
+                yield head + [
+                    item.product.sku,
+                    item.product.name,
+                    item.quantity,
+                    item.price,
+                    item.get_cost(),
+                ]
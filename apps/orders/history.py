@@ -0,0 +1,87 @@
+"""
+Історія замовлень користувача: keyset-пагінація з агрегатами в SQL
+
+Сторінка - це один запит замовлень (з кількістю позицій і сумою товарів через
+annotate) плюс один запит позицій з назвами товарів. Курсор - (created_at, id)
+останнього замовлення сторінки, тож глибокі сторінки не сканують OFFSET.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Prefetch, Q, Sum
+
+from .models import Order, OrderItem
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 50
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(order):
+    raw = f'{order.created_at.isoformat()}|{order.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def order_history_queryset(user, with_items=True):
+    """Замовлення користувача з агрегатами; позиції - одним додатковим запитом"""
+    queryset = (
+        Order.objects
+        .filter(user=user)
+        .annotate(
+            items_count=Count('items'),
+            items_quantity=Sum('items__quantity'),
+            items_total=Sum(
+                ExpressionWrapper(F('items__price') * F('items__quantity'), output_field=DecimalField())
+            ),
+        )
+        .order_by('-created_at', '-id')
+    )
+    if with_items:
+        queryset = queryset.prefetch_related(Prefetch(
+            'items',
+            queryset=OrderItem.objects.select_related('product').only(
+                'id', 'order_id', 'quantity', 'price', 'product__id', 'product__name', 'product__slug'
+            ),
+        ))
+    return queryset
+
+
+def get_order_page(user, cursor=None, limit=DEFAULT_PAGE_SIZE, with_items=True):
+    """
+    Сторінка історії замовлень.
+    Повертає (список замовлень, курсор наступної сторінки або None).
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    queryset = order_history_queryset(user, with_items=with_items)
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    orders = list(queryset[:limit + 1])
+    next_cursor = encode_cursor(orders[limit - 1]) if len(orders) > limit else None
+    return orders[:limit], next_cursor
+
+
+def serialize_order(order):
+    """Компактне представлення замовлення для JSON"""
+    return {
+        'number': order.order_number,
+        'created_at': order.created_at.isoformat(),
+        'status': order.status,
+        'status_display': order.get_status_display(),
+        'total': str(order.total),
+        'items_count': order.items_count,
+        'is_paid': order.is_paid,
+    }
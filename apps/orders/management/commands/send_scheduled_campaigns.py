@@ -1,14 +1,35 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
+from apps.orders.campaigns import deliver_campaign
 from apps.orders.models import EmailCampaign
 
 
 class Command(BaseCommand):
     help = 'Відправка запланованих email розсилок'
     
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Продовжити розсилки, перервані в статусі "Відправляється" (лише неотримані адреси, '
+                 'якщо процес-відправник не подавав ознак життя довше за CAMPAIGN_LEASE_TIMEOUT)'
+        )
+    
     def handle(self, *args, **options):
         now = timezone.now()
         
+        if options['resume']:
+            for campaign in EmailCampaign.objects.filter(status='sending'):
+                self.stdout.write(f'Продовження розсилки: {campaign.name}')
+                if deliver_campaign(campaign, resume=True):
+                    self.stdout.write(self.style.SUCCESS(
+                        f'✓ Відправлено: {campaign.sent_count}, Помилок: {campaign.failed_count}'
+                    ))
+                else:
+                    self.stdout.write(self.style.WARNING(
+                        '⏭ Пропущено: розсилку ще відправляє інший процес'
+                    ))
+        
         scheduled_campaigns = EmailCampaign.objects.filter(
             status='scheduled',
             scheduled_at__lte=now
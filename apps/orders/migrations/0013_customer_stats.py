@@ -0,0 +1,68 @@
+# Generated by Django 4.2.24 on 2026-10-19 18:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from decimal import Decimal
+
+
+def backfill_customer_stats(apps, schema_editor):
+    """Початкове заповнення статистики з наявних замовлень"""
+    from django.db.models import Count, Max, Q, Sum, Value
+    from django.db.models.functions import Coalesce, Lower
+
+    Order = apps.get_model('orders', 'Order')
+    CustomerStats = apps.get_model('orders', 'CustomerStats')
+
+    aggregates = {
+        'orders_count': Count('id'),
+        'total_spent': Coalesce(Sum('total'), Value(Decimal('0'))),
+        'paid_count': Count('id', filter=Q(is_paid=True)),
+        'completed_count': Count('id', filter=Q(status='completed')),
+        'last_order_at': Max('created_at'),
+        'last_order_id': Max('id'),
+    }
+    objects = [
+        CustomerStats(user_id=row.pop('user_id'), **row)
+        for row in Order.objects.filter(user__isnull=False).order_by().values('user_id').annotate(**aggregates)
+    ] + [
+        CustomerStats(email=row.pop('email_key'), **row)
+        for row in Order.objects.filter(user__isnull=True).annotate(email_key=Lower('email'))
+        .order_by().values('email_key').annotate(**aggregates)
+    ]
+    CustomerStats.objects.bulk_create(objects, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('orders', '0012_order_history_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.CharField(blank=True, db_index=True, default='', max_length=254, verbose_name='Email гостя (нижній регістр)')),
+                ('orders_count', models.PositiveIntegerField(default=0, verbose_name='Замовлень')),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Загальна сума')),
+                ('paid_count', models.PositiveIntegerField(default=0, verbose_name='Оплачено')),
+                ('completed_count', models.PositiveIntegerField(default=0, verbose_name='Завершено')),
+                ('last_order_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата останнього замовлення')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Оновлено')),
+                ('last_order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='orders.order', verbose_name='Останнє замовлення')),
+                ('user', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='order_stats', to=settings.AUTH_USER_MODEL, verbose_name='Користувач')),
+            ],
+            options={
+                'verbose_name': 'Статистика клієнта',
+                'verbose_name_plural': 'Статистика клієнтів',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='customerstats',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('email',), name='orders_customerstats_guest_email_uniq'),
+        ),
+        migrations.RunPython(backfill_customer_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.24 on 2026-10-19 18:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0013_customer_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampaignDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254, verbose_name='Email')),
+                ('status', models.CharField(choices=[('pending', 'Очікує'), ('sent', 'Відправлено'), ('failed', 'Помилка')], default='pending', max_length=10, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Спроб')),
+                ('error', models.TextField(blank=True, verbose_name='Помилка')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Відправлено')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Оновлено')),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='orders.emailcampaign', verbose_name='Розсилка')),
+            ],
+            options={
+                'verbose_name': 'Доставка розсилки',
+                'verbose_name_plural': 'Доставки розсилки',
+                'indexes': [models.Index(fields=['campaign', 'status'], name='orders_delivery_status_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='campaigndelivery',
+            constraint=models.UniqueConstraint(fields=('campaign', 'email'), name='orders_delivery_campaign_email_uniq'),
+        ),
+    ]
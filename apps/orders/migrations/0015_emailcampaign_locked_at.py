@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-19 19:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0014_campaign_deliveries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailcampaign',
+            name='locked_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Остання активність відправки'),
+        ),
+    ]
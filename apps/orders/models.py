@@ -4,7 +4,6 @@
 from django.db import models
 from django.conf import settings
 from decimal import Decimal
-from django.utils import timezone
 from apps.products.models import Product
 
 
@@ -127,6 +126,18 @@ class Order(models.Model):
         verbose_name = 'Замовлення'
         verbose_name_plural = 'Замовлення'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset-пагінація історії замовлень (apps.orders.history)
+            models.Index(fields=['user', '-created_at', '-id'], name='orders_user_history_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Для інкрементального оновлення CustomerStats при збереженні
+        from .customer_stats import snapshot
+        instance._stats_snapshot = snapshot(instance)
+        return instance
     
     def save(self, *args, **kwargs):
         """Зберігає замовлення та генерує номер"""
@@ -280,6 +291,57 @@ class RetailClient(Order):
         verbose_name_plural = 'Роздрібні клієнти'
 
 
+class CustomerStats(models.Model):
+    """
+    Накопичена статистика замовлень клієнта (оптовий - за user, гість - за email).
+    Оновлюється інкрементально при збереженні замовлення (apps.orders.customer_stats).
+    """
+    
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='order_stats',
+        verbose_name='Користувач'
+    )
+    email = models.CharField('Email гостя (нижній регістр)', max_length=254, blank=True, default='', db_index=True)
+    orders_count = models.PositiveIntegerField('Замовлень', default=0)
+    total_spent = models.DecimalField('Загальна сума', max_digits=12, decimal_places=2, default=0)
+    paid_count = models.PositiveIntegerField('Оплачено', default=0)
+    completed_count = models.PositiveIntegerField('Завершено', default=0)
+    last_order = models.ForeignKey(
+        Order,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Останнє замовлення'
+    )
+    last_order_at = models.DateTimeField('Дата останнього замовлення', null=True, blank=True)
+    updated_at = models.DateTimeField('Оновлено', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Статистика клієнта'
+        verbose_name_plural = 'Статистика клієнтів'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['email'],
+                condition=models.Q(user__isnull=True),
+                name='orders_customerstats_guest_email_uniq'
+            ),
+        ]
+    
+    @property
+    def avg_order(self):
+        if not self.orders_count:
+            return Decimal('0')
+        return self.total_spent / self.orders_count
+    
+    def __str__(self):
+        return f"Статистика {self.user_id or self.email}"
+
+
 class EmailCampaign(models.Model):
     """Email розсилка"""
     
@@ -313,6 +375,8 @@ class EmailCampaign(models.Model):
     created_at = models.DateTimeField('Створено', auto_now_add=True)
     updated_at = models.DateTimeField('Оновлено', auto_now=True)
     sent_at = models.DateTimeField('Відправлено', null=True, blank=True)
+    # Оренда відправки: оновлюється після кожного пакета, resume забирає лише протерміновану
+    locked_at = models.DateTimeField('Остання активність відправки', null=True, blank=True, editable=False)
     
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -331,92 +395,52 @@ class EmailCampaign(models.Model):
     
     def get_recipients_list(self):
         """Отримати список email адрес для відправки (унікальні, без дублювання)"""
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-        
-        emails = set()
-        
-        for recipient_type in self.recipients:
-            if recipient_type == 'newsletter':
-                from apps.core.models import Newsletter
-                emails.update(
-                    Newsletter.objects.filter(
-                        is_active=True,
-                        email__isnull=False
-                    ).exclude(email='').values_list('email', flat=True)
-                )
-            elif recipient_type == 'wholesale':
-                emails.update(
-                    User.objects.filter(
-                        is_wholesale=True,
-                        email_verified=True,
-                        is_staff=False,
-                        is_superuser=False,
-                        email__isnull=False
-                    ).exclude(email='').values_list('email', flat=True)
-                )
-            elif recipient_type == 'retail':
-                emails.update(
-                    Order.objects.filter(
-                        user__isnull=True,
-                        email__isnull=False
-                    ).exclude(email='').values_list('email', flat=True).distinct()
-                )
-        
-        admin_emails = set(
-            User.objects.filter(
-                is_staff=True
-            ).values_list('email', flat=True)
-        ) | set(
-            User.objects.filter(
-                is_superuser=True
-            ).values_list('email', flat=True)
-        )
-        
-        emails = emails - admin_emails
-        
-        return list(emails)
+        from .recipients import recipients_queryset
+        queryset = recipients_queryset(self.recipients)
+        return list(queryset) if queryset is not None else []
+    
+    def get_recipients_count(self):
+        """Кількість отримувачів (кешується до зміни аудиторії)"""
+        from .recipients import get_recipients_count
+        return get_recipients_count(self)
     
     def send_campaign(self):
-        """Відправка розсилки"""
-        from django.core.mail import EmailMultiAlternatives
-        from django.template.loader import render_to_string
-        from django.conf import settings
-        
-        if self.status not in ['draft', 'scheduled']:
-            return False
-        
-        self.status = 'sending'
-        self.save(update_fields=['status'])
-        
-        recipients = self.get_recipients_list()
-        sent = 0
-        failed = 0
-        
-        for email in recipients:
-            try:
-                html_content = render_to_string('emails/campaign.html', {
-                    'campaign': self,
-                    'email': email,
-                })
-                
-                msg = EmailMultiAlternatives(
-                    subject=self.subject,
-                    body=self.content,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    to=[email]
-                )
-                msg.attach_alternative(html_content, "text/html")
-                msg.send()
-                sent += 1
-            except Exception as e:
-                failed += 1
-                print(f"Помилка відправки на {email}: {e}")
-        
-        self.sent_count = sent
-        self.failed_count = failed
-        self.status = 'sent'
-        self.sent_at = timezone.now()
-        self.save(update_fields=['sent_count', 'failed_count', 'status', 'sent_at'])
-        
-        return True
+        """Відправка розсилки (синхронно, пакетами через спільне з'єднання)"""
+        from .campaigns import deliver_campaign
+        return deliver_campaign(self)
+
+
+class CampaignDelivery(models.Model):
+    """Статус доставки розсилки конкретному отримувачу (для продовження та повторів)"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Очікує'),
+        ('sent', 'Відправлено'),
+        ('failed', 'Помилка'),
+    ]
+    
+    campaign = models.ForeignKey(
+        EmailCampaign,
+        on_delete=models.CASCADE,
+        related_name='deliveries',
+        verbose_name='Розсилка'
+    )
+    email = models.EmailField('Email')
+    status = models.CharField('Статус', max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField('Спроб', default=0)
+    error = models.TextField('Помилка', blank=True)
+    sent_at = models.DateTimeField('Відправлено', null=True, blank=True)
+    updated_at = models.DateTimeField('Оновлено', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Доставка розсилки'
+        verbose_name_plural = 'Доставки розсилки'
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'email'], name='orders_delivery_campaign_email_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['campaign', 'status'], name='orders_delivery_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.email} ({self.get_status_display()})"
@@ -1,9 +1,15 @@
 """
 API клієнт для роботи з Новою Поштою
 """
+import logging
+
 import requests
 from django.conf import settings
 
+from apps.core import metrics
+
+logger = logging.getLogger(__name__)
+
 
 class NovaPoshtaAPI:
     """Клас для роботи з API Нової Пошти"""
@@ -13,6 +19,7 @@ class NovaPoshtaAPI:
     
     def __init__(self):
         self.api_key = self.API_KEY
+        self.api_url = getattr(settings, 'NOVA_POSHTA_API_URL', self.API_URL)
     
     def _make_request(self, model, method, properties=None):
         """Базовий метод для запитів до API"""
@@ -26,20 +33,22 @@ class NovaPoshtaAPI:
             'methodProperties': properties
         }
         
-        try:
-            response = requests.post(self.API_URL, json=data, timeout=10)
-            response.raise_for_status()
-            result = response.json()
-            
-            if result.get('success'):
-                return result.get('data', [])
-            else:
-                errors = result.get('errors', [])
-                print(f"Nova Poshta API Error: {errors}")
+        with metrics.NOVA_POSHTA_SECONDS.time(method=method):
+            try:
+                response = requests.post(self.api_url, json=data, timeout=10)
+                response.raise_for_status()
+                result = response.json()
+            except Exception as e:
+                metrics.NOVA_POSHTA_ERRORS.inc(method=method, kind='request')
+                logger.warning(f"Nova Poshta Request Error ({method}): {e}")
                 return []
-        except Exception as e:
-            print(f"Nova Poshta Request Error: {e}")
-            return []
+        
+        if result.get('success'):
+            return result.get('data', [])
+        
+        metrics.NOVA_POSHTA_ERRORS.inc(method=method, kind='api')
+        logger.warning(f"Nova Poshta API Error ({method}): {result.get('errors', [])}")
+        return []
     
     def search_cities(self, query):
         """Пошук міст за назвою"""
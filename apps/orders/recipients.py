@@ -0,0 +1,113 @@
+"""
+Отримувачі email-розсилок
+
+Аудиторія розсилки - один SQL-запит: UNION адрес усіх обраних груп
+(у нижньому регістрі, тож дублікати з різним регістром зливаються)
+мінус адреси персоналу. Адреси читаються ітератором пачками, а кількість
+кешується на розсилку з версією аудиторії, яку сигнали збільшують при зміні
+підписників, користувачів або гостьових замовлень.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+COUNT_CACHE_KEY = 'orders.campaign_recipients.{}.{}.{}'
+VERSION_CACHE_KEY = 'orders.campaign_recipients.version'
+RECIPIENT_TYPES = ('newsletter', 'wholesale', 'retail')
+# Поля користувача, від яких залежить аудиторія (група оптовиків та виключення персоналу)
+USER_AUDIENCE_FIELDS = ('email', 'is_active', 'is_wholesale', 'email_verified', 'is_staff', 'is_superuser')
+
+
+def _emails(queryset):
+    return (
+        queryset.exclude(email__isnull=True).exclude(email='')
+        .annotate(address=Lower('email'))
+        .order_by()
+        .values_list('address', flat=True)
+    )
+
+
+def _group_queryset(recipient_type):
+    User = get_user_model()
+    if recipient_type == 'newsletter':
+        from apps.core.models import Newsletter
+        return _emails(Newsletter.objects.filter(is_active=True))
+    if recipient_type == 'wholesale':
+        return _emails(User.objects.filter(
+            is_wholesale=True, email_verified=True, is_staff=False, is_superuser=False
+        ))
+    if recipient_type == 'retail':
+        from .models import Order
+        return _emails(Order.objects.filter(user__isnull=True))
+    return None
+
+
+def recipients_queryset(recipient_types):
+    """Унікальні адреси обраних груп без адрес персоналу (один запит UNION ... EXCEPT)"""
+    groups = [qs for qs in map(_group_queryset, dict.fromkeys(recipient_types)) if qs is not None]
+    if not groups:
+        return None
+    User = get_user_model()
+    staff = _emails(User.objects.filter(Q(is_staff=True) | Q(is_superuser=True)))
+    return groups[0].union(*groups[1:]).difference(staff)
+
+
+def iter_recipient_chunks(recipient_types, chunk_size=None):
+    """Адреси пачками по chunk_size без завантаження всієї аудиторії в пам'ять"""
+    queryset = recipients_queryset(recipient_types)
+    if queryset is None:
+        return
+    chunk_size = chunk_size or getattr(settings, 'CAMPAIGN_BATCH_SIZE', 100)
+    chunk = []
+    for email in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(email)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def audience_version():
+    return cache.get_or_set(VERSION_CACHE_KEY, 1, None)
+
+
+def invalidate_counts():
+    """Зміна підписників/клієнтів - усі закешовані кількості стають неактуальними"""
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, 1, None)
+
+
+def user_audience_snapshot(user):
+    """Значення полів аудиторії; відкладені (не завантажені) поля - None"""
+    return tuple(user.__dict__.get(field) for field in USER_AUDIENCE_FIELDS)
+
+
+def user_audience_changed(user, created=False, update_fields=None):
+    """
+    Чи змінило збереження користувача аудиторію розсилок: новий користувач,
+    або змінилось одне з USER_AUDIENCE_FIELDS (за update_fields, інакше -
+    порівнянням зі знімком, зробленим при завантаженні з БД).
+    """
+    if created:
+        return True
+    if update_fields is not None and not set(update_fields) & set(USER_AUDIENCE_FIELDS):
+        return False
+    loaded = getattr(user, '_audience_snapshot', None)
+    return loaded is None or loaded != user_audience_snapshot(user)
+
+
+def get_recipients_count(campaign):
+    """Кількість отримувачів розсилки з кешем до зміни аудиторії чи груп розсилки"""
+    recipient_types = sorted(set(campaign.recipients or []))
+    key = COUNT_CACHE_KEY.format(campaign.pk, '-'.join(recipient_types) or 'none', audience_version())
+    count = cache.get(key)
+    if count is None:
+        queryset = recipients_queryset(recipient_types)
+        count = queryset.count() if queryset is not None else 0
+        cache.set(key, count, getattr(settings, 'CAMPAIGN_RECIPIENTS_CACHE_TTL', 60 * 60))
+    return count
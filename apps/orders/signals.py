@@ -0,0 +1,50 @@
+"""
+Сигнали замовлень: оновлення статистики клієнтів та аудиторії розсилок
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.core import metrics
+from apps.core.models import Newsletter
+from . import customer_stats, recipients
+from .models import Order
+
+
+# Без sender: адмінка зберігає також проксі RetailClient
+@receiver(post_save)
+def update_customer_stats(sender, instance, created, raw=False, **kwargs):
+    if isinstance(instance, Order) and not raw:
+        customer_stats.order_saved(instance, created)
+        if created:
+            metrics.ORDERS_CREATED.inc(payment_method=instance.payment_method or 'unknown')
+
+
+@receiver(post_delete)
+def recompute_customer_stats(sender, instance, **kwargs):
+    if isinstance(instance, Order):
+        customer_stats.order_deleted(instance)
+
+
+@receiver(post_save)
+def invalidate_recipients_on_save(sender, instance, created=False, update_fields=None, **kwargs):
+    """Кількості отримувачів розсилок перераховуються після зміни аудиторії"""
+    if isinstance(instance, Newsletter):
+        recipients.invalidate_counts()
+    elif isinstance(instance, get_user_model()):
+        # Оновлення last_login та інших полів поза аудиторією кеш не скидає
+        if recipients.user_audience_changed(instance, created, update_fields):
+            recipients.invalidate_counts()
+        if update_fields is None:
+            instance._audience_snapshot = recipients.user_audience_snapshot(instance)
+    elif isinstance(instance, Order) and instance.user_id is None and created:
+        # Гостьове замовлення додає адресу в групу роздрібних клієнтів лише при створенні
+        recipients.invalidate_counts()
+
+
+@receiver(post_delete)
+def invalidate_recipients_on_delete(sender, instance, **kwargs):
+    if isinstance(instance, (Newsletter, get_user_model())):
+        recipients.invalidate_counts()
+    elif isinstance(instance, Order) and instance.user_id is None:
+        recipients.invalidate_counts()
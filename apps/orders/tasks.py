@@ -0,0 +1,14 @@
+"""
+Фонові завдання замовлень: відправка email-розсилок
+"""
+from apps.core.jobs import task
+
+from .campaigns import deliver_campaign
+from .models import EmailCampaign
+
+
+@task('orders.send_campaign')
+def send_campaign(campaign_id, retry_failed=False):
+    campaign = EmailCampaign.objects.get(pk=campaign_id)
+    delivered = deliver_campaign(campaign, retry_failed=retry_failed)
+    return {'delivered': delivered, 'sent': campaign.sent_count, 'failed': campaign.failed_count}
@@ -0,0 +1,198 @@
+"""
+Тести доставки email-розсилок
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from apps.core.models import Newsletter
+from apps.orders import campaigns, recipients
+from apps.orders.models import CampaignDelivery, EmailCampaign, Order
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    CAMPAIGN_ASYNC=False,
+    CAMPAIGN_WORKERS=1,
+    CAMPAIGN_BATCH_SIZE=2,
+    CAMPAIGN_RATE_LIMITS={'default': 0},
+)
+class CampaignDeliveryTest(TestCase):
+    """Пакетна відправка зі статусами по отримувачах"""
+
+    def setUp(self):
+        for email in ['a@ukr.net', 'b@ukr.net', 'c@ukr.net', 'd@gmail.com']:
+            Newsletter.objects.create(email=email)
+        self.campaign = EmailCampaign.objects.create(
+            name='Весняний розпродаж',
+            subject='Знижки',
+            content='<p>Знижки до 30%</p>',
+            recipients=['newsletter'],
+        )
+
+    def test_renders_template_once(self):
+        with mock.patch('apps.orders.campaigns.render_to_string', wraps=campaigns.render_to_string) as render:
+            self.assertTrue(campaigns.deliver_campaign(self.campaign))
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['a@ukr.net', 'b@ukr.net', 'c@ukr.net', 'd@gmail.com'])
+
+        self.campaign.refresh_from_db()
+        self.assertEqual(self.campaign.status, 'sent')
+        self.assertEqual(self.campaign.sent_count, 4)
+        self.assertFalse(self.campaign.deliveries.exclude(status='sent').exists())
+
+    def test_batches_are_grouped_by_provider(self):
+        campaigns.prepare_deliveries(self.campaign)
+        batches = campaigns.make_batches(campaigns.outstanding_deliveries(self.campaign))
+        self.assertEqual(sorted((provider, len(batch)) for provider, batch in batches),
+                         [('gmail.com', 1), ('ukr.net', 1), ('ukr.net', 2)])
+
+    def test_failed_recipients_are_recorded_and_retried(self):
+        original = campaigns.build_message
+
+        def flaky(rendered, email, connection=None):
+            if email == 'b@ukr.net':
+                raise ValueError('mailbox unavailable')
+            return original(rendered, email, connection)
+
+        with mock.patch('apps.orders.campaigns.build_message', side_effect=flaky):
+            campaigns.deliver_campaign(self.campaign)
+
+        failed = CampaignDelivery.objects.get(email='b@ukr.net')
+        self.assertEqual(failed.status, 'failed')
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn('mailbox unavailable', failed.error)
+        self.campaign.refresh_from_db()
+        self.assertEqual((self.campaign.sent_count, self.campaign.failed_count), (3, 1))
+
+        mail.outbox = []
+        self.assertTrue(campaigns.start_campaign(self.campaign, retry_failed=True))
+        self.assertEqual([m.to[0] for m in mail.outbox], ['b@ukr.net'])
+        self.campaign.refresh_from_db()
+        self.assertEqual((self.campaign.sent_count, self.campaign.failed_count), (4, 0))
+
+    def test_campaign_is_not_sent_twice(self):
+        self.assertTrue(self.campaign.send_campaign())
+        mail.outbox = []
+        self.assertFalse(self.campaign.send_campaign())
+        self.assertEqual(mail.outbox, [])
+
+    def test_resume_sends_only_pending(self):
+        campaigns.prepare_deliveries(self.campaign)
+        CampaignDelivery.objects.filter(email__endswith='ukr.net').update(status='sent')
+        EmailCampaign.objects.filter(pk=self.campaign.pk).update(status='sending')
+
+        self.assertTrue(campaigns.deliver_campaign(self.campaign, resume=True))
+        self.assertEqual([m.to[0] for m in mail.outbox], ['d@gmail.com'])
+        self.campaign.refresh_from_db()
+        self.assertIsNone(self.campaign.locked_at)
+
+    @override_settings(CAMPAIGN_LEASE_TIMEOUT=600)
+    def test_resume_skips_campaign_with_live_lease(self):
+        campaigns.prepare_deliveries(self.campaign)
+        EmailCampaign.objects.filter(pk=self.campaign.pk).update(
+            status='sending', locked_at=timezone.now() - timedelta(seconds=60)
+        )
+
+        self.assertFalse(campaigns.deliver_campaign(self.campaign, resume=True))
+        self.assertEqual(mail.outbox, [])
+
+        EmailCampaign.objects.filter(pk=self.campaign.pk).update(
+            locked_at=timezone.now() - timedelta(seconds=601)
+        )
+        self.assertTrue(campaigns.deliver_campaign(self.campaign, resume=True))
+        self.assertEqual(len(mail.outbox), 4)
+
+    def test_batches_refresh_lease(self):
+        campaigns.prepare_deliveries(self.campaign)
+        EmailCampaign.objects.filter(pk=self.campaign.pk).update(status='sending')
+        batch = list(campaigns.outstanding_deliveries(self.campaign).values_list('pk', 'email')[:1])
+
+        campaigns._process_batch(self.campaign.pk, campaigns.render_campaign(self.campaign), 'ukr.net', batch, False)
+        self.campaign.refresh_from_db()
+        self.assertIsNotNone(self.campaign.locked_at)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'sessions': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+})
+class RecipientsTest(TestCase):
+    """Аудиторія розсилки одним запитом і кешована кількість"""
+
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        Newsletter.objects.create(email='Client@Example.com')
+        Newsletter.objects.create(email='admin@example.com')
+        Newsletter.objects.create(email='off@example.com', is_active=False)
+        User.objects.create_user(
+            username='opt', email='client@example.com', password='x',
+            is_wholesale=True, email_verified=True
+        )
+        User.objects.create_user(username='admin', email='ADMIN@example.com', password='x', is_staff=True)
+        Order.objects.create(
+            first_name='Гість', last_name='Тестовий', email='guest@example.com', phone='+380501234567',
+            delivery_method='nova_poshta', delivery_city='Київ', delivery_address='Відділення №1',
+            payment_method='cash', subtotal=100, total=100,
+        )
+        self.campaign = EmailCampaign.objects.create(
+            name='Акція', subject='Акція', content='-', recipients=['newsletter', 'wholesale', 'retail'],
+        )
+
+    def test_single_query_case_insensitive_without_staff(self):
+        with self.assertNumQueries(1):
+            emails = self.campaign.get_recipients_list()
+        self.assertEqual(sorted(emails), ['client@example.com', 'guest@example.com'])
+
+    def test_chunks(self):
+        chunks = list(recipients.iter_recipient_chunks(self.campaign.recipients, chunk_size=1))
+        self.assertEqual(len(chunks), 2)
+
+    def test_count_is_cached_and_invalidated(self):
+        self.assertEqual(self.campaign.get_recipients_count(), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.campaign.get_recipients_count(), 2)
+
+        Newsletter.objects.create(email='new@example.com')
+        self.assertEqual(self.campaign.get_recipients_count(), 3)
+
+        self.campaign.recipients = ['retail']
+        self.assertEqual(self.campaign.get_recipients_count(), 1)
+
+    def test_only_audience_changes_invalidate_count(self):
+        self.campaign.recipients = ['wholesale']
+        self.assertEqual(self.campaign.get_recipients_count(), 1)
+        version = recipients.audience_version()
+        user = get_user_model().objects.get(username='opt')
+
+        user.last_login = timezone.now()
+        user.save(update_fields=['last_login'])
+        user.first_name = 'Оптовик'
+        user.save()
+        self.assertEqual(recipients.audience_version(), version)
+
+        user.is_wholesale = False
+        user.save()
+        self.assertEqual(recipients.audience_version(), version + 1)
+        self.assertEqual(self.campaign.get_recipients_count(), 0)
+
+        get_user_model().objects.create_user(username='new', email='new@example.com', password='x')
+        self.assertEqual(recipients.audience_version(), version + 2)
+
+
+class RateLimiterTest(SimpleTestCase):
+    """Ліміт швидкості на провайдера"""
+
+    def test_spaces_out_calls(self):
+        limiter = campaigns.RateLimiter(rate=1000)
+        with mock.patch('apps.orders.campaigns.time.sleep') as sleep:
+            limiter.wait()
+            limiter.wait()
+        self.assertEqual(sleep.call_count, 1)
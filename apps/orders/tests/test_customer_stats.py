@@ -0,0 +1,168 @@
+"""
+Тести накопиченої статистики клієнтів та адмін-панелей клієнтів
+"""
+from decimal import Decimal
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from apps.orders import customer_stats
+from apps.orders.models import CustomerStats, Order
+
+User = get_user_model()
+
+
+def make_order(**fields):
+    data = {
+        'first_name': 'Іван',
+        'last_name': 'Тестовий',
+        'email': 'guest@example.com',
+        'phone': '+380501234567',
+        'delivery_method': 'nova_poshta',
+        'delivery_city': 'Київ',
+        'delivery_address': 'Відділення №1',
+        'payment_method': 'cash',
+        'subtotal': Decimal('100.00'),
+        'total': Decimal('100.00'),
+    }
+    data.update(fields)
+    return Order.objects.create(**data)
+
+
+class CustomerStatsTest(TestCase):
+    """Тести інкрементального оновлення статистики"""
+
+    def setUp(self):
+        self.client_user = User.objects.create_user(
+            username='wholesale',
+            email='wholesale@example.com',
+            password='TestPass123!',
+            is_wholesale=True
+        )
+
+    def test_incremental_updates_match_recompute(self):
+        """Тест: інкрементальні зміни збігаються з повним перерахунком"""
+        first = make_order(user=self.client_user, total=Decimal('150.00'))
+        make_order(user=self.client_user, total=Decimal('50.00'), is_paid=True)
+
+        first.status = 'completed'
+        first.total = Decimal('120.00')
+        first.save()
+
+        stats = CustomerStats.objects.get(user=self.client_user)
+        incremental = (stats.orders_count, stats.total_spent, stats.paid_count, stats.completed_count)
+
+        customer_stats.recompute()
+        stats = CustomerStats.objects.get(user=self.client_user)
+        self.assertEqual(incremental, (stats.orders_count, stats.total_spent, stats.paid_count, stats.completed_count))
+        self.assertEqual(incremental, (2, Decimal('170.00'), 1, 1))
+
+    def test_guest_email_is_case_insensitive(self):
+        """Тест: замовлення гостя групуються за email без урахування регістру"""
+        make_order(email='Guest@Example.com')
+        latest = make_order(email='guest@example.com', delivery_city='Львів')
+
+        stats = CustomerStats.objects.get(user__isnull=True, email='guest@example.com')
+        self.assertEqual(stats.orders_count, 2)
+        self.assertEqual(stats.last_order_id, latest.id)
+
+    def test_delete_recomputes(self):
+        """Тест: видалення замовлення перераховує статистику"""
+        order = make_order(user=self.client_user)
+        order.delete()
+        self.assertFalse(CustomerStats.objects.filter(user=self.client_user).exists())
+
+    def test_concurrent_first_order_conflict_is_retried(self):
+        """Тест: конфлікт унікальності (паралельне перше замовлення) повторюється, а не ламає оформлення"""
+        from unittest import mock
+        from django.db import IntegrityError
+
+        real_recompute = customer_stats.recompute
+        calls = []
+
+        def conflict_once(keys=None):
+            calls.append(keys)
+            if len(calls) == 1:
+                raise IntegrityError('orders_customerstats_guest_email_uniq')
+            return real_recompute(keys)
+
+        with mock.patch.object(customer_stats, 'recompute', side_effect=conflict_once):
+            order = make_order()
+
+        self.assertTrue(Order.objects.filter(pk=order.pk).exists())
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(CustomerStats.objects.get(email='guest@example.com').orders_count, 1)
+
+    def test_stats_error_does_not_break_order(self):
+        """Тест: помилка статистики не зриває створення замовлення"""
+        from unittest import mock
+
+        with mock.patch.object(customer_stats, '_apply', side_effect=RuntimeError('boom')), \
+                self.assertLogs('apps.orders.customer_stats', 'ERROR'), \
+                self.captureOnCommitCallbacks(execute=True):
+            order = make_order()
+
+        self.assertTrue(Order.objects.filter(pk=order.pk).exists())
+        # Перерахунок після коміту відновив статистику
+        self.assertEqual(CustomerStats.objects.get(email='guest@example.com').orders_count, 1)
+
+    def test_admin_action_on_filtered_changelist_refreshes_stats(self):
+        """Тест: масова дія зі списку, відфільтрованого за статусом, оновлює статистику"""
+        admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='AdminPass123!')
+        orders = [make_order(user=self.client_user, total=Decimal('80.00')) for _ in range(2)]
+        self.client.force_login(admin)
+
+        url = reverse('admin:orders_order_changelist') + '?status__exact=pending'
+        self.client.post(url, {
+            'action': 'mark_as_completed',
+            '_selected_action': [order.pk for order in orders],
+        })
+
+        self.assertFalse(Order.objects.filter(status='pending').exists())
+        stats = CustomerStats.objects.get(user=self.client_user)
+        self.assertEqual((stats.paid_count, stats.completed_count, stats.total_spent), (2, 2, Decimal('160.00')))
+
+
+class ClientAdminQueriesTest(TestCase):
+    """Тести кількості запитів карток клієнтів в адмінці"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='AdminPass123!'
+        )
+        self.wholesale = User.objects.create_user(
+            username='wholesale',
+            email='wholesale@example.com',
+            password='TestPass123!',
+            is_wholesale=True
+        )
+        for i in range(8):
+            make_order(user=self.wholesale, is_paid=i % 2 == 0)
+            make_order(delivery_city='Київ' if i < 5 else 'Львів')
+        self.client.force_login(self.admin)
+
+    def _panel_queries(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in ctx.captured_queries if '"orders_' in q['sql']]
+
+    def test_wholesale_card_queries(self):
+        """Тест: статистика оптового клієнта не залежить від кількості замовлень"""
+        url = reverse('admin:users_wholesaleclient_change', args=[self.wholesale.pk])
+        queries = self._panel_queries(url)
+        # Клієнт разом зі статистикою (JOIN) + останні 5 замовлень
+        self.assertLessEqual(len(queries), 2)
+
+    def test_retail_card_queries(self):
+        """Тест: картка гостя - клієнт зі статистикою, доставка (вікна), останні замовлення"""
+        last = Order.objects.filter(user__isnull=True).order_by('-id').first()
+        url = reverse('admin:users_retailclient_change', args=[last.pk])
+        response = self.client.get(url)
+        self.assertContains(response, 'Київ')
+        self.assertLessEqual(len(self._panel_queries(url)), 3)
+
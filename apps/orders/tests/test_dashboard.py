@@ -0,0 +1,80 @@
+"""
+Тести статистики над списком замовлень в адмінці
+"""
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.orders.dashboard import build_dashboard
+from apps.orders.models import Order
+
+from .test_customer_stats import make_order
+
+User = get_user_model()
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class OrderDashboardTest(TestCase):
+    """Тести статистики над списком замовлень"""
+
+    def test_dashboard_single_query(self):
+        """Тест: уся статистика рахується одним агрегатним запитом"""
+        make_order(status='pending', total=Decimal('100.00'))
+        make_order(status='shipped', total=Decimal('250.00'))
+        make_order(status='completed', total=Decimal('50.00'))
+
+        with self.assertNumQueries(1):
+            dashboard = build_dashboard(Order.objects.all())
+
+        self.assertEqual(dashboard['order_stats'], {'pending': 1, 'in_progress': 1, 'completed': 1})
+        self.assertEqual(dashboard['today_stats']['new_orders'], 3)
+        self.assertEqual(dashboard['today_stats']['total_amount'], Decimal('400.00'))
+        self.assertEqual(sum(bucket['orders'] for bucket in dashboard['hourly_stats']), 3)
+
+    def test_changelist_renders_hourly_stats(self):
+        """Тест: список замовлень показує погодинну статистику"""
+        admin = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='AdminPass123!'
+        )
+        make_order()
+        self.client.force_login(admin)
+
+        response = self.client.get(reverse('admin:orders_order_changelist'))
+        self.assertContains(response, 'hourly-stats')
+
+    def order_at(self, created_at):
+        order = make_order()
+        Order.objects.filter(pk=order.pk).update(created_at=created_at)
+
+    def test_fall_back_day_merges_repeated_hour(self):
+        """Тест: при переході на зимовий час обидві години 03 потрапляють в один кошик"""
+        # 25.10.2026 о 04:00 EEST годинник переводиться на 03:00 EET
+        self.order_at(utc(2026, 10, 25, 0, 30))  # 03:30 EEST
+        self.order_at(utc(2026, 10, 25, 1, 30))  # 03:30 EET
+
+        dashboard = build_dashboard(Order.objects.all(), now=utc(2026, 10, 25, 4, 30))
+        hours = {bucket['hour']: bucket['orders'] for bucket in dashboard['hourly_stats']}
+
+        self.assertEqual(list(hours), [0, 1, 2, 3, 4, 5, 6])
+        self.assertEqual(hours[3], 2)
+        self.assertEqual(sum(hours.values()), dashboard['today_stats']['new_orders'])
+
+    def test_spring_forward_day_skips_missing_hour(self):
+        """Тест: при переході на літній час години 03 немає, замовлення не дублюються"""
+        # 29.03.2026 о 03:00 EET годинник переводиться на 04:00 EEST
+        self.order_at(utc(2026, 3, 29, 1, 30))  # 04:30 EEST
+
+        dashboard = build_dashboard(Order.objects.all(), now=utc(2026, 3, 29, 3, 30))
+        hours = {bucket['hour']: bucket['orders'] for bucket in dashboard['hourly_stats']}
+
+        self.assertEqual(list(hours), [0, 1, 2, 4, 5, 6])
+        self.assertEqual(hours[4], 1)
+        self.assertEqual(sum(hours.values()), 1)
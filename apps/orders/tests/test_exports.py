@@ -0,0 +1,121 @@
+"""
+Тести потокових CSV-експортів
+"""
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from apps.core.exports import PART_SUFFIX, write_export_file
+from apps.core.models import Job
+from apps.orders.exports import OrderExport
+from apps.orders.models import Order, OrderItem
+from apps.products.models import Product, Category
+
+User = get_user_model()
+
+
+class OrderExportTest(TestCase):
+    """Тести експорту замовлень з позиціями"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='AdminPass123!'
+        )
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        self.product = Product.objects.create(
+            name='Крем',
+            slug='krem',
+            category=category,
+            retail_price=Decimal('100.00'),
+            stock=10
+        )
+        for _ in range(3):
+            order = Order.objects.create(
+                first_name='Іван',
+                last_name='Тестовий',
+                email='guest@example.com',
+                phone='+380501234567',
+                delivery_method='nova_poshta',
+                delivery_city='Київ',
+                delivery_address='Відділення №1',
+                payment_method='cash',
+                subtotal=Decimal('300.00'),
+                total=Decimal('300.00')
+            )
+            OrderItem.objects.create(order=order, product=self.product, quantity=2, price=Decimal('100.00'))
+            OrderItem.objects.create(order=order, product=self.product, quantity=1, price=Decimal('100.00'))
+
+    def test_streaming_action(self):
+        """Тест: дія адмінки віддає потоковий CSV з рядком на кожну позицію"""
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('admin:orders_order_changelist'), {
+            'action': 'export_to_csv',
+            'select_across': '1',
+            '_selected_action': list(Order.objects.values_list('pk', flat=True)),
+        })
+
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        lines = content.strip().splitlines()
+        self.assertTrue(lines[0].startswith('\ufeffНомер'))
+        self.assertEqual(len(lines), 1 + 6)
+        self.assertIn('Крем', lines[1])
+
+    def test_formula_cells_are_escaped(self):
+        """Тест: введені клієнтом значення-формули експортуються як текст"""
+        import csv
+        Order.objects.update(last_name='=HYPERLINK("http://evil.example")', delivery_address='@SUM(1)')
+
+        content = ''.join(OrderExport().iter_csv(Order.objects.all()))
+        rows = list(csv.reader(content.lstrip('\ufeff').splitlines()))
+        cells = [cell for row in rows[1:] for cell in row]
+        self.assertIn('\'=HYPERLINK("http://evil.example") Іван', cells)
+        self.assertIn("'@SUM(1)", cells)
+        self.assertFalse(any(cell.startswith(('=', '@')) for cell in cells))
+
+    def test_item_prefetch_per_chunk(self):
+        """Тест: позиції завантажуються одним запитом на порцію замовлень"""
+        with self.assertNumQueries(2):
+            rows = list(OrderExport().iter_rows(Order.objects.all()))
+        self.assertEqual(len(rows), 6)
+
+    def test_background_file(self):
+        """Тест: фоновий режим пише файл, доступний на сторінці експортів"""
+        with tempfile.TemporaryDirectory() as root, override_settings(EXPORTS_ROOT=root):
+            target = write_export_file(OrderExport(), Order.objects.all(), 'orders_test.csv')
+            self.assertTrue(target.exists())
+
+            self.client.force_login(self.admin)
+            response = self.client.get(reverse('admin:orders_order_exports'))
+            self.assertContains(response, 'orders_test.csv')
+
+            response = self.client.get(reverse('admin:orders_order_export_download', args=['orders_test.csv']))
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get(reverse('admin:orders_order_export_download', args=['products_x.csv']))
+            self.assertEqual(response.status_code, 404)
+
+    def test_background_action_runs_in_web_process(self):
+        """Тест: фоновий експорт пише потік веб-процесу за умовами відбору, без черги та списку pk"""
+        self.client.force_login(self.admin)
+        with tempfile.TemporaryDirectory() as root, override_settings(EXPORTS_ROOT=root), \
+                mock.patch('apps.core.exports._get_executor') as executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse('admin:orders_order_changelist'), {
+                    'action': 'export_csv_background',
+                    'select_across': '1',
+                    '_selected_action': [Order.objects.first().pk],
+                })
+
+            self.assertFalse(Job.objects.exists())
+            func, export, queryset, filename = executor.return_value.submit.call_args[0]
+            self.assertTrue((Path(root) / (filename + PART_SUFFIX)).exists())
+            self.assertEqual(queryset.count(), 3)
+
+            write_export_file(export, queryset, filename)
+            self.assertFalse((Path(root) / (filename + PART_SUFFIX)).exists())
+            self.assertEqual(len((Path(root) / filename).read_text(encoding='utf-8').strip().splitlines()), 1 + 6)
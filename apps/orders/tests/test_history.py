@@ -0,0 +1,83 @@
+"""
+Тести історії замовлень користувача
+"""
+from decimal import Decimal
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from apps.orders.history import get_order_page
+from apps.orders.models import Order, OrderItem
+from apps.products.models import Product, Category
+
+User = get_user_model()
+
+
+class OrderHistoryTest(TestCase):
+    """Тести keyset-пагінації та агрегатів історії"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='client',
+            email='client@example.com',
+            password='TestPass123!',
+            is_wholesale=True
+        )
+        category = Category.objects.create(name='Test Category', slug='test-category')
+        self.product = Product.objects.create(
+            name='Test Product',
+            slug='test-product',
+            category=category,
+            retail_price=Decimal('100.00'),
+            stock=10
+        )
+        for _ in range(5):
+            order = Order.objects.create(
+                user=self.user,
+                first_name='Іван',
+                last_name='Тестовий',
+                email='client@example.com',
+                phone='+380501234567',
+                delivery_method='nova_poshta',
+                delivery_city='Київ',
+                delivery_address='Відділення №1',
+                payment_method='liqpay',
+                subtotal=Decimal('300.00'),
+                total=Decimal('300.00')
+            )
+            OrderItem.objects.create(order=order, product=self.product, quantity=2, price=Decimal('100.00'))
+            OrderItem.objects.create(order=order, product=self.product, quantity=1, price=Decimal('100.00'))
+
+    def test_pages_follow_cursor_without_overlap(self):
+        """Тест: сторінки за курсором не перетинаються і покривають всі замовлення"""
+        first, cursor = get_order_page(self.user, limit=2)
+        second, cursor = get_order_page(self.user, cursor=cursor, limit=2)
+        third, cursor = get_order_page(self.user, cursor=cursor, limit=2)
+
+        ids = [order.pk for order in first + second + third]
+        self.assertEqual(len(set(ids)), 5)
+        self.assertIsNone(cursor)
+
+    def test_aggregates_and_items_in_two_queries(self):
+        """Тест: агрегати рахуються в SQL, позиції - одним додатковим запитом"""
+        with self.assertNumQueries(2):
+            orders, _ = get_order_page(self.user, limit=5)
+            for order in orders:
+                names = [item.product.name for item in order.items.all()]
+
+        self.assertEqual(names, ['Test Product', 'Test Product'])
+        self.assertEqual(orders[0].items_count, 2)
+        self.assertEqual(orders[0].items_quantity, 3)
+        self.assertEqual(orders[0].items_total, Decimal('300.00'))
+
+    def test_json_history(self):
+        """Тест: компактний JSON з курсором наступної сторінки"""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('users:orders_json'), {'limit': 3})
+
+        data = response.json()
+        self.assertEqual(len(data['orders']), 3)
+        self.assertIsNotNone(data['next'])
+        self.assertEqual(data['orders'][0]['items_count'], 2)
+
+        response = self.client.get(reverse('users:orders_json'), {'after': 'broken'})
+        self.assertEqual(response.status_code, 400)
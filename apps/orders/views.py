@@ -10,7 +10,9 @@ from django.utils import timezone
 from django.conf import settings
 from apps.cart.cart import Cart
 from decimal import Decimal
+from apps.core import metrics
 from apps.core.models import Newsletter
+from apps.products.pricing import TIER_WHOLESALE, get_price_tier, price_tier_for_user
 from .models import Order, OrderItem, PendingPayment
 from .novaposhta import NovaPoshtaAPI
 from .validators import validate_order_data
@@ -45,14 +47,7 @@ def calculate_discount_breakdown(order_items_data, user, promo_code_obj=None, pr
     items_discounts = []
     
     # Визначаємо чи це оптовий клієнт
-    is_wholesale_user = (
-        user and 
-        user.is_authenticated and 
-        hasattr(user, 'is_wholesale') and 
-        user.is_wholesale and
-        not user.is_staff and
-        not user.is_superuser
-    )
+    is_wholesale_user = price_tier_for_user(user) == TIER_WHOLESALE
     
     # Лічильники для summary
     original_total = Decimal('0')
@@ -177,6 +172,7 @@ def calculate_discount_breakdown(order_items_data, user, promo_code_obj=None, pr
     return breakdown
 
 
+@metrics.timed(metrics.ORDER_CREATE_SECONDS, methods=('POST',))
 def order_create(request):
     """Створення замовлення"""
     cart = Cart(request)
@@ -201,6 +197,7 @@ def order_create(request):
         return redirect('cart:detail')
     
     if request.method == 'POST':
+        metrics.CART_SIZE.observe(len(cart))
         if is_wholesale_user and total_price < MINIMUM_WHOLESALE_ORDER:
             messages.error(
                 request, 
@@ -282,10 +279,7 @@ def order_create(request):
                     raise ValueError(f'Недостатньо товару "{product.name}" на складі (доступно: {product.stock})')
                 
                 # КРИТИЧНО: Отримуємо ціну з БД, а не з сесії
-                actual_price = product.get_price_for_user(
-                    request.user if request.user.is_authenticated and not request.user.is_staff and not request.user.is_superuser else None,
-                    quantity
-                )
+                actual_price = product.get_price_for_tier(get_price_tier(request), quantity)
                 
                 item_total = Decimal(str(actual_price)) * quantity
                 recalculated_subtotal += item_total
@@ -729,6 +723,7 @@ def liqpay_payment(request, order_id):
 
 @csrf_exempt
 @require_POST
+@metrics.timed(metrics.LIQPAY_CALLBACK_SECONDS)
 def liqpay_callback(request):
     """Callback для обробки результату оплати LiqPay"""
     data = request.POST.get('data')
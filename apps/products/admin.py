@@ -4,7 +4,7 @@
 """
 from django.contrib import admin
 from django.utils.html import format_html
-from django.db import models
+from django.db import transaction
 from django.utils import timezone
 from django.contrib import messages
 from django.urls import reverse
@@ -16,7 +16,10 @@ from .models import (
     NewProduct, CategoryFilterConfig
 )
 from .forms import ProductAdminForm
+from . import bulk
 from apps.core.admin_utils import get_image_preview, AdminMediaMixin
+from apps.core.exports import ExportAdminMixin
+from .exports import ProductExport
 
 
 # ============================================
@@ -26,8 +29,8 @@ from apps.core.admin_utils import get_image_preview, AdminMediaMixin
 class ProductImageInline(admin.TabularInline):
     model = ProductImage
     extra = 1
-    fields = ['get_image_preview', 'image', 'alt_text', 'is_main', 'sort_order']
-    readonly_fields = ['get_image_preview']
+    fields = ['get_image_preview', 'image', 'alt_text', 'is_main', 'sort_order', 'processing_status']
+    readonly_fields = ['get_image_preview', 'processing_status']
     classes = ['collapse']
     verbose_name = 'Зображення товару'
     verbose_name_plural = '📷 Зображення товару (перше буде головним)'
@@ -188,10 +191,11 @@ class StockFilter(admin.SimpleListFilter):
 
 
 @admin.register(Product)
-class ProductAdmin(AdminMediaMixin, admin.ModelAdmin):
+class ProductAdmin(ExportAdminMixin, AdminMediaMixin, admin.ModelAdmin):
     """Адміністрування товарів з розширеним функціоналом"""
     
     form = ProductAdminForm
+    export_class = ProductExport
     
     list_display = [
         'get_product_image', 'name', 'category', 'sku', 
@@ -303,6 +307,7 @@ class ProductAdmin(AdminMediaMixin, admin.ModelAdmin):
         'set_sale_price_bulk',
         'clear_sale_prices',
         'export_to_csv',
+        'export_csv_background',
     ]
     
     # ========== Методи відображення ==========
@@ -381,112 +386,66 @@ class ProductAdmin(AdminMediaMixin, admin.ModelAdmin):
     
     def activate_products(self, request, queryset):
         """Активувати товари"""
-        updated = queryset.update(is_active=True)
+        updated = bulk.bulk_update_products(queryset, {'is_active': True}, request.user)
         self.message_user(request, f"Активовано {updated} товарів", messages.SUCCESS)
     activate_products.short_description = "✓ Активувати обрані товари"
-    
+
     def deactivate_products(self, request, queryset):
         """Деактивувати товари"""
-        updated = queryset.update(is_active=False)
+        updated = bulk.bulk_update_products(queryset, {'is_active': False}, request.user)
         self.message_user(request, f"Деактивовано {updated} товарів", messages.SUCCESS)
     deactivate_products.short_description = "✕ Деактивувати обрані товари"
-    
+
     def mark_as_sale(self, request, queryset):
-        """Позначити як акційні"""
-        count = 0
-        for product in queryset:
-            if product.sale_price:
-                product.is_sale = True
-                product.save(update_fields=['is_sale'])
-                count += 1
-        
+        """Позначити як акційні (лише товари з акційною ціною)"""
+        total = queryset.count()
+        count = bulk.bulk_update_products(queryset.filter(sale_price__gt=0), {'is_sale': True}, request.user)
+
         self.message_user(
             request, 
             f"Позначено як акційні: {count} товарів. Товари без вказаної акційної ціни пропущено.",
-            messages.WARNING if count < queryset.count() else messages.SUCCESS
+            messages.WARNING if count < total else messages.SUCCESS
         )
     mark_as_sale.short_description = "🔥 Позначити як АКЦІЙНІ"
-    
+
     def unmark_as_sale(self, request, queryset):
         """Зняти позначку акційний"""
-        updated = queryset.update(is_sale=False)
+        updated = bulk.bulk_update_products(queryset, {'is_sale': False}, request.user)
         self.message_user(request, f"Знято позначку акційний: {updated} товарів", messages.SUCCESS)
     unmark_as_sale.short_description = "Зняти позначку АКЦІЙНИЙ"
     
     
     def mark_as_new(self, request, queryset):
         """Позначити як новинки"""
-        count = 0
-        for product in queryset:
-            product.is_new = True
-            product.save(update_fields=['is_new'])
-            
-            if not NewProduct.objects.filter(product=product).exists():
-                max_order = NewProduct.objects.aggregate(models.Max('sort_order'))['sort_order__max'] or 0
-                NewProduct.objects.create(
-                    product=product,
-                    sort_order=max_order + 1,
-                    is_active=True
-                )
-            count += 1
-        
+        with transaction.atomic():
+            ids = list(queryset.values_list('pk', flat=True))
+            count = bulk.bulk_update_products(Product.objects.filter(pk__in=ids), {'is_new': True}, request.user)
+            bulk.add_new_products(ids)
+
         self.message_user(request, f"Позначено як новинки: {count} товарів", messages.SUCCESS)
     mark_as_new.short_description = "✨ Позначити як НОВИНКИ"
     
     def unmark_as_new(self, request, queryset):
         """Зняти позначку новинка"""
-        count = 0
-        for product in queryset:
-            product.is_new = False
-            product.save(update_fields=['is_new'])
-            NewProduct.objects.filter(product=product).delete()
-            count += 1
-        
+        with transaction.atomic():
+            ids = list(queryset.values_list('pk', flat=True))
+            count = bulk.bulk_update_products(Product.objects.filter(pk__in=ids), {'is_new': False}, request.user)
+            bulk.remove_new_products(ids)
+
         self.message_user(request, f"Знято позначку новинка: {count} товарів", messages.SUCCESS)
     unmark_as_new.short_description = "Зняти позначку НОВИНКА"
     
     def clear_sale_prices(self, request, queryset):
         """Очистити акційні ціни"""
-        queryset.update(
-            is_sale=False,
-            sale_price=None,
-            sale_start_date=None,
-            sale_end_date=None
-        )
-        self.message_user(request, f"Акційні ціни очищено для {queryset.count()} товарів", messages.SUCCESS)
+        updated = bulk.bulk_update_products(queryset, {
+            'is_sale': False,
+            'sale_price': None,
+            'sale_start_date': None,
+            'sale_end_date': None,
+        }, request.user)
+        self.message_user(request, f"Акційні ціни очищено для {updated} товарів", messages.SUCCESS)
     clear_sale_prices.short_description = "🗑️ Очистити акційні ціни"
     
-    def export_to_csv(self, request, queryset):
-        """Експорт товарів у CSV"""
-        import csv
-        from django.http import HttpResponse
-        
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
-        response['Content-Disposition'] = 'attachment; filename="products_export.csv"'
-        response.write('\ufeff')  # BOM для коректного відображення кирилиці в Excel
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'SKU', 'Назва', 'Категорія', 'Роздрібна ціна', 'Оптова ціна',
-            'Акційна ціна', 'Кількість', 'Статус'
-        ])
-        
-        for product in queryset:
-            writer.writerow([
-                product.sku,
-                product.name,
-                product.category.name,
-                product.retail_price,
-                product.wholesale_price or '',
-                product.sale_price or '',
-                product.stock,
-                'Активний' if product.is_active else 'Неактивний'
-            ])
-        
-        self.message_user(request, f"Експортовано {queryset.count()} товарів", messages.SUCCESS)
-        return response
-    export_to_csv.short_description = "📊 Експортувати в CSV"
-    
     # ========== Оптимізація ==========
     
     def get_queryset(self, request):
@@ -512,19 +471,16 @@ class ProductAdmin(AdminMediaMixin, admin.ModelAdmin):
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
     
     def save_model(self, request, obj, form, change):
-        """Синхронізація is_new з таблицею NewProduct"""
+        """Синхронізація is_new з таблицею NewProduct + журнал змін цін/статусів"""
         super().save_model(request, obj, form, change)
-        
+
         if obj.is_new:
-            if not NewProduct.objects.filter(product=obj).exists():
-                max_order = NewProduct.objects.aggregate(models.Max('sort_order'))['sort_order__max'] or 0
-                NewProduct.objects.create(
-                    product=obj,
-                    sort_order=max_order + 1,
-                    is_active=True
-                )
+            bulk.add_new_products([obj.pk])
         else:
-            NewProduct.objects.filter(product=obj).delete()
+            bulk.remove_new_products([obj.pk])
+
+        if change:
+            bulk.log_form_changes(obj, form, request.user)
 
 # ============================================
 #       НОВИНКИ, АКЦІЙНІ ПРОПОЗИЦІЇ
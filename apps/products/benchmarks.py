@@ -0,0 +1,267 @@
+"""
+Мікробенчмарки цінової логіки
+
+Синтетичний каталог (фіксований seed) з 1k / 10k / 100k товарів у пам'яті:
+ціни, градації, опт, акції з датами і без. Вимірюються ns/op (найкращий з
+кількох прогонів, GC вимкнено) та пам'ять за tracemalloc: пік під час прогону
+і те, що лишилось після нього (кеші екземплярів), у байтах на операцію.
+
+Promotion.apply_to_products працює з БД - вимірюється в транзакції, яка
+відкочується (manage.py benchmark_pricing --db).
+"""
+import gc
+import logging
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.session_codec import pack_cart
+
+from .models import Category, Product
+from .pricing import build_price_matrix
+
+SIZES = (1000, 10000, 100000)
+SEED = 20240601
+CART_SIZE = 10
+
+WHOLESALE_USER = SimpleNamespace(is_authenticated=True, is_wholesale=True, is_staff=False, is_superuser=False)
+
+
+def _money(rng, low, high):
+    return Decimal(rng.randint(low * 100, high * 100)) / 100
+
+
+def build_catalog(size, seed=SEED, category=None):
+    """Незбережені товари з детермінованим набором цін і акцій"""
+    rng = random.Random(seed)
+    now = timezone.now()
+    category = category or Category(pk=1, name='Бенчмарк', slug='benchmark')
+    products = []
+    for index in range(size):
+        retail = _money(rng, 50, 5000)
+        graded = rng.random() < 0.5
+        on_sale = rng.random() < 0.3
+        window = rng.choice(('none', 'active', 'expired', 'future'))
+        product = Product(
+            pk=index + 1,
+            name=f'Товар {index}',
+            slug=f'benchmark-{index}',
+            sku=f'BENCH{index}',
+            category=category,
+            retail_price=retail,
+            wholesale_price=(retail * Decimal('0.8')).quantize(Decimal('0.01')) if rng.random() < 0.6 else None,
+            price_3_qty=(retail * Decimal('0.95')).quantize(Decimal('0.01')) if graded else None,
+            price_5_qty=(retail * Decimal('0.9')).quantize(Decimal('0.01')) if graded else None,
+            is_sale=on_sale,
+            is_new=rng.random() < 0.1,
+            stock=rng.randint(0, 200),
+        )
+        if on_sale:
+            product.sale_price = (retail * Decimal('0.85')).quantize(Decimal('0.01'))
+            if graded:
+                product.sale_price_3_qty = (retail * Decimal('0.82')).quantize(Decimal('0.01'))
+                product.sale_price_5_qty = (retail * Decimal('0.78')).quantize(Decimal('0.01'))
+            if product.wholesale_price:
+                product.sale_wholesale_price = (product.wholesale_price * Decimal('0.9')).quantize(Decimal('0.01'))
+            if window != 'none':
+                offset = {'active': 0, 'expired': -30, 'future': 30}[window]
+                product.sale_start_date = now + timedelta(days=offset - 7)
+                product.sale_end_date = now + timedelta(days=offset + 7)
+            if rng.random() < 0.5:
+                product.active_promotion_name = 'Весняний розпродаж'
+        products.append(product)
+    return products
+
+
+def build_carts(products, seed=SEED, cart_size=CART_SIZE):
+    """Кошики по cart_size позицій з кількостями 1-6 (усі пороги градації)"""
+    rng = random.Random(seed + 1)
+    return [
+        [(product, rng.randint(1, 6)) for product in rng.sample(products, min(cart_size, len(products)))]
+        for _ in range(max(1, len(products) // cart_size))
+    ]
+
+
+def build_promo_code():
+    from apps.promotions.models import PromoCode
+
+    now = timezone.now()
+    return PromoCode(
+        code='BENCH10', discount_type='percentage', discount_value=Decimal('10'),
+        min_order_amount=Decimal('100'), start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+    )
+
+
+class _BenchRequest:
+    """Мінімальний request для Cart без сесійного бекенду і запитів до БД"""
+
+    def __init__(self, cart, products, user=None):
+        self.user = user or AnonymousUser()
+        self.session = {settings.CART_SESSION_ID: pack_cart({product.pk: quantity for product, quantity in cart})}
+        self._cart_products = (frozenset(product.pk for product, _ in cart), products)
+
+
+def price_cart(cart, promo_code):
+    """Повний розрахунок кошика: ціни позицій, суми, промокод, розшифровка знижок"""
+    from apps.cart.cart import Cart
+    from apps.orders.views import calculate_discount_breakdown
+
+    products = {product.pk: product for product, _ in cart}
+    cart_obj = Cart(_BenchRequest(cart, products))
+    items = list(cart_obj)
+    subtotal = sum((item['total_price'] for item in items), Decimal('0'))
+    cart_obj.get_original_total_price()
+    discount, _ = promo_code.apply_discount(subtotal)
+    return calculate_discount_breakdown(items, None, promo_code, Decimal(str(discount)))
+
+
+def measure(func, items, repeat=5):
+    """ns/op (найкращий прогін) і пам'ять tracemalloc на операцію"""
+    ops = len(items)
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter_ns()
+            for item in items:
+                func(item)
+            elapsed = time.perf_counter_ns() - started
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        for item in items:
+            func(item)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'ops': ops,
+        'ns_per_op': round(best / ops, 1),
+        'peak_bytes_per_op': round(max(peak - baseline, 0) / ops, 1),
+        'retained_bytes_per_op': round(max(current - baseline, 0) / ops, 1),
+    }
+
+
+def cpu_benchmarks(size, seed=SEED, repeat=5):
+    """Бенчмарки без БД для каталогу розміру size: {назва: результат}"""
+    products = build_catalog(size, seed)
+    carts = build_carts(products, seed)
+    promo_code = build_promo_code()
+    rng = random.Random(seed + 2)
+    quantities = [(product, rng.choice((1, 3, 5))) for product in products]
+    amounts = [_money(rng, 10, 20000) for _ in range(size)]
+    breakdown_items = [
+        [{'product': product, 'quantity': quantity, 'price': product.get_price_for_user(None, quantity)}
+         for product, quantity in cart]
+        for cart in carts
+    ]
+    from apps.orders.views import calculate_discount_breakdown
+
+    return {
+        'is_sale_active': measure(lambda product: product.is_sale_active(), products, repeat),
+        'build_price_matrix': measure(build_price_matrix, products, repeat),
+        'get_price_for_user': measure(lambda item: item[0].get_price_for_user(None, item[1]), quantities, repeat),
+        'get_price_for_user_wholesale': measure(
+            lambda item: item[0].get_price_for_user(WHOLESALE_USER, item[1]), quantities, repeat
+        ),
+        'get_stickers': measure(lambda product: product.get_stickers(), products, repeat),
+        'promo_code_apply_discount': measure(promo_code.apply_discount, amounts, repeat),
+        'calculate_discount_breakdown': measure(
+            lambda items: calculate_discount_breakdown(items, None), breakdown_items, repeat
+        ),
+        'cart_pricing': measure(lambda cart: price_cart(cart, promo_code), carts, repeat),
+    }
+
+
+class _Rollback(Exception):
+    pass
+
+
+def promotion_benchmark(size, seed=SEED):
+    """Promotion.apply_to_products на каталозі з size товарів; зміни відкочуються"""
+    from apps.promotions.models import Promotion
+
+    now = timezone.now()
+    result = {}
+    # Рядок логу на кожен товар у apply_to_products спотворив би вимір
+    logging.disable(logging.INFO)
+    try:
+        with transaction.atomic():
+            category = Category.objects.create(name='Бенчмарк', slug=f'benchmark-{seed}-{size}')
+            products = build_catalog(size, seed, category=category)
+            for product in products:
+                product.pk = None
+                product.slug = f'{product.slug}-{seed}'
+                product.sku = f'{product.sku}-{seed}'
+            Product.objects.bulk_create(products, batch_size=1000)
+            promotion = Promotion.objects.create(
+                name='Бенчмарк', retail_discount_percent=Decimal('10'), wholesale_discount_percent=Decimal('5'),
+                qty3_discount_percent=Decimal('7'), qty5_discount_percent=Decimal('8'),
+                start_date=now - timedelta(days=1), end_date=now + timedelta(days=1), is_active=True,
+            )
+            promotion.categories.add(category)
+
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+            started = time.perf_counter_ns()
+            applied = promotion.apply_to_products()
+            elapsed = time.perf_counter_ns() - started
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            result = {
+                'ops': applied,
+                'ns_per_op': round(elapsed / max(applied, 1), 1),
+                'peak_bytes_per_op': round(max(peak - baseline, 0) / max(applied, 1), 1),
+                'retained_bytes_per_op': round(max(current - baseline, 0) / max(applied, 1), 1),
+            }
+            raise _Rollback
+    except _Rollback:
+        pass
+    finally:
+        logging.disable(logging.NOTSET)
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+    return result
+
+
+def environment(seed=SEED):
+    """Метадані для порівняння звітів між комітами"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'seed': seed,
+        'created_at': timezone.now().isoformat(),
+    }
+
+
+def compare(current, baseline):
+    """{ключ: зміна ns/op у %} для спільних ключів двох звітів"""
+    deltas = {}
+    for key, result in current.items():
+        before = baseline.get(key)
+        if before and before.get('ns_per_op'):
+            deltas[key] = round((result['ns_per_op'] - before['ns_per_op']) / before['ns_per_op'] * 100, 1)
+    return deltas
@@ -0,0 +1,109 @@
+"""
+Масові операції над товарами для адмінки
+
+Кожна дія - фіксована кількість запитів незалежно від розміру вибірки:
+старі значення читаються одним values_list(), зміна - одним UPDATE,
+записи NewProduct та ProductChangeLog - через bulk_create.
+"""
+from django.db import transaction
+from django.db.models import Max
+
+from .models import NewProduct, ProductChangeLog
+
+# Поле товару -> тип зміни в ProductChangeLog
+TRACKED_FIELDS = {
+    'retail_price': 'price',
+    'wholesale_price': 'price',
+    'price_3_qty': 'price',
+    'price_5_qty': 'price',
+    'is_sale': 'sale',
+    'sale_price': 'sale',
+    'sale_wholesale_price': 'sale',
+    'sale_price_3_qty': 'sale',
+    'sale_price_5_qty': 'sale',
+    'sale_start_date': 'sale',
+    'sale_end_date': 'sale',
+    'is_active': 'visibility',
+    'stock': 'stock',
+    'is_new': 'status',
+    'is_featured': 'status',
+}
+
+BATCH_SIZE = 500
+
+
+def _as_text(value):
+    return '' if value is None else str(value)
+
+
+def build_log(product_id, field, old, new, user=None):
+    return ProductChangeLog(
+        product_id=product_id,
+        user=user if user is not None and user.is_authenticated else None,
+        field_name=field,
+        old_value=_as_text(old),
+        new_value=_as_text(new),
+        change_type=TRACKED_FIELDS.get(field, 'other'),
+    )
+
+
+def bulk_update_products(queryset, values, user=None):
+    """
+    UPDATE вибірки одним запитом + журнал змін для рядків, де значення справді змінилось.
+    Повертає кількість оновлених товарів.
+    """
+    fields = list(values)
+    with transaction.atomic():
+        before = list(queryset.order_by().values_list('pk', *fields))
+        if not before:
+            return 0
+        ids = [row[0] for row in before]
+        updated = queryset.model.objects.filter(pk__in=ids).update(**values)
+
+        logs = [
+            build_log(row[0], field, old, values[field], user)
+            for row in before
+            for field, old in zip(fields, row[1:])
+            if field in TRACKED_FIELDS and old != values[field]
+        ]
+        ProductChangeLog.objects.bulk_create(logs, batch_size=BATCH_SIZE)
+    return updated
+
+
+def add_new_products(product_ids):
+    """Додає товари в блок «Новинки» (в кінець списку) - один max() і один bulk_create"""
+    product_ids = list(product_ids)
+    if not product_ids:
+        return 0
+    existing = set(
+        NewProduct.objects.filter(product_id__in=product_ids).order_by().values_list('product_id', flat=True)
+    )
+    missing = [pk for pk in product_ids if pk not in existing]
+    if not missing:
+        return 0
+    max_order = NewProduct.objects.aggregate(Max('sort_order'))['sort_order__max'] or 0
+    NewProduct.objects.bulk_create(
+        [
+            NewProduct(product_id=pk, sort_order=max_order + position, is_active=True)
+            for position, pk in enumerate(missing, start=1)
+        ],
+        batch_size=BATCH_SIZE,
+        # Паралельне додавання того ж товару не повинно падати на OneToOne
+        ignore_conflicts=True,
+    )
+    return len(missing)
+
+
+def remove_new_products(product_ids):
+    return NewProduct.objects.filter(product_id__in=list(product_ids)).delete()[0]
+
+
+def log_form_changes(product, form, user=None):
+    """Журнал змін відстежуваних полів після збереження форми товару (один bulk_create)"""
+    logs = [
+        build_log(product.pk, field, form.initial.get(field), form.cleaned_data.get(field), user)
+        for field in form.changed_data
+        if field in TRACKED_FIELDS
+    ]
+    ProductChangeLog.objects.bulk_create(logs, batch_size=BATCH_SIZE)
+    return len(logs)
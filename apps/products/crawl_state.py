@@ -0,0 +1,117 @@
+"""
+Стан краулера sitemap: фронтир, валідатори HTTP-кешу та чекпоінти
+Зберігається в локальному JSON-файлі, щоб імпорт можна було продовжити після збою
+"""
+import json
+import os
+import tempfile
+import threading
+
+
+class CrawlState:
+    """
+    Локальне сховище стану краулера.
+
+    - validators: {url: {'etag': ..., 'last_modified': ...}} для умовних GET
+    - sitemaps: {sitemap_url: [urls]} - URL товарів з розпарсених sitemap на випадок 304
+    - sitemap_index: {index_url: [child_sitemap_urls]} - дочірні sitemap з sitemap index
+    - frontier: URL товарів, які ще не оброблені в поточному проході
+    - failed: URL, що впали з помилкою (повторюються в наступному проході)
+    """
+
+    VERSION = 2
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.validators = {}
+        self.sitemaps = {}
+        self.sitemap_index = {}
+        self.frontier = []
+        self.failed = []
+
+    @classmethod
+    def load(cls, path):
+        """Завантажує стан з файлу (порожній стан, якщо файлу немає або він пошкоджений)"""
+        state = cls(path)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return state
+
+        if data.get('version') != cls.VERSION:
+            return state
+
+        state.validators = data.get('validators', {})
+        state.sitemaps = data.get('sitemaps', {})
+        state.sitemap_index = data.get('sitemap_index', {})
+        state.frontier = data.get('frontier', [])
+        state.failed = data.get('failed', [])
+        return state
+
+    def save(self):
+        """Атомарно записує стан (tmp-файл + os.replace), щоб збій не зіпсував чекпоінт"""
+        with self._lock:
+            data = {
+                'version': self.VERSION,
+                'validators': self.validators,
+                'sitemaps': self.sitemaps,
+                'sitemap_index': self.sitemap_index,
+                'frontier': self.frontier,
+                'failed': self.failed,
+            }
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.crawl-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    def reset(self):
+        """Очищає весь стан (повний перекраул)"""
+        with self._lock:
+            self.validators = {}
+            self.sitemaps = {}
+            self.sitemap_index = {}
+            self.frontier = []
+            self.failed = []
+
+    def conditional_headers(self, url):
+        """Заголовки If-None-Match / If-Modified-Since для URL"""
+        with self._lock:
+            validator = self.validators.get(url)
+        if not validator:
+            return {}
+
+        headers = {}
+        if validator.get('etag'):
+            headers['If-None-Match'] = validator['etag']
+        if validator.get('last_modified'):
+            headers['If-Modified-Since'] = validator['last_modified']
+        return headers
+
+    def remember(self, url, response):
+        """Запам'ятовує ETag / Last-Modified з успішної відповіді"""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        with self._lock:
+            self.validators[url] = {'etag': etag, 'last_modified': last_modified}
+
+    def mark_processed(self, urls):
+        """Прибирає оброблені URL з фронтиру"""
+        done = set(urls)
+        with self._lock:
+            self.frontier = [url for url in self.frontier if url not in done]
+
+    def mark_failed(self, url):
+        with self._lock:
+            if url not in self.failed:
+                self.failed.append(url)
@@ -0,0 +1,31 @@
+"""
+CSV-експорт товарів (див. apps.core.exports)
+"""
+from apps.core.exports import CSVExport
+
+
+class ProductExport(CSVExport):
+    """Каталог товарів"""
+
+    name = 'products'
+    header = [
+        'SKU', 'Назва', 'Категорія', 'Роздрібна ціна', 'Оптова ціна',
+        'Акційна ціна', 'Кількість', 'Статус'
+    ]
+
+    def prepare(self, queryset):
+        # Зображення експорту не потрібні - прибираємо prefetch зі списку адмінки
+        return queryset.select_related('category').prefetch_related(None)
+
+    def rows(self, products):
+        for product in products:
+            yield [
+                product.sku,
+                product.name,
+                product.category.name,
+                product.retail_price,
+                product.wholesale_price or '',
+                product.sale_price or '',
+                product.stock,
+                'Активний' if product.is_active else 'Неактивний'
+            ]
@@ -0,0 +1,152 @@
+"""
+Фоновий конвеєр оптимізації зображень товарів
+
+ProductImage.save() лише ставить завдання products.process_image у чергу
+apps.core.jobs (у тій самій транзакції), а обробку (адаптивні ширини WebP/JPEG
+без метаданих, розміри, LQIP-плейсхолдер) виконує обробник run_jobs - завдання
+не губиться при перезапуску веб-процесу. Незавершені/невдалі зображення
+дообробляє команда process_product_images (періодично з JOBS_PERIODIC).
+"""
+import base64
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+RESPONSIVE_WIDTHS = (320, 480, 800, 1200)
+VARIANT_FORMATS = {
+    'webp': {'format': 'WEBP', 'params': {'quality': 80, 'method': 4}},
+    'jpeg': {'format': 'JPEG', 'params': {'quality': 82, 'optimize': True, 'progressive': True}},
+}
+VARIANTS_DIR = 'products/variants'
+LQIP_WIDTH = 16
+
+
+def is_cloudinary_storage():
+    """Cloudinary сам генерує варіанти через URL-трансформації"""
+    return 'cloudinary' in default_storage.__class__.__module__.lower()
+
+
+def enqueue_image(image_id):
+    """Ставить зображення в чергу фонових завдань (виконається після коміту поточної транзакції)"""
+    if not getattr(settings, 'IMAGE_PIPELINE_ASYNC', True):
+        return
+    from apps.core.jobs import enqueue
+
+    enqueue('products.process_image', {'image_id': image_id}, dedupe_key=f'image:{image_id}')
+
+
+def _flatten_to_rgb(img):
+    """RGBA/LA/P -> RGB на білому фоні"""
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        return background
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
+
+
+def _encode(img, fmt):
+    """Кодує без EXIF/ICC - PIL не переносить метадані, якщо їх не передати явно"""
+    spec = VARIANT_FORMATS[fmt]
+    output = BytesIO()
+    img.save(output, format=spec['format'], **spec['params'])
+    return output.getvalue()
+
+
+def build_placeholder(img):
+    """LQIP: крихітний розмитий JPEG як data URI (~300-600 байт)"""
+    thumb = img.copy()
+    height = max(1, round(img.height * LQIP_WIDTH / img.width))
+    thumb = thumb.resize((LQIP_WIDTH, height), Image.Resampling.BILINEAR)
+    output = BytesIO()
+    thumb.save(output, format='JPEG', quality=40)
+    return 'data:image/jpeg;base64,' + base64.b64encode(output.getvalue()).decode('ascii')
+
+
+def target_widths(original_width):
+    """Ширини, не більші за оригінал (апскейл не робимо)"""
+    widths = [w for w in RESPONSIVE_WIDTHS if w <= original_width]
+    return widths or [original_width]
+
+
+def delete_variants(variants):
+    for names in (variants or {}).values():
+        for name in names.values():
+            try:
+                default_storage.delete(name)
+            except Exception:
+                logger.warning('Could not delete image variant %s', name)
+
+
+def delete_asset(name, variants=None):
+    """Видаляє оригінал і варіанти зі storage (викликати лише коли посилань не лишилось)"""
+    try:
+        default_storage.delete(name)
+    except Exception:
+        logger.warning('Could not delete image %s', name)
+    delete_variants(variants)
+
+
+def process_image(image_id):
+    """
+    Обробляє одне зображення. Повертає True при успіху.
+    Модель оновлюється через queryset.update(), щоб не викликати save() повторно.
+    Результат записується всім рядкам, що посилаються на той самий файл.
+    """
+    from apps.products.models import ProductImage
+
+    product_image = ProductImage.objects.filter(pk=image_id).first()
+    if not product_image or not product_image.image:
+        return False
+
+    same_asset = ProductImage.objects.filter(image=product_image.image.name)
+    same_asset.update(processing_status=ProductImage.STATUS_PROCESSING)
+
+    try:
+        with product_image.image.storage.open(product_image.image.name, 'rb') as f:
+            img = Image.open(f)
+            img.load()
+
+        img = _flatten_to_rgb(ImageOps.exif_transpose(img))
+        width, height = img.size
+
+        variants = {}
+        if not is_cloudinary_storage():
+            delete_variants(product_image.variants)
+            stem = os.path.splitext(os.path.basename(product_image.image.name))[0]
+            for w in target_widths(width):
+                resized = img if w == width else img.resize(
+                    (w, max(1, round(height * w / width))), Image.Resampling.LANCZOS
+                )
+                for fmt in VARIANT_FORMATS:
+                    ext = 'jpg' if fmt == 'jpeg' else fmt
+                    name = default_storage.save(
+                        f'{VARIANTS_DIR}/{stem}-{w}.{ext}', ContentFile(_encode(resized, fmt))
+                    )
+                    variants.setdefault(fmt, {})[str(w)] = name
+
+        same_asset.update(
+            width=width,
+            height=height,
+            placeholder=build_placeholder(img),
+            variants=variants,
+            processing_status=ProductImage.STATUS_READY,
+            processing_error='',
+        )
+        return True
+    except Exception as e:
+        logger.warning('Image processing failed for ProductImage %s: %s', image_id, e)
+        same_asset.update(
+            processing_status=ProductImage.STATUS_FAILED,
+            processing_error=str(e)[:500],
+        )
+        return False
@@ -0,0 +1,185 @@
+"""
+Паралельний аудит зображень товарів
+Стрімить ProductImage порціями, у пулі потоків перевіряє наявність файлу в storage,
+розміри та вагу, шукає дублікати за перцептивним хешем (dHash).
+Використання:
+    python manage.py audit_images
+    python manage.py audit_images --workers 16 --output reports/images.json --threshold 3
+"""
+import json
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from PIL import Image
+
+from apps.products.models import ProductImage
+
+TOTAL_KEYS = (
+    'images', 'ok', 'missing', 'broken', 'oversized', 'bytes_total', 'duplicate_groups', 'duplicate_images',
+)
+
+
+def dhash(img, size=8):
+    """Перцептивний difference-hash: 64-бітне число, стійке до ресайзу і перекодування"""
+    gray = img.convert('L').resize((size + 1, size), Image.Resampling.LANCZOS)
+    pixels = list(gray.getdata())
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def find_duplicate_groups(hashes, threshold=0):
+    """
+    Групує зображення з відстанню Геммінга <= threshold.
+    Для threshold <= 3 використовує 4 смуги по 16 біт (принцип Діріхле):
+    схожі хеші обов'язково збігаються хоча б в одній смузі, тож порівнюємо лише кандидатів.
+    """
+    parent = {}
+
+    def find(x):
+        while parent.setdefault(x, x) != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(a, b):
+        parent[find(a)] = find(b)
+
+    by_hash = defaultdict(list)
+    for image_id, value in hashes.items():
+        by_hash[value].append(image_id)
+    for ids in by_hash.values():
+        for other in ids[1:]:
+            union(ids[0], other)
+
+    if threshold > 0:
+        unique = list(by_hash)
+        bands = defaultdict(list)
+        for value in unique:
+            for band in range(4):
+                bands[(band, (value >> (band * 16)) & 0xFFFF)].append(value)
+        for candidates in bands.values():
+            for i, a in enumerate(candidates):
+                for b in candidates[i + 1:]:
+                    if bin(a ^ b).count('1') <= threshold:
+                        union(by_hash[a][0], by_hash[b][0])
+
+    groups = defaultdict(list)
+    for image_id in hashes:
+        groups[find(image_id)].append(image_id)
+    return sorted(sorted(g) for g in groups.values() if len(g) > 1)
+
+
+class Command(BaseCommand):
+    help = 'Паралельний аудит зображень: відсутні, биті, завеликі, дублікати'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Потоків для I/O (default: 8)')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Рядків БД за порцію')
+        parser.add_argument('--max-bytes', type=int, default=500 * 1024, help='Поріг ваги файлу (байт)')
+        parser.add_argument('--max-dimension', type=int, default=2000, help='Поріг ширини/висоти (px)')
+        parser.add_argument('--threshold', type=int, default=0,
+                            help='Макс. відстань Геммінга для дублікатів (0 = однаковий хеш, до 3 - швидкий пошук)')
+        parser.add_argument('--output', default='image_audit.json', help='Шлях до JSON звіту')
+
+    def handle(self, *args, **options):
+        self.max_bytes = options['max_bytes']
+        self.max_dimension = options['max_dimension']
+        chunk_size = options['chunk_size']
+
+        self.stdout.write(self.style.SUCCESS('🔍 Аудит зображень товарів'))
+        started = timezone.now()
+
+        rows = ProductImage.objects.order_by('pk').values_list(
+            'pk', 'product_id', 'image'
+        ).iterator(chunk_size=chunk_size)
+
+        report = {'missing': [], 'broken': [], 'oversized': []}
+        hashes = {}
+        # Усі ключі заздалегідь - нульові лічильники теж потрапляють у JSON
+        totals = dict.fromkeys(TOTAL_KEYS, 0)
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    self.collect(executor.map(self.inspect, chunk), report, hashes, totals)
+                    chunk = []
+            if chunk:
+                self.collect(executor.map(self.inspect, chunk), report, hashes, totals)
+
+        duplicates = find_duplicate_groups(hashes, min(options['threshold'], 3))
+        totals['duplicate_groups'] = len(duplicates)
+        totals['duplicate_images'] = sum(len(g) - 1 for g in duplicates)
+        report['duplicates'] = duplicates
+
+        report = {
+            'generated_at': started.isoformat(),
+            'duration_seconds': round((timezone.now() - started).total_seconds(), 2),
+            'thresholds': {'max_bytes': self.max_bytes, 'max_dimension': self.max_dimension},
+            'totals': totals,
+            **report,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        self.stdout.write(f'📊 Перевірено: {totals["images"]} ({report["duration_seconds"]}с)')
+        self.stdout.write(f'  • Відсутні у storage: {totals["missing"]}')
+        self.stdout.write(f'  • Биті (не декодуються): {totals["broken"]}')
+        self.stdout.write(f'  • Завеликі: {totals["oversized"]}')
+        self.stdout.write(f'  • Дублікати: {totals["duplicate_images"]} (груп: {totals["duplicate_groups"]})')
+        self.stdout.write(self.style.SUCCESS(f'✅ Звіт: {options["output"]}'))
+
+    def collect(self, results, report, hashes, totals):
+        for result in results:
+            totals['images'] += 1
+            status = result.pop('status')
+            image_hash = result.pop('hash', None)
+            if status in ('missing', 'broken'):
+                totals[status] += 1
+                report[status].append(result)
+                continue
+            totals['ok'] += 1
+            totals['bytes_total'] += result['bytes']
+            hashes[result['id']] = image_hash
+            if (result['bytes'] > self.max_bytes
+                    or max(result['width'], result['height']) > self.max_dimension):
+                totals['oversized'] += 1
+                report['oversized'].append(result)
+
+    def inspect(self, row):
+        """Виконується в потоці пулу: читає файл один раз і рахує все з нього"""
+        image_id, product_id, name = row
+        result = {'id': image_id, 'product_id': product_id, 'name': name}
+        storage = ProductImage._meta.get_field('image').storage
+
+        try:
+            if not name:
+                raise FileNotFoundError('порожнє поле image')
+            with storage.open(name, 'rb') as f:
+                data = f.read()
+        except Exception as e:
+            result['status'] = 'missing'
+            result['error'] = str(e)[:200]
+            return result
+
+        try:
+            img = Image.open(BytesIO(data))
+            img.load()
+        except Exception as e:
+            result['status'] = 'broken'
+            result['error'] = str(e)[:200]
+            return result
+
+        result['bytes'] = len(data)
+        result['width'], result['height'] = img.size
+        result['hash'] = dhash(img)
+        result['status'] = 'ok'
+        return result
@@ -0,0 +1,60 @@
+"""
+Мікробенчмарки цінової логіки (apps.products.benchmarks)
+
+    python manage.py benchmark_pricing --json bench.json
+    python manage.py benchmark_pricing --sizes 1000,10000 --compare bench.json
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Бенчмарки цін, розшифровки знижок, промокодів і акцій на синтетичних каталогах (ns/op, пам\'ять)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default=','.join(map(str, benchmarks.SIZES)), help='Розміри каталогу через кому')
+        parser.add_argument('--seed', type=int, default=benchmarks.SEED, help='Seed синтетичного каталогу')
+        parser.add_argument('--repeat', type=int, default=5, help='Прогонів на бенчмарк (береться найкращий)')
+        parser.add_argument('--db', action='store_true', help='Також Promotion.apply_to_products (транзакція з відкатом)')
+        parser.add_argument('--db-max-size', type=int, default=10000, help='Максимальний каталог для --db')
+        parser.add_argument('--json', default='', help='Зберегти звіт у JSON-файл')
+        parser.add_argument('--compare', default='', help='JSON-звіт попереднього прогону для порівняння')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError(f"Некоректні розміри: {options['sizes']}")
+
+        baseline = {}
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as f:
+                baseline = json.load(f)['results']
+
+        results = {}
+        for size in sizes:
+            self.stdout.write(f'⏱️ Каталог {size} товарів...')
+            for name, result in benchmarks.cpu_benchmarks(size, options['seed'], options['repeat']).items():
+                results[f'{name}@{size}'] = result
+            if options['db'] and size <= options['db_max_size']:
+                results[f'promotion_apply_to_products@{size}'] = benchmarks.promotion_benchmark(size, options['seed'])
+
+        deltas = benchmarks.compare(results, baseline)
+        self.stdout.write(f"\n{'Бенчмарк':<46}{'ns/op':>12}{'пік B/op':>11}{'лишилось B/op':>15}{'Δ%':>8}")
+        for key, result in results.items():
+            delta = deltas.get(key)
+            line = (
+                f"{key:<46}{result['ns_per_op']:>12}{result['peak_bytes_per_op']:>11}"
+                f"{result['retained_bytes_per_op']:>15}{'' if delta is None else f'{delta:+.1f}':>8}"
+            )
+            style = self.style.WARNING if delta is not None and delta > 10 else self.style.SUCCESS if delta is not None and delta < -10 else None
+            self.stdout.write(style(line) if style else line)
+
+        if options['json']:
+            report = {'environment': benchmarks.environment(options['seed']), 'results': results}
+            with open(options['json'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"\n💾 Звіт збережено: {options['json']}"))
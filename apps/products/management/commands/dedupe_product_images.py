@@ -0,0 +1,125 @@
+"""
+Дедуплікація зображень товарів за вмістом (SHA-256)
+1. Рахує хеш для зображень без content_hash (паралельне завантаження файлів)
+2. Переводить рядки з однаковим хешем на один спільний файл
+3. Видаляє зі storage файли, на які більше ніхто не посилається
+Використання:
+    python manage.py dedupe_product_images --dry-run
+    python manage.py dedupe_product_images --workers 8
+"""
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from apps.products.image_pipeline import delete_asset
+from apps.products.models import ProductImage
+
+
+class Command(BaseCommand):
+    help = 'Знаходить однакові зображення і залишає один файл у storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Лише показати, що буде змінено')
+        parser.add_argument('--workers', type=int, default=8, help='Потоків для завантаження файлів')
+        parser.add_argument('--keep-files', action='store_true', help='Не видаляти файли-дублікати зі storage')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.stdout.write(self.style.SUCCESS('🧬 Дедуплікація зображень товарів'))
+        if self.dry_run:
+            self.stdout.write(self.style.WARNING('⚠️  DRY RUN - змін не буде'))
+
+        # У dry-run усе виконується в транзакції, яка відкочується наприкінці
+        with transaction.atomic():
+            self.backfill_hashes(options['workers'])
+            orphans = self.merge_duplicates()
+            if self.dry_run:
+                transaction.set_rollback(True)
+
+        if orphans and not self.dry_run and not options['keep_files']:
+            deleted = 0
+            for name, variants in orphans:
+                # Повторна перевірка лічильника посилань перед видаленням
+                if not ProductImage.objects.filter(image=name).exists():
+                    delete_asset(name, variants)
+                    deleted += 1
+            self.stdout.write(f'🗑️  Видалено файлів зі storage: {deleted}')
+
+        self.stdout.write(self.style.SUCCESS('✅ Готово'))
+
+    def backfill_hashes(self, workers):
+        """Хешує кожен унікальний файл один раз, навіть якщо на нього посилаються кілька рядків"""
+        names = list(
+            ProductImage.objects.filter(content_hash='').exclude(image='')
+            .values_list('image', flat=True).distinct()
+        )
+        if not names:
+            return
+
+        self.stdout.write(f'🔑 Хешування {len(names)} файлів...')
+        storage = ProductImage._meta.get_field('image').storage
+        hashed = failed = 0
+
+        def hash_file(name):
+            try:
+                digest = hashlib.sha256()
+                with storage.open(name, 'rb') as f:
+                    for chunk in f.chunks():
+                        digest.update(chunk)
+                return name, digest.hexdigest()
+            except Exception:
+                return name, None
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for name, content_hash in executor.map(hash_file, names):
+                if content_hash is None:
+                    failed += 1
+                    continue
+                hashed += 1
+                ProductImage.objects.filter(image=name).update(content_hash=content_hash)
+
+        self.stdout.write(f'  ✓ Захешовано: {hashed}')
+        if failed:
+            self.stdout.write(self.style.WARNING(f'  ⚠️  Недоступних файлів: {failed}'))
+
+    def merge_duplicates(self):
+        """Повертає список (name, variants) файлів, що залишились без посилань"""
+        duplicate_hashes = (
+            ProductImage.objects.exclude(content_hash='')
+            .values('content_hash')
+            .annotate(files=Count('image', distinct=True))
+            .filter(files__gt=1)
+            .values_list('content_hash', flat=True)
+        )
+
+        orphans = []
+        rows_updated = 0
+        for content_hash in list(duplicate_hashes):
+            rows = list(
+                ProductImage.objects.filter(content_hash=content_hash)
+                .order_by('pk')
+                .values('pk', 'image', 'width', 'height', 'placeholder', 'variants',
+                        'processing_status', 'processing_error')
+            )
+            # Канонічний файл - найстаріший вже оброблений, інакше найстаріший
+            canonical = next(
+                (r for r in rows if r['processing_status'] == ProductImage.STATUS_READY), rows[0]
+            )
+            duplicates = [r for r in rows if r['image'] != canonical['image']]
+
+            seen = set()
+            for row in duplicates:
+                if row['image'] not in seen:
+                    seen.add(row['image'])
+                    orphans.append((row['image'], row['variants']))
+
+            rows_updated += len(duplicates)
+            fields = {k: v for k, v in canonical.items() if k != 'pk'}
+            ProductImage.objects.filter(pk__in=[r['pk'] for r in duplicates]).update(**fields)
+
+        self.stdout.write(f'🔗 Рядків переведено на спільний файл: {rows_updated}')
+        self.stdout.write(f'📦 Зайвих файлів: {len(orphans)}')
+        return orphans
@@ -193,11 +193,8 @@ class Command(BaseCommand):
             # Відкриваємо локальний файл і зберігаємо на Cloudinary БЕЗ оптимізації
             with open(local_path, 'rb') as f:
                 # skip_optimization=True щоб не запускати PIL оптимізацію
-                product_image.image.save(
-                    os.path.basename(path),
-                    File(f),
-                    save=False
-                )
+                # Присвоєння замість image.save(): дублікат за хешем не завантажується вдруге
+                product_image.image = File(f, name=os.path.basename(path))
                 product_image.save(skip_optimization=True)
             
             return True
@@ -390,7 +390,9 @@ class Command(BaseCommand):
                     alt_text=product.name
                 )
                 # Зберігаємо безпосередньо на Cloudinary без оптимізації
-                product_image.image.save(filename, ContentFile(response.content), save=True)
+                # Хеш вмісту рахується до завантаження: однакове фото не завантажується вдруге
+                product_image.image = ContentFile(response.content, name=filename)
+                product_image.save()
                 
                 self.stats['images'] += 1
                 del response
@@ -2,17 +2,24 @@
 Швидкий імпорт товарів через sitemap.xml
 Оптимізовано для роботи з обмеженою пам'яттю (512MB на Render)
 Використання: python manage.py import_products_sitemap
+              python manage.py import_products_sitemap --enqueue  (виконає обробник run_jobs)
+
+Краулер відновлюваний: фронтир і ETag/Last-Modified зберігаються в --state-file,
+повторні запуски шлють умовні GET і парсять лише змінені сторінки (304 пропускаються).
 """
 import requests
 from bs4 import BeautifulSoup
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.core.files.base import ContentFile
 from django.utils.text import slugify
-from apps.products.models import Category, Product, ProductImage, ProductAttribute
+from apps.products.crawl_state import CrawlState
+from apps.products.models import Category, Product, ProductImage
 from decimal import Decimal
 import time
 import re
 import gc
+import os
 from urllib.parse import urljoin
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
@@ -31,8 +38,10 @@ class Command(BaseCommand):
             'products': 0,
             'images': 0,
             'errors': 0,
-            'skipped': 0
+            'skipped': 0,
+            'not_modified': 0,
         }
+        self.state = None
         self.default_category = None
         self.category_cache = {}
         
@@ -81,8 +90,38 @@ class Command(BaseCommand):
             default=2,
             help='Кількість паралельних потоків (default: 2 для обмеженої пам\'яті)'
         )
+        parser.add_argument(
+            '--state-file',
+            default=os.path.join(settings.BASE_DIR, 'products_data', '.sitemap_crawl_state.json'),
+            help='Файл стану краулера (фронтир + ETag/Last-Modified)'
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Скинути збережений стан і почати повний краул'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Не надсилати умовні запити (завантажити всі сторінки заново)'
+        )
+        parser.add_argument(
+            '--enqueue',
+            action='store_true',
+            help='Поставити імпорт у чергу фонових завдань і завершитись'
+        )
 
+    def enqueue(self, options):
+        from apps.core.jobs import PRIORITY_LOW, enqueue
+        
+        payload = {name: options[name] for name in ('limit', 'skip_images', 'workers', 'state_file', 'reset', 'force')}
+        job = enqueue('products.import_sitemap', payload, priority=PRIORITY_LOW, dedupe_key='products:import_sitemap')
+        self.stdout.write(self.style.SUCCESS(f'📥 Імпорт поставлено в чергу: завдання #{job.pk}'))
+    
     def handle(self, *args, **options):
+        if options.get('enqueue'):
+            return self.enqueue(options)
+        
         limit = options.get('limit')
         skip_images = options.get('skip_images', False)
         workers = min(options.get('workers', 2), 3)  # Максимум 3 workers для економії пам'яті
@@ -96,16 +135,36 @@ class Command(BaseCommand):
             defaults={'name': 'Імпорт з Webosova', 'is_active': True}
         )
         
+        self.force = options.get('force', False)
+        self.state = CrawlState.load(options['state_file'])
+        if options.get('reset'):
+            self.state.reset()
+        
         try:
-            # Отримуємо список всіх URL товарів з sitemap
-            product_urls = self.get_product_urls_from_sitemap()
-            
-            if not product_urls:
-                self.stdout.write(self.style.ERROR('❌ Не знайдено товарів у sitemap'))
-                return
-            
-            if limit:
-                product_urls = product_urls[:limit]
+            if self.state.frontier:
+                # Продовжуємо з останнього чекпоінту
+                product_urls = list(self.state.frontier)
+                self.stdout.write(f'♻️  Продовження з чекпоінту: {len(product_urls)} URL у фронтирі')
+                if limit:
+                    product_urls = product_urls[:limit]
+            else:
+                # Отримуємо список всіх URL товарів з sitemap
+                product_urls = self.get_product_urls_from_sitemap()
+                
+                # Невдалі URL з попереднього проходу йдуть першими
+                retry_urls = [url for url in self.state.failed if url not in product_urls]
+                product_urls = retry_urls + product_urls
+                self.state.failed = []
+                
+                if not product_urls:
+                    self.stdout.write(self.style.ERROR('❌ Не знайдено товарів у sitemap'))
+                    return
+                
+                if limit:
+                    product_urls = product_urls[:limit]
+                
+                self.state.frontier = list(product_urls)
+                self.state.save()
             
             total_products = len(product_urls)
             self.stdout.write(f'📦 Знайдено товарів: {total_products}')
@@ -136,10 +195,16 @@ class Command(BaseCommand):
                                     self.stdout.write(f'  ✓ {self.stats["products"]}/{total_products}')
                         except TimeoutError:
                             self.stats['errors'] += 1
+                            self.state.mark_failed(url)
                         except Exception as e:
                             self.stats['errors'] += 1
+                            self.state.mark_failed(url)
                             # Не виводимо помилки для економії пам'яті
                 
+                # Чекпоінт: батч оброблено, зберігаємо фронтир і валідатори
+                self.state.mark_processed(batch_urls)
+                self.state.save()
+                
                 # Звільняємо пам'ять після кожного батчу
                 gc.collect()
                 time.sleep(3)  # Збільшили паузу для стабільності
@@ -153,6 +218,7 @@ class Command(BaseCommand):
             self.stdout.write(f'  • Товарів імпортовано: {self.stats["products"]}')
             self.stdout.write(f'  • Зображень: {self.stats["images"]}')
             self.stdout.write(f'  • Пропущено (вже існують): {self.stats["skipped"]}')
+            self.stdout.write(f'  • Без змін (304): {self.stats["not_modified"]}')
             if self.stats['errors'] > 0:
                 self.stdout.write(self.style.WARNING(f'  • Помилок: {self.stats["errors"]}'))
                 
@@ -160,34 +226,59 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR(f'❌ Критична помилка: {str(e)}'))
             raise
         finally:
+            # Зберігаємо стан навіть при збої, щоб наступний запуск продовжив з чекпоінту
+            self.state.save()
             # Фінальна очистка
             gc.collect()
 
+    def conditional_get(self, url, **kwargs):
+        """
+        GET з If-None-Match / If-Modified-Since.
+        Повертає відповідь; status_code == 304 означає, що ресурс не змінився.
+        """
+        headers = {} if self.force else self.state.conditional_headers(url)
+        return self.session.get(url, headers=headers, **kwargs)
+
     def get_product_urls_from_sitemap(self):
         """Отримує всі URL товарів з sitemap.xml"""
         self.stdout.write('🗺️ Завантаження sitemap.xml...')
+        sitemap_url = f'{self.base_url}/sitemap.xml'
         
         try:
-            response = self.session.get(f'{self.base_url}/sitemap.xml')
-            response.raise_for_status()
+            response = self.conditional_get(sitemap_url, timeout=30)
             
-            soup = BeautifulSoup(response.text, 'xml')
-            urls = []
-            
-            # Перевіряємо чи це sitemap index
-            sitemap_locs = soup.find_all('sitemap')
-            if sitemap_locs:
-                self.stdout.write(f'  Знайдено sitemap index з {len(sitemap_locs)} файлами')
-                # Це sitemap index - завантажуємо кожен підфайл
-                for sitemap in sitemap_locs:
-                    loc = sitemap.find('loc')
-                    if loc:
-                        sitemap_url = loc.get_text()
-                        self.stdout.write(f'  Завантаження {sitemap_url}...')
-                        urls.extend(self.parse_single_sitemap(sitemap_url))
+            if response.status_code == 304 and sitemap_url in self.state.sitemap_index:
+                self.stdout.write('  sitemap.xml не змінився (304)')
+                child_sitemaps = self.state.sitemap_index[sitemap_url]
+            elif response.status_code == 304 and sitemap_url in self.state.sitemaps:
+                # Звичайний sitemap не змінився - закешований список товарів
+                self.stdout.write('  sitemap.xml не змінився (304)')
+                return list(self.state.sitemaps[sitemap_url])
             else:
-                # Це звичайний sitemap
-                urls = self.parse_single_sitemap(f'{self.base_url}/sitemap.xml')
+                response.raise_for_status()
+                soup = BeautifulSoup(response.text, 'xml')
+                
+                # Перевіряємо чи це sitemap index
+                sitemap_locs = soup.find_all('sitemap')
+                if not sitemap_locs:
+                    # Це звичайний sitemap - парсимо вже завантажену відповідь
+                    self.state.sitemap_index.pop(sitemap_url, None)
+                    self.state.sitemaps[sitemap_url] = self.extract_product_urls(soup)
+                    self.state.remember(sitemap_url, response)
+                    return list(self.state.sitemaps[sitemap_url])
+                
+                child_sitemaps = [
+                    loc.get_text() for loc in (s.find('loc') for s in sitemap_locs) if loc
+                ]
+                self.state.sitemaps.pop(sitemap_url, None)
+                self.state.sitemap_index[sitemap_url] = child_sitemaps
+                self.state.remember(sitemap_url, response)
+            
+            self.stdout.write(f'  Знайдено sitemap index з {len(child_sitemaps)} файлами')
+            urls = []
+            for child_url in child_sitemaps:
+                self.stdout.write(f'  Завантаження {child_url}...')
+                urls.extend(self.parse_single_sitemap(child_url))
             
             return urls
             
@@ -196,26 +287,35 @@ class Command(BaseCommand):
             return []
     
     def parse_single_sitemap(self, sitemap_url):
-        """Парсить окремий sitemap файл"""
+        """Парсить окремий sitemap файл (при 304 повертає закешований список)"""
         try:
-            response = self.session.get(sitemap_url)
+            response = self.conditional_get(sitemap_url, timeout=30)
+            if response.status_code == 304 and sitemap_url in self.state.sitemaps:
+                return list(self.state.sitemaps[sitemap_url])
+            
             response.raise_for_status()
             soup = BeautifulSoup(response.text, 'xml')
+            urls = self.extract_product_urls(soup)
             
-            urls = []
-            for loc in soup.find_all('loc'):
-                url = loc.get_text()
-                # Пропускаємо російську версію сайту
-                if '/ru/' in url:
-                    continue
-                # Товари мають формат /pXXXXXX
-                if re.search(r'/p\d+', url):
-                    urls.append(url)
-            
+            self.state.sitemaps[sitemap_url] = urls
+            self.state.remember(sitemap_url, response)
             return urls
         except Exception as e:
             self.stdout.write(self.style.WARNING(f'    Помилка: {str(e)}'))
-            return []
+            return list(self.state.sitemaps.get(sitemap_url, []))
+    
+    def extract_product_urls(self, soup):
+        """Вибирає URL товарів з розпарсеного sitemap"""
+        urls = []
+        for loc in soup.find_all('loc'):
+            url = loc.get_text()
+            # Пропускаємо російську версію сайту
+            if '/ru/' in url:
+                continue
+            # Товари мають формат /pXXXXXX
+            if re.search(r'/p\d+', url):
+                urls.append(url)
+        return urls
 
     def import_product(self, product_url, skip_images=False):
         """Імпортує один товар"""
@@ -223,7 +323,12 @@ class Command(BaseCommand):
             # Збільшили timeout + додали retries
             for attempt in range(2):
                 try:
-                    response = self.session.get(product_url, timeout=35, stream=True)
+                    response = self.conditional_get(product_url, timeout=35, stream=True)
+                    if response.status_code == 304:
+                        # Сторінка не змінилась з минулого імпорту - не парсимо
+                        response.close()
+                        self.stats['not_modified'] += 1
+                        return None
                     response.raise_for_status()
                     break
                 except Exception as e:
@@ -259,6 +364,7 @@ class Command(BaseCommand):
             while Product.objects.filter(slug=slug).exists():
                 # Якщо існує точна назва - пропускаємо (вже імпортовано)
                 if counter == 1 and Product.objects.filter(name=data['name'][:200]).exists():
+                    self.state.remember(product_url, response)
                     self.stats['skipped'] += 1
                     return None
                 slug = f"{base_slug}-{counter}"
@@ -279,9 +385,10 @@ class Command(BaseCommand):
             if not skip_images and data.get('images'):
                 self.download_images(product, data['images'])
             
-            # Додаємо характеристики
-            if data.get('attributes'):
-                self.create_attributes(product, data['attributes'])
+            # Валідатори зберігаємо лише після успішного імпорту,
+            # інакше наступний запуск отримав би 304 для неімпортованого товару
+            self.state.remember(product_url, response)
+
             
             return product
             
@@ -355,7 +462,9 @@ class Command(BaseCommand):
                     is_main=(idx == 0),
                     sort_order=idx
                 )
-                product_image.image.save(filename, ContentFile(response.content), save=True)
+                # Хеш вмісту рахується до завантаження: однакове фото не завантажується вдруге
+                product_image.image = ContentFile(response.content, name=filename)
+                product_image.save()
                 self.stats['images'] += 1
                 
                 # Очищуємо response з пам'яті
@@ -376,14 +485,3 @@ class Command(BaseCommand):
                 return self.category_cache[category_slug]
         
         return self.default_category
-    
-    def create_attributes(self, product, attributes):
-        """Створює характеристики"""
-        for idx, attr in enumerate(attributes[:20]):
-            ProductAttribute.objects.create(
-                product=product,
-                name=attr['name'][:100],
-                value=attr['value'][:200],
-                sort_order=idx
-            )
-
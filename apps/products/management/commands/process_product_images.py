@@ -0,0 +1,67 @@
+"""
+Фоновий воркер конвеєра зображень: дообробляє зображення у статусі "В черзі"
+(наприклад, після рестарту процесу) та повторює невдалі.
+Використання:
+    python manage.py process_product_images
+    python manage.py process_product_images --retry-failed --limit 500
+    python manage.py process_product_images --loop --interval 30
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.products.image_pipeline import process_image
+from apps.products.models import ProductImage
+
+
+class Command(BaseCommand):
+    help = 'Обробляє зображення товарів (адаптивні WebP/JPEG, розміри, LQIP)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help='Максимум зображень за прохід')
+        parser.add_argument('--retry-failed', action='store_true', help='Повторити невдалі')
+        parser.add_argument('--all', action='store_true', help='Переобробити всі зображення')
+        parser.add_argument('--loop', action='store_true', help='Працювати постійно як воркер')
+        parser.add_argument('--interval', type=int, default=30, help='Пауза між проходами (сек)')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = self.run_once(options)
+            if not options['loop']:
+                break
+            if not processed:
+                time.sleep(options['interval'])
+
+    def run_once(self, options):
+        statuses = [ProductImage.STATUS_PENDING]
+        if options['retry_failed']:
+            statuses.append(ProductImage.STATUS_FAILED)
+
+        queryset = ProductImage.objects.exclude(image='')
+        if not options['all']:
+            queryset = queryset.filter(processing_status__in=statuses)
+
+        ids = queryset.order_by('pk').values_list('pk', flat=True)
+        if options['limit']:
+            ids = ids[:options['limit']]
+        ids = list(ids)
+
+        if not ids:
+            if not options['loop']:
+                self.stdout.write(self.style.SUCCESS('✅ Немає зображень для обробки'))
+            return 0
+
+        self.stdout.write(f'🖼️  Обробка {len(ids)} зображень...')
+        ok = failed = 0
+        for idx, image_id in enumerate(ids, 1):
+            if process_image(image_id):
+                ok += 1
+            else:
+                failed += 1
+            if idx % 50 == 0:
+                self.stdout.write(f'  ✓ {idx}/{len(ids)}')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Готово: {ok}'))
+        if failed:
+            self.stdout.write(self.style.WARNING(f'⚠️  Помилок: {failed}'))
+        return len(ids)
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.24 on 2026-10-19 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0017_add_current_promotion_field'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Висота'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='placeholder',
+            field=models.TextField(blank=True, editable=False, verbose_name='LQIP плейсхолдер'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='processing_error',
+            field=models.CharField(blank=True, editable=False, max_length=500, verbose_name='Помилка обробки'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'В черзі'), ('processing', 'Обробляється'), ('ready', 'Готово'), ('failed', 'Помилка')], db_index=True, default='pending', editable=False, max_length=20, verbose_name='Статус обробки'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='{"webp": {"320": "products/variants/..."}, "jpeg": {...}}', verbose_name='Адаптивні варіанти'),
+        ),
+        migrations.AddField(
+            model_name='productimage',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина'),
+        ),
+    ]
@@ -5,10 +5,12 @@ from django.db import models
 from django.urls import reverse
 from django.utils.text import slugify
 from decimal import Decimal
-from PIL import Image
+import hashlib
 import os
 import time
 
+from .pricing import build_display_prices, build_price_matrix, price_tier_for_user, quantity_break
+
 
 class Category(models.Model):
     """Категорії товарів з підтримкою ієрархії"""
@@ -238,6 +240,8 @@ class Product(models.Model):
         ]
     
     def save(self, *args, **kwargs):
+        self._reset_price_cache()
+        
         # Генерація slug з назви
         if not self.slug:
             self.slug = slugify(self.name)
@@ -296,6 +300,26 @@ class Product(models.Model):
         
         return True
     
+    @property
+    def price_matrix(self):
+        """Матриця цін (див. apps.products.pricing) - будується один раз на екземпляр"""
+        matrix = self.__dict__.get('_price_matrix')
+        if matrix is None:
+            matrix = self._price_matrix = build_price_matrix(self)
+        return matrix
+    
+    def _reset_price_cache(self):
+        self.__dict__.pop('_price_matrix', None)
+        self.__dict__.pop('_display_prices', None)
+    
+    def refresh_from_db(self, *args, **kwargs):
+        self._reset_price_cache()
+        super().refresh_from_db(*args, **kwargs)
+    
+    def get_price_for_tier(self, tier, quantity=1):
+        """Ціна для рівня цін (TIER_RETAIL / TIER_WHOLESALE) та кількості"""
+        return self.price_matrix[(tier, quantity_break(quantity), self.is_sale_active())]
+    
     def get_price_for_user(self, user=None, quantity=1):
         """
         Повертає ціну для конкретного користувача згідно бізнес-логіки:
@@ -311,44 +335,10 @@ class Product(models.Model):
         - Завжди оптова ціна незалежно від кількості
         
         АКЦІЇ застосовуються для всіх типів користувачів
-        """
-        is_sale = self.is_sale_active()
-        
-        # Перевірка чи є користувач оптовим клієнтом (НЕ адміністратор)
-        is_wholesale_user = (
-            user and 
-            user.is_authenticated and 
-            hasattr(user, 'is_wholesale') and 
-            user.is_wholesale and
-            not user.is_staff and
-            not user.is_superuser
-        )
         
-        # Для оптових клієнтів
-        if is_wholesale_user and self.wholesale_price:
-            if is_sale and self.sale_wholesale_price:
-                return self.sale_wholesale_price
-            return self.wholesale_price
-        
-        # Для незалогінених та адміністраторів
-        # Градація застосовується з пріоритетом акційних цін
-        if quantity >= 5:
-            if is_sale and self.sale_price_5_qty:
-                return self.sale_price_5_qty
-            elif self.price_5_qty:
-                return self.price_5_qty
-        
-        if quantity >= 3:
-            if is_sale and self.sale_price_3_qty:
-                return self.sale_price_3_qty
-            elif self.price_3_qty:
-                return self.price_3_qty
-        
-        # Базова роздрібна або акційна ціна
-        if is_sale and self.sale_price:
-            return self.sale_price
-        
-        return self.retail_price
+        Якщо є request - краще get_price_for_tier(get_price_tier(request), ...)
+        """
+        return self.get_price_for_tier(price_tier_for_user(user), quantity)
     
     def get_all_prices(self, user=None):
         """
@@ -363,30 +353,13 @@ class Product(models.Model):
         - wholesale (оптова - основна)
         - retail (роздрібна - для інформації/примітки)
         """
-        is_wholesale_user = (
-            user and 
-            user.is_authenticated and 
-            hasattr(user, 'is_wholesale') and 
-            user.is_wholesale and
-            not user.is_staff and
-            not user.is_superuser
-        )
-        
-        if is_wholesale_user:
-            # Для оптових клієнтів: оптова + роздрібна (для порівняння)
-            prices = {
-                'wholesale': self.wholesale_price,
-                'retail': self.retail_price,
-            }
-        else:
-            # Для незалогінених та адміністраторів: роздрібна + градація
-            prices = {
-                'retail': self.retail_price,
-                'qty_3': self.price_3_qty,
-                'qty_5': self.price_5_qty,
-            }
-        
-        return {k: v for k, v in prices.items() if v is not None}
+        return self.get_display_prices(price_tier_for_user(user))
+    
+    def get_display_prices(self, tier):
+        prices = self.__dict__.get('_display_prices')
+        if prices is None:
+            prices = self._display_prices = build_display_prices(self)
+        return prices[tier]
     
     def get_stickers(self):
         """Повертає список активних стікерів (бейджів)"""
@@ -435,64 +408,137 @@ class Product(models.Model):
 class ProductImage(models.Model):
     """Зображення товарів"""
     
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+    PROCESSING_STATUS_CHOICES = [
+        (STATUS_PENDING, 'В черзі'),
+        (STATUS_PROCESSING, 'Обробляється'),
+        (STATUS_READY, 'Готово'),
+        (STATUS_FAILED, 'Помилка'),
+    ]
+    
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField('Зображення', upload_to='products/')
     alt_text = models.CharField('Alt текст', max_length=200, blank=True)
     is_main = models.BooleanField('Головне зображення', default=False)
     sort_order = models.PositiveIntegerField('Порядок', default=0)
     
+    # Заповнюється фоновим конвеєром (apps.products.image_pipeline)
+    width = models.PositiveIntegerField('Ширина', null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField('Висота', null=True, blank=True, editable=False)
+    placeholder = models.TextField('LQIP плейсхолдер', blank=True, editable=False)
+    variants = models.JSONField('Адаптивні варіанти', default=dict, blank=True, editable=False,
+                                help_text='{"webp": {"320": "products/variants/..."}, "jpeg": {...}}')
+    processing_status = models.CharField('Статус обробки', max_length=20,
+                                         choices=PROCESSING_STATUS_CHOICES,
+                                         default=STATUS_PENDING, db_index=True, editable=False)
+    processing_error = models.CharField('Помилка обробки', max_length=500, blank=True, editable=False)
+    
+    # SHA-256 вмісту: однакові фото різних товарів посилаються на один файл у storage
+    content_hash = models.CharField('Хеш вмісту', max_length=64, blank=True, db_index=True, editable=False)
+    
     class Meta:
         verbose_name = 'Зображення товару'
         verbose_name_plural = 'Зображення товарів'
         ordering = ['sort_order']
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запам'ятовуємо файл, щоб при save() ставити в чергу лише нові завантаження
+        instance._loaded_image_name = instance.__dict__.get('image')
+        return instance
+    
     def save(self, *args, **kwargs):
-        # Пропускаємо оптимізацію для Cloudinary
-        from django.conf import settings
+        from apps.products.image_pipeline import enqueue_image
+        
         skip_optimization = kwargs.pop('skip_optimization', False)
         
-        # Оптимізуємо зображення перед збереженням (тільки для локального storage)
-        if (not skip_optimization and 
-            self.image and 
-            hasattr(self.image, 'file') and 
-            'cloudinary' not in str(settings.DEFAULT_FILE_STORAGE).lower()):
-            try:
-                from io import BytesIO
-                from django.core.files.uploadedfile import InMemoryUploadedFile
-                
-                # Відкриваємо зображення з файлу
-                img = Image.open(self.image)
-                
-                # Перевіряємо чи потрібна оптимізація
-                if img.height > 800 or img.width > 800:
-                    # Конвертуємо RGBA в RGB якщо потрібно
-                    if img.mode in ('RGBA', 'LA', 'P'):
-                        background = Image.new('RGB', img.size, (255, 255, 255))
-                        background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                        img = background
-                    
-                    # Зменшуємо розмір
-                    img.thumbnail((800, 800), Image.Resampling.LANCZOS)
-                    
-                    # Зберігаємо в BytesIO
-                    output = BytesIO()
-                    img.save(output, format='JPEG', optimize=True, quality=85)
-                    output.seek(0)
-                    
-                    # Оновлюємо файл
-                    self.image = InMemoryUploadedFile(
-                        output,
-                        'ImageField',
-                        f"{self.image.name.split('.')[0]}.jpg",
-                        'image/jpeg',
-                        output.getbuffer().nbytes,
-                        None
-                    )
-            except Exception as e:
-                # Якщо оптимізація не вдалась, просто зберігаємо оригінал
-                pass
+        reused = False
+        if self.image and not self.image._committed:
+            # Нове завантаження: якщо такий файл уже є - не завантажуємо його повторно
+            reused = self._reuse_existing_asset()
+        
+        image_changed = bool(self.image) and (
+            self._state.adding or self.image.name != getattr(self, '_loaded_image_name', None)
+        )
+        needs_processing = image_changed and not skip_optimization and not reused
+        if needs_processing:
+            self.processing_status = self.STATUS_PENDING
+            self.processing_error = ''
         
         super().save(*args, **kwargs)
+        
+        if image_changed:
+            self._loaded_image_name = self.image.name
+            if needs_processing:
+                # Обробка відбувається поза запитом - адмінка повертається одразу
+                enqueue_image(self.pk)
+    
+    def _reuse_existing_asset(self):
+        """
+        Рахує SHA-256 нового файлу. Якщо зображення з таким хешем уже є,
+        переносить його файл і результати обробки замість повторного завантаження.
+        """
+        digest = hashlib.sha256()
+        for chunk in self.image.chunks():
+            digest.update(chunk)
+        self.image.seek(0)
+        self.content_hash = digest.hexdigest()
+        
+        existing = (
+            ProductImage.objects
+            .filter(content_hash=self.content_hash)
+            .exclude(image='')
+            .exclude(pk=self.pk)
+            .order_by('pk')
+            .values('image', 'width', 'height', 'placeholder', 'variants',
+                    'processing_status', 'processing_error')
+            .first()
+        )
+        if not existing:
+            return False
+        
+        self.image.name = existing.pop('image')
+        self.image._committed = True
+        for field, value in existing.items():
+            setattr(self, field, value)
+        return existing['processing_status'] != self.STATUS_FAILED
+    
+    def delete(self, *args, **kwargs):
+        from apps.products.image_pipeline import delete_asset
+        
+        name = self.image.name
+        variants = self.variants
+        result = super().delete(*args, **kwargs)
+        
+        # Файл може бути спільним для кількох товарів - видаляємо лише останнє посилання
+        if name and not ProductImage.objects.filter(image=name).exists():
+            delete_asset(name, variants)
+        return result
+    
+    def get_variant_url(self, width, fmt='webp'):
+        """URL варіанту найближчої ширини >= width (або найбільшого доступного)"""
+        from django.core.files.storage import default_storage
+        
+        names = (self.variants or {}).get(fmt)
+        if not names:
+            return self.image.url if self.image else ''
+        widths = sorted(int(w) for w in names)
+        chosen = next((w for w in widths if w >= width), widths[-1])
+        return default_storage.url(names[str(chosen)])
+    
+    def get_srcset(self, fmt='webp'):
+        """srcset з усіх згенерованих ширин"""
+        from django.core.files.storage import default_storage
+        
+        names = (self.variants or {}).get(fmt) or {}
+        return ', '.join(
+            f'{default_storage.url(names[w])} {w}w'
+            for w in sorted(names, key=int)
+        )
     
     def __str__(self):
         return f"Зображення для {self.product.name}"
@@ -0,0 +1,108 @@
+"""
+Цінові рівні та матриця цін товару
+
+Правила ціноутворення (опт / роздріб, градація від 3 та 5 шт, акційні ціни)
+застосовуються один раз на екземпляр товару: build_price_matrix() розкладає їх у
+таблицю (рівень, кількість, акція) -> ціна. Рівень покупця визначається один раз
+на запит (get_price_tier), тож картки, кошик і оформлення замовлення роблять
+лише пошук у словнику.
+
+Матриця будується з полів завантаженого рядка і не зберігається в БД -
+акції та масові дії адмінки змінюють ціни через queryset.update(), тож
+збережена копія могла б застаріти.
+"""
+
+TIER_RETAIL = 'retail'
+TIER_WHOLESALE = 'wholesale'
+
+QUANTITY_BREAKS = (1, 3, 5)
+
+
+def price_tier_for_user(user):
+    """
+    Рівень цін користувача.
+    Оптові ціни - лише для залогінених оптових клієнтів; адміністратори бачать роздріб.
+    """
+    if (
+        user is not None
+        and user.is_authenticated
+        and getattr(user, 'is_wholesale', False)
+        and not user.is_staff
+        and not user.is_superuser
+    ):
+        return TIER_WHOLESALE
+    return TIER_RETAIL
+
+
+def get_price_tier(request):
+    """Рівень цін для запиту (обчислюється один раз і кешується на request)"""
+    tier = getattr(request, '_price_tier', None)
+    if tier is None:
+        tier = price_tier_for_user(getattr(request, 'user', None))
+        request._price_tier = tier
+    return tier
+
+
+def quantity_break(quantity):
+    """Поріг градації для кількості: 1, 3 або 5"""
+    if quantity >= 5:
+        return 5
+    if quantity >= 3:
+        return 3
+    return 1
+
+
+def _retail_price(product, quantity, sale):
+    # Градація застосовується з пріоритетом акційних цін
+    if quantity >= 5:
+        if sale and product.sale_price_5_qty:
+            return product.sale_price_5_qty
+        elif product.price_5_qty:
+            return product.price_5_qty
+
+    if quantity >= 3:
+        if sale and product.sale_price_3_qty:
+            return product.sale_price_3_qty
+        elif product.price_3_qty:
+            return product.price_3_qty
+
+    if sale and product.sale_price:
+        return product.sale_price
+
+    return product.retail_price
+
+
+def _wholesale_price(product, quantity, sale):
+    # Без оптової ціни оптовий клієнт купує за роздрібними правилами
+    if not product.wholesale_price:
+        return _retail_price(product, quantity, sale)
+    if sale and product.sale_wholesale_price:
+        return product.sale_wholesale_price
+    return product.wholesale_price
+
+
+def build_price_matrix(product):
+    """(рівень, поріг кількості, акція активна) -> ціна"""
+    matrix = {}
+    for sale in (False, True):
+        for quantity in QUANTITY_BREAKS:
+            matrix[(TIER_RETAIL, quantity, sale)] = _retail_price(product, quantity, sale)
+            matrix[(TIER_WHOLESALE, quantity, sale)] = _wholesale_price(product, quantity, sale)
+    return matrix
+
+
+def build_display_prices(product):
+    """Ціни для відображення за рівнями (див. Product.get_all_prices)"""
+    wholesale = {
+        'wholesale': product.wholesale_price,
+        'retail': product.retail_price,
+    }
+    retail = {
+        'retail': product.retail_price,
+        'qty_3': product.price_3_qty,
+        'qty_5': product.price_5_qty,
+    }
+    return {
+        TIER_WHOLESALE: {k: v for k, v in wholesale.items() if v is not None},
+        TIER_RETAIL: {k: v for k, v in retail.items() if v is not None},
+    }
@@ -0,0 +1,26 @@
+"""
+Фонові завдання товарів: оптимізація зображень та імпорт каталогу
+"""
+from io import StringIO
+
+from django.core.management import call_command
+
+from apps.core.jobs import task
+
+from .image_pipeline import process_image as run_pipeline
+
+OUTPUT_MAX_LENGTH = 2000
+
+
+@task('products.process_image')
+def process_image(image_id):
+    """Адаптивні варіанти, розміри та LQIP одного зображення"""
+    return run_pipeline(image_id)
+
+
+@task('products.import_sitemap')
+def import_sitemap(**options):
+    """Відновлюваний імпорт товарів через sitemap (import_products_sitemap --enqueue)"""
+    out = StringIO()
+    call_command('import_products_sitemap', stdout=out, stderr=out, **options)
+    return out.getvalue()[-OUTPUT_MAX_LENGTH:]
@@ -1,65 +1,218 @@
 """
 Кастомні теги для роботи з Cloudinary
+
+Розбір URL на (base, version, public_id) кешується в LRU (обмежений кількістю
+записів, ~200 байт на запис), рядки трансформацій будуються з таблиці пресетів
+один раз при імпорті модуля - на рендер картки лише склеювання рядків.
 """
+import re
+from collections import namedtuple
+from functools import lru_cache
+
 from django import template
+from django.conf import settings
+from django.utils.html import format_html
 
 register = template.Library()
 
+ParsedCloudinaryURL = namedtuple('ParsedCloudinaryURL', ['base', 'version', 'public_id'])
+
+# ~2048 * 200 байт ≈ 400KB на процес
+URL_CACHE_SIZE = getattr(settings, 'CLOUDINARY_URL_CACHE_SIZE', 2048)
+
+_VERSION_RE = re.compile(r'^v\d+$')
+_TRANSFORMATION_RE = re.compile(r'^[a-z]{1,3}_[^,/]+(,[a-z]{1,3}_[^,/]+)*$')
+
+# Пресети: базовий розмір для src + ширини для srcset + sizes
+PRESETS = {
+    'card': {
+        'width': 300, 'height': 300, 'crop': 'fill', 'quality': 85,
+        'widths': (150, 300, 450, 600),
+        'sizes': '(max-width: 480px) 50vw, 300px',
+    },
+    'detail': {
+        'width': 600, 'height': 600, 'crop': 'fill', 'quality': 85,
+        'widths': (320, 480, 600, 900, 1200),
+        'sizes': '(max-width: 768px) 100vw, 600px',
+    },
+    'thumb': {
+        'width': 100, 'height': 100, 'crop': 'fill', 'quality': 80,
+        'widths': (100, 200),
+        'sizes': '100px',
+    },
+    'cart': {
+        'width': 120, 'height': 120, 'crop': 'fill', 'quality': 80,
+        'widths': (120, 240),
+        'sizes': '120px',
+    },
+}
+
+
+def build_transformation(width, height, crop='fill', quality=85):
+    return f'w_{width},h_{height},c_{crop},q_{quality},f_auto'
+
+
+def _compile_preset(preset):
+    width, height = preset['width'], preset['height']
+    return {
+        'width': width,
+        'height': height,
+        'src': build_transformation(width, height, preset['crop'], preset['quality']),
+        'srcset': tuple(
+            (w, build_transformation(w, round(height * w / width), preset['crop'], preset['quality']))
+            for w in preset['widths']
+        ),
+        'sizes': preset['sizes'],
+    }
+
+
+COMPILED_PRESETS = {name: _compile_preset(preset) for name, preset in PRESETS.items()}
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def parse_cloudinary_url(url):
+    """
+    Розбирає Cloudinary URL на (base, version, public_id), відкидаючи
+    наявні трансформації. Для не-Cloudinary URL повертає None.
+    """
+    if 'cloudinary.com' not in url or '/image/upload/' not in url:
+        return None
+
+    base, _, path = url.partition('/image/upload/')
+    segments = path.split('/')
+
+    # Версія - лише сегмент одразу після трансформацій (або після upload/),
+    # щоб тека public_id на кшталт products/v2/ не сприймалась як версія
+    idx = 0
+    while idx < len(segments) - 1 and _TRANSFORMATION_RE.match(segments[idx]):
+        idx += 1
+
+    version = ''
+    if idx < len(segments) - 1 and _VERSION_RE.match(segments[idx]):
+        version = segments[idx]
+        idx += 1
+    segments = segments[idx:]
+
+    return ParsedCloudinaryURL(base, version, '/'.join(segments))
+
+
+def build_cloudinary_url(parsed, transformations):
+    version = f'{parsed.version}/' if parsed.version else ''
+    return f'{parsed.base}/image/upload/{transformations}/{version}{parsed.public_id}'
+
+
+def _image_url(image):
+    if not image:
+        return ''
+    try:
+        return str(image.url if hasattr(image, 'url') else image)
+    except (AttributeError, ValueError):
+        return ''
+
 
 @register.filter
 def cloudinary_transform(image_url: str, transformations: str = 'w_300,h_300,c_fill,q_85,f_auto') -> str:
     """
     Трансформує URL зображення через Cloudinary
-    
+
     Usage:
         {{ product.images.first.image.url|cloudinary_transform }}
         {{ product.images.first.image.url|cloudinary_transform:'w_500,h_500,c_fit,q_90' }}
     """
     if not image_url:
         return ''
-    
+
     url_str = str(image_url)
-    
-    # Якщо це вже Cloudinary URL
-    if 'res.cloudinary.com' in url_str or 'cloudinary.com' in url_str:
-        # Перевіряємо чи вже є трансформації
-        if '/image/upload/' in url_str:
-            parts = url_str.split('/image/upload/')
-            if len(parts) == 2:
-                # Якщо вже є трансформації, замінюємо їх
-                base_url = parts[0]
-                path_parts = parts[1].split('/')
-                # Перший елемент після upload/ може бути трансформацією або версією
-                if path_parts[0].startswith('v') and path_parts[0][1:].isdigit():
-                    # Це версія, залишаємо
-                    return f"{base_url}/image/upload/{transformations}/{parts[1]}"
-                else:
-                    # Це трансформація або public_id, додаємо трансформації
-                    return f"{base_url}/image/upload/{transformations}/{parts[1]}"
-        elif '/raw/upload/' in url_str:
-            # Для raw файлів не застосовуємо трансформації
-            return url_str
-    
-    # Якщо це не Cloudinary URL або локальний файл, повертаємо як є
-    return url_str
+    parsed = parse_cloudinary_url(url_str)
+
+    # Якщо це не Cloudinary URL, raw файл або локальний файл, повертаємо як є
+    if parsed is None:
+        return url_str
+
+    return build_cloudinary_url(parsed, transformations)
 
 
 @register.simple_tag
 def cloudinary_image(image, width: int = 300, height: int = 300, crop: str = 'fill', quality: int = 85) -> str:
     """
     Генерує URL для зображення з трансформаціями Cloudinary
-    
+
     Usage:
         {% cloudinary_image product.images.first.image width=300 height=300 %}
     """
-    if not image:
+    image_url = _image_url(image)
+    if not image_url:
         return ''
-    
-    try:
-        image_url = image.url if hasattr(image, 'url') else str(image)
-    except (AttributeError, ValueError):
+
+    return cloudinary_transform(image_url, build_transformation(width, height, crop, quality))
+
+
+@register.simple_tag
+def cloudinary_srcset(image, preset: str = 'card', sizes: str = '') -> str:
+    """
+    Генерує атрибути src, srcset, sizes, width, height для <img> одним викликом
+
+    Usage:
+        <img {% cloudinary_srcset product.images.first.image 'card' %} alt="..." loading="lazy">
+
+    Для локального storage використовує варіанти, згенеровані конвеєром зображень.
+    """
+    compiled = COMPILED_PRESETS[preset]
+    image_url = _image_url(image)
+    if not image_url:
+        return ''
+
+    sizes = sizes or compiled['sizes']
+    parsed = parse_cloudinary_url(image_url)
+    product_image = getattr(image, 'instance', None)
+
+    if parsed is not None:
+        src = build_cloudinary_url(parsed, compiled['src'])
+        srcset = ', '.join(
+            f'{build_cloudinary_url(parsed, transformation)} {w}w'
+            for w, transformation in compiled['srcset']
+        )
+    else:
+        srcset = product_image.get_srcset('jpeg') if hasattr(product_image, 'get_srcset') else ''
+        src = product_image.get_variant_url(compiled['width'], 'jpeg') if srcset else image_url
+
+    # LQIP видно фоном, поки завантажується саме зображення
+    placeholder = getattr(product_image, 'placeholder', '')
+    style = format_html(' style="background:url({}) center/cover no-repeat"', placeholder) if placeholder else ''
+
+    if not srcset:
+        return format_html(
+            'src="{}" width="{}" height="{}"{}', src, compiled['width'], compiled['height'], style
+        )
+
+    return format_html(
+        'src="{}" srcset="{}" sizes="{}" width="{}" height="{}"{}',
+        src, srcset, sizes, compiled['width'], compiled['height'], style
+    )
+
+
+@register.simple_tag
+def webp_source(image, preset: str = 'card', sizes: str = '') -> str:
+    """
+    <source type="image/webp"> з WebP-варіантів конвеєра зображень для <picture>
+
+    Usage:
+        <picture class="responsive-picture">
+            {% webp_source product.images.first.image 'card' %}
+            <img {% cloudinary_srcset product.images.first.image 'card' %} alt="...">
+        </picture>
+
+    Для Cloudinary порожньо - f_auto у трансформації сам віддає WebP/AVIF.
+    """
+    image_url = _image_url(image)
+    if not image_url or parse_cloudinary_url(image_url) is not None:
+        return ''
+
+    product_image = getattr(image, 'instance', None)
+    srcset = product_image.get_srcset('webp') if hasattr(product_image, 'get_srcset') else ''
+    if not srcset:
         return ''
-    
-    transformations = f'w_{width},h_{height},c_{crop},q_{quality},f_auto'
-    return cloudinary_transform(image_url, transformations)
 
+    return format_html(
+        '<source type="image/webp" srcset="{}" sizes="{}">', srcset, sizes or COMPILED_PRESETS[preset]['sizes']
+    )
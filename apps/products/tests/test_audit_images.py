@@ -0,0 +1,79 @@
+"""
+Тести паралельного аудиту зображень
+"""
+import json
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from apps.products.models import Category, Product, ProductImage
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PIPELINE_ASYNC=False)
+class AuditImagesTests(TestCase):
+    """Звіт аудиту: відсутні, биті, завеликі та дублікати"""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def add_image(self, name, content):
+        product_image = ProductImage(product=self.product)
+        product_image.image.save(name, ContentFile(content), save=True)
+        return product_image
+
+    def png(self, size, color, split='vertical'):
+        buffer = BytesIO()
+        img = Image.new('RGB', size, color)
+        box = (0, 0, size[0] // 2, size[1]) if split == 'vertical' else (0, 0, size[0], size[1] // 2)
+        img.paste((255, 255, 255), box)
+        img.save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def setUp(self):
+        category = Category.objects.create(name='Категорія', slug='category')
+        self.product = Product.objects.create(
+            name='Товар', slug='product', category=category, retail_price=100, stock=1
+        )
+
+    def test_zero_totals_are_reported(self):
+        self.add_image('a.png', self.png((400, 400), (10, 10, 10)))
+
+        output = os.path.join(MEDIA_ROOT, 'clean.json')
+        call_command('audit_images', output=output, stdout=StringIO())
+
+        with open(output, encoding='utf-8') as f:
+            totals = json.load(f)['totals']
+        self.assertEqual((totals['missing'], totals['broken'], totals['oversized']), (0, 0, 0))
+        self.assertEqual(totals['images'], 1)
+
+    def test_report_totals(self):
+        self.add_image('a.png', self.png((400, 400), (10, 10, 10)))
+        self.add_image('b.png', self.png((800, 800), (10, 10, 10)))
+        self.add_image('huge.png', self.png((2500, 100), (90, 20, 20), split='horizontal'))
+        self.add_image('broken.png', b'not an image')
+        missing = self.add_image('gone.png', self.png((10, 10), (0, 0, 0)))
+        os.remove(missing.image.path)
+
+        output = os.path.join(MEDIA_ROOT, 'report.json')
+        call_command('audit_images', output=output, workers=2, chunk_size=2, stdout=StringIO())
+
+        with open(output, encoding='utf-8') as f:
+            report = json.load(f)
+
+        totals = report['totals']
+        self.assertEqual(totals['images'], 5)
+        self.assertEqual(totals['missing'], 1)
+        self.assertEqual(totals['broken'], 1)
+        self.assertEqual(totals['oversized'], 1)
+        self.assertEqual(totals['duplicate_images'], 1)
+        self.assertEqual(len(report['duplicates'][0]), 2)
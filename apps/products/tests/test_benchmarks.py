@@ -0,0 +1,37 @@
+"""
+Тести мікробенчмарків цінової логіки
+"""
+from django.test import TestCase
+
+from apps.products import benchmarks
+from apps.products.models import Product
+
+
+class PricingBenchmarksTest(TestCase):
+    """Бенчмарки відтворювані і не змінюють БД"""
+
+    def test_catalog_is_deterministic(self):
+        first = benchmarks.build_catalog(200, seed=7)
+        second = benchmarks.build_catalog(200, seed=7)
+        self.assertEqual(
+            [(p.retail_price, p.sale_price, p.sale_end_date is None) for p in first],
+            [(p.retail_price, p.sale_price, p.sale_end_date is None) for p in second],
+        )
+        self.assertTrue(any(p.is_sale_active() for p in first))
+        self.assertTrue(any(p.is_sale and not p.is_sale_active() for p in first))
+
+    def test_cpu_benchmarks_run_without_queries(self):
+        with self.assertNumQueries(0):
+            results = benchmarks.cpu_benchmarks(50, repeat=1)
+        self.assertIn('cart_pricing', results)
+        for name, result in results.items():
+            self.assertGreater(result['ns_per_op'], 0, name)
+
+    def test_promotion_benchmark_rolls_back(self):
+        result = benchmarks.promotion_benchmark(20)
+        self.assertEqual(result['ops'], 20)
+        self.assertFalse(Product.objects.exists())
+
+    def test_compare_reports_relative_change(self):
+        deltas = benchmarks.compare({'a@1': {'ns_per_op': 110}}, {'a@1': {'ns_per_op': 100}, 'b@1': {'ns_per_op': 5}})
+        self.assertEqual(deltas, {'a@1': 10.0})
@@ -0,0 +1,71 @@
+"""
+Тести масових дій адмінки товарів
+"""
+from decimal import Decimal
+
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth import get_user_model
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.test import RequestFactory, TestCase
+
+from apps.products.admin import ProductAdmin
+from apps.products.models import Category, NewProduct, Product, ProductChangeLog
+
+
+class BulkActionsTests(TestCase):
+    """Кількість запитів масових дій не залежить від розміру вибірки"""
+
+    def setUp(self):
+        category = Category.objects.create(name='Категорія', slug='category')
+        self.products = [
+            Product.objects.create(
+                name=f'Товар {i}', slug=f'product-{i}', category=category,
+                retail_price=100, stock=1,
+                sale_price=Decimal('80') if i % 2 else None,
+            )
+            for i in range(6)
+        ]
+        self.admin = ProductAdmin(Product, AdminSite())
+        self.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+
+    def request(self):
+        request = RequestFactory().post('/admin/products/product/')
+        request.user = self.user
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        return request
+
+    def test_mark_as_new_fixed_queries(self):
+        NewProduct.objects.create(product=self.products[0], sort_order=7)
+        # ids, знімок старих значень, UPDATE, лог, існуючі NewProduct, max(), bulk_create + 4 savepoint-и
+        with self.assertNumQueries(11):
+            self.admin.mark_as_new(self.request(), Product.objects.all())
+
+        entries = list(NewProduct.objects.order_by('sort_order').values_list('sort_order', flat=True))
+        self.assertEqual(entries, [7, 8, 9, 10, 11, 12])
+        self.assertFalse(Product.objects.filter(is_new=False).exists())
+        self.assertEqual(ProductChangeLog.objects.filter(field_name='is_new', change_type='status').count(), 6)
+
+    def test_unmark_as_new_removes_entries(self):
+        self.admin.mark_as_new(self.request(), Product.objects.all())
+        self.admin.unmark_as_new(self.request(), Product.objects.all())
+        self.assertFalse(NewProduct.objects.exists())
+        self.assertFalse(Product.objects.filter(is_new=True).exists())
+
+    def test_mark_as_sale_skips_products_without_sale_price(self):
+        self.admin.mark_as_sale(self.request(), Product.objects.all())
+        self.assertEqual(Product.objects.filter(is_sale=True).count(), 3)
+        logs = ProductChangeLog.objects.filter(field_name='is_sale')
+        self.assertEqual(logs.count(), 3)
+        self.assertEqual(set(logs.values_list('user', flat=True)), {self.user.pk})
+
+    def test_unchanged_rows_are_not_logged(self):
+        self.admin.activate_products(self.request(), Product.objects.all())
+        self.assertFalse(ProductChangeLog.objects.exists())
+
+    def test_clear_sale_prices_logs_old_values(self):
+        self.admin.clear_sale_prices(self.request(), Product.objects.filter(pk=self.products[1].pk))
+        log = ProductChangeLog.objects.get(field_name='sale_price')
+        self.assertEqual(log.old_value, '80.00')
+        self.assertEqual(log.new_value, '')
+        self.assertIsNone(Product.objects.get(pk=self.products[1].pk).sale_price)
@@ -0,0 +1,46 @@
+"""
+Тести побудови Cloudinary URL та srcset
+"""
+from django.test import SimpleTestCase
+
+from apps.products.templatetags.cloudinary_tags import (
+    cloudinary_srcset, cloudinary_transform, parse_cloudinary_url,
+)
+
+URL = 'https://res.cloudinary.com/demo/image/upload/v1/media/products/cream.jpg'
+
+
+class CloudinaryTagsTests(SimpleTestCase):
+    """Тести кешованого білдера URL"""
+
+    def test_parse_is_memoized(self):
+        parse_cloudinary_url.cache_clear()
+        parse_cloudinary_url(URL)
+        parse_cloudinary_url(URL)
+        self.assertEqual(parse_cloudinary_url.cache_info().hits, 1)
+
+    def test_existing_transformations_are_replaced(self):
+        transformed = cloudinary_transform(URL, 'w_100,h_100,c_fill,q_85,f_auto')
+        self.assertEqual(
+            cloudinary_transform(transformed, 'w_300,h_300,c_fill,q_85,f_auto'),
+            'https://res.cloudinary.com/demo/image/upload/w_300,h_300,c_fill,q_85,f_auto/v1/media/products/cream.jpg'
+        )
+
+    def test_version_like_folder_stays_in_public_id(self):
+        parsed = parse_cloudinary_url('https://res.cloudinary.com/demo/image/upload/products/v2/cream.jpg')
+        self.assertEqual((parsed.version, parsed.public_id), ('', 'products/v2/cream.jpg'))
+
+        parsed = parse_cloudinary_url(
+            'https://res.cloudinary.com/demo/image/upload/w_100,c_fill/v17/products/v2/cream.jpg'
+        )
+        self.assertEqual((parsed.version, parsed.public_id), ('v17', 'products/v2/cream.jpg'))
+
+    def test_non_cloudinary_url_unchanged(self):
+        self.assertEqual(cloudinary_transform('/media/products/a.jpg'), '/media/products/a.jpg')
+
+    def test_srcset_from_preset(self):
+        attrs = cloudinary_srcset(URL, 'card')
+        self.assertIn('/w_300,h_300,c_fill,q_85,f_auto/v1/media/products/cream.jpg', attrs)
+        self.assertIn('w_600,h_600,c_fill,q_85,f_auto/v1/media/products/cream.jpg 600w', attrs)
+        self.assertIn('sizes="(max-width: 480px) 50vw, 300px"', attrs)
+        self.assertIn('width="300" height="300"', attrs)
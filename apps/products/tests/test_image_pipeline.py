@@ -0,0 +1,161 @@
+"""
+Тести фонового конвеєра зображень
+"""
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from apps.products.image_pipeline import process_image
+from apps.products.models import Category, Product, ProductImage
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PIPELINE_ASYNC=False)
+class ImagePipelineTests(TestCase):
+    """Тести обробки зображень поза запитом"""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        category = Category.objects.create(name='Категорія', slug='category')
+        self.product = Product.objects.create(
+            name='Товар', slug='product', category=category, retail_price=100, stock=1
+        )
+
+    def make_image(self, size=(1000, 600)):
+        buffer = BytesIO()
+        Image.new('RGBA', size, (200, 50, 50, 128)).save(buffer, format='PNG')
+        product_image = ProductImage(product=self.product)
+        product_image.image.save('test.png', ContentFile(buffer.getvalue()), save=True)
+        return product_image
+
+    def test_save_does_not_process_inline(self):
+        """Збереження лише ставить зображення в чергу"""
+        product_image = self.make_image()
+        product_image.refresh_from_db()
+        self.assertEqual(product_image.processing_status, ProductImage.STATUS_PENDING)
+        self.assertEqual(product_image.variants, {})
+
+    @override_settings(IMAGE_PIPELINE_ASYNC=True, JOBS_RUN_IN_PROCESS=False)
+    def test_save_enqueues_durable_job(self):
+        """Збереження ставить завдання в чергу БД, обробник run_jobs його виконує"""
+        from apps.core import jobs
+        from apps.core.models import Job
+
+        product_image = self.make_image()
+        job = Job.objects.get(task='products.process_image')
+        self.assertEqual(job.payload, {'image_id': product_image.pk})
+
+        jobs.run_pending()
+        product_image.refresh_from_db()
+        self.assertEqual(product_image.processing_status, ProductImage.STATUS_READY)
+
+    def test_process_generates_variants_and_placeholder(self):
+        """Обробка створює WebP/JPEG ширини без апскейлу, розміри та LQIP"""
+        product_image = self.make_image()
+        self.assertTrue(process_image(product_image.pk))
+
+        product_image.refresh_from_db()
+        self.assertEqual(product_image.processing_status, ProductImage.STATUS_READY)
+        self.assertEqual((product_image.width, product_image.height), (1000, 600))
+        self.assertTrue(product_image.placeholder.startswith('data:image/jpeg;base64,'))
+        self.assertEqual(sorted(product_image.variants), ['jpeg', 'webp'])
+        self.assertEqual(sorted(product_image.variants['webp'], key=int), ['320', '480', '800'])
+
+        with product_image.image.storage.open(product_image.variants['webp']['480']) as f:
+            variant = Image.open(f)
+            self.assertEqual(variant.size, (480, 288))
+            self.assertNotIn('exif', variant.info)
+
+        self.assertIn(' 800w', product_image.get_srcset('webp'))
+
+    def test_product_card_renders_webp_source_and_placeholder(self):
+        """Картка товару віддає <source type="image/webp"> і LQIP-фон"""
+        from django.template.loader import render_to_string
+
+        product_image = self.make_image()
+        process_image(product_image.pk)
+
+        html = render_to_string('includes/product_card.html', {'product': self.product})
+        self.assertIn('<source type="image/webp" srcset="', html)
+        self.assertIn('.webp 800w', html)
+        self.assertIn('background:url(data:image/jpeg;base64,', html)
+
+    def test_alt_text_change_does_not_requeue(self):
+        """Зміна alt тексту не скидає результат обробки"""
+        product_image = self.make_image()
+        process_image(product_image.pk)
+        product_image = ProductImage.objects.get(pk=product_image.pk)
+        product_image.alt_text = 'Новий alt'
+        product_image.save()
+        product_image.refresh_from_db()
+        self.assertEqual(product_image.processing_status, ProductImage.STATUS_READY)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PIPELINE_ASYNC=False)
+class ContentAddressedImageTests(TestCase):
+    """Однакові фото різних товарів зберігаються одним файлом"""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        category = Category.objects.create(name='Категорія', slug='category')
+        self.first = Product.objects.create(
+            name='Товар 1', slug='product-1', category=category, retail_price=100, stock=1
+        )
+        self.second = Product.objects.create(
+            name='Товар 2', slug='product-2', category=category, retail_price=100, stock=1
+        )
+        buffer = BytesIO()
+        Image.new('RGB', (50, 50), (10, 120, 10)).save(buffer, format='PNG')
+        self.content = buffer.getvalue()
+
+    def add_image(self, product):
+        product_image = ProductImage(product=product)
+        product_image.image = ContentFile(self.content, name='same.png')
+        product_image.save()
+        return product_image
+
+    def test_same_content_reuses_asset(self):
+        first = self.add_image(self.first)
+        second = self.add_image(self.second)
+        self.assertEqual(first.content_hash, second.content_hash)
+        self.assertEqual(first.image.name, second.image.name)
+
+    def test_file_deleted_only_with_last_reference(self):
+        first = self.add_image(self.first)
+        second = self.add_image(self.second)
+        storage = first.image.storage
+
+        first.delete()
+        self.assertTrue(storage.exists(second.image.name))
+
+        second.delete()
+        self.assertFalse(storage.exists(second.image.name))
+
+    def test_dedupe_command_merges_existing_copies(self):
+        first = ProductImage(product=self.first)
+        first.image.save('a.png', ContentFile(self.content), save=True)
+        second = ProductImage(product=self.second)
+        second.image.save('b.png', ContentFile(self.content), save=True)
+        self.assertNotEqual(first.image.name, second.image.name)
+        ProductImage.objects.update(content_hash='')
+
+        call_command('dedupe_product_images', workers=2, stdout=StringIO())
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(len(ProductImage.objects.values('image').distinct()), 1)
@@ -0,0 +1,53 @@
+"""
+Тести матриці цін та рівня цін запиту
+"""
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from apps.products.models import Product
+from apps.products.pricing import TIER_RETAIL, TIER_WHOLESALE, price_tier_for_user
+
+
+def make_product(**fields):
+    defaults = {
+        'retail_price': Decimal('100'),
+        'wholesale_price': Decimal('70'),
+        'price_3_qty': Decimal('90'),
+        'price_5_qty': Decimal('80'),
+        'is_sale': False,
+    }
+    defaults.update(fields)
+    return Product(**defaults)
+
+
+class PriceMatrixTests(SimpleTestCase):
+    """Тести попередньо обчисленої матриці цін"""
+
+    def test_retail_gradation(self):
+        product = make_product()
+        self.assertEqual(product.get_price_for_tier(TIER_RETAIL, 1), Decimal('100'))
+        self.assertEqual(product.get_price_for_tier(TIER_RETAIL, 4), Decimal('90'))
+        self.assertEqual(product.get_price_for_tier(TIER_RETAIL, 12), Decimal('80'))
+
+    def test_wholesale_ignores_gradation(self):
+        product = make_product()
+        self.assertEqual(product.get_price_for_tier(TIER_WHOLESALE, 5), Decimal('70'))
+
+    def test_sale_prices_take_priority(self):
+        product = make_product(is_sale=True, sale_price=Decimal('85'), sale_wholesale_price=Decimal('60'))
+        self.assertEqual(product.get_price_for_tier(TIER_RETAIL, 1), Decimal('85'))
+        self.assertEqual(product.get_price_for_tier(TIER_RETAIL, 3), Decimal('90'))
+        self.assertEqual(product.get_price_for_tier(TIER_WHOLESALE, 1), Decimal('60'))
+
+    def test_matrix_built_once_per_instance(self):
+        product = make_product()
+        self.assertIs(product.price_matrix, product.price_matrix)
+
+    def test_staff_gets_retail_tier(self):
+        staff = SimpleNamespace(is_authenticated=True, is_wholesale=True, is_staff=True, is_superuser=False)
+        client = SimpleNamespace(is_authenticated=True, is_wholesale=True, is_staff=False, is_superuser=False)
+        self.assertEqual(price_tier_for_user(staff), TIER_RETAIL)
+        self.assertEqual(price_tier_for_user(client), TIER_WHOLESALE)
+        self.assertEqual(price_tier_for_user(None), TIER_RETAIL)
@@ -0,0 +1,220 @@
+"""
+Бюджети SQL-запитів і часу відповіді для сторінок вітрини
+
+Каталог засівається з products_data/*.json. Тест падає, якщо сторінка робить
+більше запитів або відповідає довше за бюджет. Машиночитний звіт:
+
+    QUERY_BUDGET_REPORT=budgets.json python manage.py test apps.products.tests.test_query_budgets
+
+Після оптимізації сторінки - зменшити її бюджет тут, щоб зафіксувати результат.
+"""
+import base64
+import glob
+import hashlib
+import json
+import os
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.core.session_codec import pack_cart
+from apps.orders.models import PendingPayment
+from apps.products.models import Category, NewProduct, Product
+
+# {сторінка: (максимум SQL-запитів, максимум мс)}
+BUDGETS = {
+    'home': (59, 2000),
+    'category': (22, 2000),
+    'category_filtered': (22, 2000),
+    'product_detail': (16, 1000),
+    'search': (24, 2000),
+    'sale': (19, 2000),
+    'cart_add': (7, 500),
+    'cart_update': (7, 500),
+    'order_create': (16, 1000),
+    'liqpay_callback': (17, 1000),
+}
+
+REPORT_ENV = 'QUERY_BUDGET_REPORT'
+SEED_GLOB = os.path.join(settings.BASE_DIR, 'products_data', 'products_*.json')
+
+
+def _decimal(value):
+    return Decimal(value) if value else None
+
+
+def seed_catalog():
+    """Каталог з products_data: категорії за category_slug, акції, новинки"""
+    rows = []
+    for path in sorted(glob.glob(SEED_GLOB)):
+        with open(path, encoding='utf-8') as f:
+            rows.extend(json.load(f))
+
+    categories = {}
+    for slug in sorted({row['category_slug'] for row in rows}):
+        categories[slug] = Category.objects.create(name=slug.replace('-', ' ').capitalize(), slug=slug)
+
+    products = []
+    seen_slugs, seen_skus = set(), set()
+    for index, row in enumerate(rows):
+        if row['slug'] in seen_slugs or (row['sku'] and row['sku'] in seen_skus):
+            continue
+        seen_slugs.add(row['slug'])
+        seen_skus.add(row['sku'])
+        retail_price = Decimal(row['retail_price'])
+        on_sale = index % 10 == 0
+        products.append(Product(
+            name=row['name'][:200],
+            slug=row['slug'],
+            sku=row['sku'] or f'SEED{index}',
+            category=categories[row['category_slug']],
+            description=row.get('description', ''),
+            retail_price=retail_price,
+            wholesale_price=_decimal(row.get('wholesale_price')),
+            price_3_qty=_decimal(row.get('price_3_qty')),
+            price_5_qty=_decimal(row.get('price_5_qty')),
+            is_sale=on_sale,
+            sale_price=(retail_price * Decimal('0.8')).quantize(Decimal('0.01')) if on_sale else None,
+            is_new=row.get('is_new', False),
+            stock=row.get('stock', 100),
+            is_active=row.get('is_active', True),
+            is_featured=row.get('is_featured', False),
+        ))
+    Product.objects.bulk_create(products, batch_size=500)
+
+    NewProduct.objects.bulk_create([
+        NewProduct(product=product, sort_order=position)
+        for position, product in enumerate(Product.objects.filter(is_active=True).order_by('pk')[:12])
+    ])
+    return categories
+
+
+class QueryBudgetTests(TestCase):
+    """Кількість SQL-запитів і час відповіді сторінок вітрини в межах бюджету"""
+
+    results = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        categories = seed_catalog()
+        cls.category = max(categories.values(), key=lambda category: category.product_set.count())
+        cls.product = Product.objects.filter(category=cls.category, is_active=True).order_by('pk').first()
+        cls.search_term = cls.product.name.split()[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        path = os.environ.get(REPORT_ENV)
+        if path and cls.results:
+            report = {
+                'catalog_size': Product.objects.count(),
+                'pages': {
+                    name: {**result, 'query_budget': BUDGETS[name][0], 'ms_budget': BUDGETS[name][1]}
+                    for name, result in sorted(cls.results.items())
+                },
+            }
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        super().tearDownClass()
+
+    def measure(self, name, request, expected_status=200):
+        """Виконує запит, записує результат у звіт і перевіряє бюджет"""
+        max_queries, max_ms = BUDGETS[name]
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = request()
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.results[name] = {'queries': len(queries), 'ms': elapsed_ms, 'status': response.status_code}
+
+        self.assertEqual(response.status_code, expected_status)
+        self.assertLessEqual(
+            len(queries), max_queries,
+            f"{name}: {len(queries)} SQL-запитів при бюджеті {max_queries}\n"
+            + '\n'.join(query['sql'] for query in queries.captured_queries)
+        )
+        self.assertLessEqual(elapsed_ms, max_ms, f"{name}: {elapsed_ms} мс при бюджеті {max_ms} мс")
+        return response
+
+    def fill_cart(self):
+        session = self.client.session
+        session[settings.CART_SESSION_ID] = pack_cart({self.product.pk: 2})
+        session.save()
+
+    def test_home(self):
+        self.measure('home', lambda: self.client.get(reverse('core:home')))
+
+    def test_category(self):
+        url = reverse('products:category', kwargs={'slug': self.category.slug})
+        self.measure('category', lambda: self.client.get(url))
+
+    def test_category_filtered(self):
+        url = reverse('products:category', kwargs={'slug': self.category.slug})
+        params = {'price_min': '50', 'price_max': '500', 'availability': 'in_stock', 'sort': 'price_asc'}
+        self.measure('category_filtered', lambda: self.client.get(url, params))
+
+    def test_product_detail(self):
+        url = reverse('products:detail', kwargs={'slug': self.product.slug})
+        self.measure('product_detail', lambda: self.client.get(url))
+
+    def test_search(self):
+        self.measure('search', lambda: self.client.get(reverse('core:search'), {'q': self.search_term}))
+
+    def test_sale(self):
+        self.measure('sale', lambda: self.client.get(reverse('products:sale')))
+
+    def test_cart_add(self):
+        url = reverse('cart:add', kwargs={'product_id': self.product.pk})
+        self.measure('cart_add', lambda: self.client.post(
+            url, {'quantity': 1}, HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        ))
+
+    def test_cart_update(self):
+        self.fill_cart()
+        url = reverse('cart:add', kwargs={'product_id': self.product.pk})
+        self.measure('cart_update', lambda: self.client.post(
+            url, {'quantity': 5, 'override': 'true'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        ))
+
+    def test_order_create(self):
+        self.fill_cart()
+        self.measure('order_create', lambda: self.client.post(reverse('orders:create'), {
+            'first_name': 'Іван',
+            'last_name': 'Тестовий',
+            'email': 'budget@example.com',
+            'phone': '+380501234567',
+            'delivery_method': 'pickup',
+            'delivery_city': 'Київ',
+            'delivery_address': 'Самовивіз',
+            'payment_method': 'cash',
+        }), expected_status=302)
+
+    def test_liqpay_callback(self):
+        PendingPayment.objects.create(transaction_ref='temp_budget', order_data={
+            'first_name': 'Іван',
+            'last_name': 'Тестовий',
+            'email': 'budget@example.com',
+            'phone': '+380501234567',
+            'delivery_method': 'pickup',
+            'delivery_city': 'Київ',
+            'delivery_address': 'Самовивіз',
+            'payment_method': 'liqpay',
+            'total': '200.00',
+            'subtotal': '200.00',
+            'discount': '0.00',
+            'order_items': [{'product_id': self.product.pk, 'quantity': 2, 'price': '100.00'}],
+            'user_id': None,
+        })
+        data = base64.b64encode(json.dumps({
+            'order_id': 'temp_budget', 'status': 'success', 'transaction_id': '1'
+        }).encode('utf-8')).decode('utf-8')
+        key = settings.LIQPAY_PRIVATE_KEY
+        signature = base64.b64encode(hashlib.sha1((key + data + key).encode('utf-8')).digest()).decode('utf-8')
+
+        response = self.measure('liqpay_callback', lambda: self.client.post(
+            reverse('orders:liqpay_callback'), {'data': data, 'signature': signature}
+        ))
+        self.assertTrue(response.json()['success'])
@@ -0,0 +1,95 @@
+"""
+Тести стану краулера sitemap: 304 для звичайного sitemap і sitemap index
+"""
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from apps.products.crawl_state import CrawlState
+from apps.products.management.commands.import_products_sitemap import Command
+
+PLAIN_SITEMAP = """<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://beautyshop-ukrane.com.ua/p100-gel</loc></url>
+  <url><loc>https://beautyshop-ukrane.com.ua/p200-lak</loc></url>
+</urlset>"""
+
+INDEX_SITEMAP = """<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://beautyshop-ukrane.com.ua/sitemap-1.xml</loc></sitemap>
+</sitemapindex>"""
+
+
+def _response(status_code, text=''):
+    response = mock.Mock(status_code=status_code, text=text, headers={'ETag': '"v1"'})
+    response.raise_for_status = mock.Mock()
+    return response
+
+
+class SitemapCrawlStateTests(SimpleTestCase):
+    """Повторний запуск з 304 повертає ті самі URL товарів"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.state_path = os.path.join(directory.name, 'state.json')
+
+    def run_crawl(self, responses):
+        command = Command()
+        command.stdout = StringIO()
+        command.force = False
+        command.state = CrawlState.load(self.state_path)
+        command.session = mock.Mock()
+        command.session.get.side_effect = lambda url, **kwargs: responses[url]
+        urls = command.get_product_urls_from_sitemap()
+        command.state.save()
+        return urls
+
+    def test_plain_sitemap_not_modified_returns_cached_products(self):
+        root = 'https://beautyshop-ukrane.com.ua/sitemap.xml'
+        first = self.run_crawl({root: _response(200, PLAIN_SITEMAP)})
+        second = self.run_crawl({root: _response(304)})
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(second, first)
+
+    def test_sitemap_index_not_modified_reuses_children(self):
+        root = 'https://beautyshop-ukrane.com.ua/sitemap.xml'
+        child = 'https://beautyshop-ukrane.com.ua/sitemap-1.xml'
+        self.run_crawl({root: _response(200, INDEX_SITEMAP), child: _response(200, PLAIN_SITEMAP)})
+        urls = self.run_crawl({root: _response(304), child: _response(304)})
+
+        self.assertEqual(len(urls), 2)
+        state = CrawlState.load(self.state_path)
+        self.assertEqual(state.sitemap_index[root], [child])
+        self.assertNotIn(root, state.sitemaps)
+
+
+class SitemapImportJobTests(TestCase):
+    """Імпорт через чергу фонових завдань"""
+
+    def test_enqueue_runs_import_as_job(self):
+        from apps.core import jobs
+        from apps.core.models import Job
+
+        with mock.patch.object(Command, 'get_product_urls_from_sitemap') as crawl:
+            call_command('import_products_sitemap', '--enqueue', '--limit', '5', stdout=StringIO())
+            crawl.assert_not_called()
+
+            job = Job.objects.get(task='products.import_sitemap')
+            self.assertEqual(job.payload['limit'], 5)
+
+            crawl.return_value = []
+            with tempfile.TemporaryDirectory() as directory:
+                job.payload['state_file'] = os.path.join(directory, 'state.json')
+                job.save(update_fields=['payload'])
+                jobs.run_pending()
+            crawl.assert_called_once()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertIn('Не знайдено товарів', job.result)
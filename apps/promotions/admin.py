@@ -7,6 +7,7 @@ from django.utils import timezone
 from django import forms
 from .models import Promotion, PromoCode
 from apps.core.admin_utils import AdminMediaMixin
+from apps.core.jobs import PRIORITY_HIGH, enqueue
 
 
 class PromotionAdminForm(forms.ModelForm):
@@ -158,11 +159,11 @@ class PromotionAdmin(AdminMediaMixin, admin.ModelAdmin):
         if obj.is_active and is_in_period:
             # Акція активна і в межах періоду - застосовуємо
             if not change or (change and old_is_active is False):
-                # Новa акція або щойно активована - застосовуємо
-                count = obj.apply_to_products()
+                # Новa акція або щойно активована - застосовуємо у фоні
+                enqueue('promotions.apply', {'promotion_ids': [obj.pk]}, priority=PRIORITY_HIGH)
                 self.message_user(
                     request, 
-                    f'✅ Акцію "{obj.name}" збережено і автоматично застосовано до {count} товарів', 
+                    f'✅ Акцію "{obj.name}" збережено. Застосування до товарів виконується у фоні', 
                     messages.SUCCESS
                 )
             else:
@@ -172,11 +173,11 @@ class PromotionAdmin(AdminMediaMixin, admin.ModelAdmin):
                     messages.SUCCESS
                 )
         elif change and old_is_active is True and obj.is_active is False:
-            # Акція була деактивована - знімаємо з товарів
-            count = obj.remove_from_products()
+            # Акція була деактивована - знімаємо з товарів у фоні
+            enqueue('promotions.remove', {'promotion_ids': [obj.pk]}, priority=PRIORITY_HIGH)
             self.message_user(
                 request, 
-                f'✅ Акцію "{obj.name}" деактивовано і знято з {count} товарів', 
+                f'✅ Акцію "{obj.name}" деактивовано. Зняття з товарів виконується у фоні', 
                 messages.SUCCESS
             )
         else:
@@ -197,43 +198,27 @@ class PromotionAdmin(AdminMediaMixin, admin.ModelAdmin):
     actions = ['activate_promotions', 'deactivate_promotions', 'delete_promotions']
     
     def activate_promotions(self, request, queryset):
-        """Активувати акції та застосувати до товарів"""
-        total_promotions = 0
-        total_products = 0
-        
-        for promotion in queryset:
-            promotion.is_active = True
-            promotion.save()
-            total_promotions += 1
-            
-            count = promotion.apply_to_products()
-            total_products += count
+        """Активувати акції та застосувати до товарів (у фоні)"""
+        ids = list(queryset.values_list('pk', flat=True))
+        enqueue('promotions.apply', {'promotion_ids': ids, 'activate': True}, priority=PRIORITY_HIGH)
         
         from django.contrib import messages
         self.message_user(
             request, 
-            f'✅ Активовано {total_promotions} акцій та застосовано до {total_products} товарів', 
+            f'✅ Активацію {len(ids)} акцій поставлено в чергу - товари оновляться за кілька секунд', 
             messages.SUCCESS
         )
     activate_promotions.short_description = '✓ Активувати акції'
     
     def deactivate_promotions(self, request, queryset):
-        """Деактивувати акції та зняти з товарів"""
-        total_promotions = 0
-        total_products = 0
-        
-        for promotion in queryset:
-            count = promotion.remove_from_products()
-            total_products += count
-            
-            promotion.is_active = False
-            promotion.save()
-            total_promotions += 1
+        """Деактивувати акції та зняти з товарів (у фоні)"""
+        ids = list(queryset.values_list('pk', flat=True))
+        enqueue('promotions.remove', {'promotion_ids': ids, 'deactivate': True}, priority=PRIORITY_HIGH)
         
         from django.contrib import messages
         self.message_user(
             request, 
-            f'✅ Деактивовано {total_promotions} акцій, знято з {total_products} товарів', 
+            f'✅ Деактивацію {len(ids)} акцій поставлено в чергу - товари оновляться за кілька секунд', 
             messages.SUCCESS
         )
     deactivate_promotions.short_description = '✕ Деактивувати акції'
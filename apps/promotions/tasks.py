@@ -0,0 +1,30 @@
+"""
+Фонові завдання акцій: застосування та зняття знижок з товарів
+"""
+from apps.core.jobs import task
+
+from .models import Promotion
+
+
+@task('promotions.apply')
+def apply_promotions(promotion_ids, activate=False):
+    """Застосовує акції до товарів (activate - спершу позначити активними)"""
+    total = 0
+    for promotion in Promotion.objects.filter(pk__in=promotion_ids):
+        if activate and not promotion.is_active:
+            promotion.is_active = True
+            promotion.save()
+        total += promotion.apply_to_products()
+    return {'products': total}
+
+
+@task('promotions.remove')
+def remove_promotions(promotion_ids, deactivate=False):
+    """Знімає акції з товарів (deactivate - потім позначити неактивними)"""
+    total = 0
+    for promotion in Promotion.objects.filter(pk__in=promotion_ids):
+        total += promotion.remove_from_products()
+        if deactivate and promotion.is_active:
+            promotion.is_active = False
+            promotion.save()
+    return {'products': total}
@@ -3,11 +3,15 @@
 """
 from django.contrib import admin
 from django.contrib.auth.models import Group
-from django.db.models import Count, Max
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import F
+from django.db.models.functions import Coalesce
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 from .models import CustomUser, UserProfile, WholesaleClient
 from apps.core.admin_utils import AdminMediaMixin
+from apps.core.exports import ExportAdminMixin
+from .exports import WholesaleClientExport
 
 
 class UserProfileInline(admin.StackedInline):
@@ -19,9 +23,11 @@ class UserProfileInline(admin.StackedInline):
     fields = ['company_name', 'tax_number', 'address', 'notes']
 
 
-class WholesaleClientAdmin(AdminMediaMixin, admin.ModelAdmin):
+class WholesaleClientAdmin(ExportAdminMixin, AdminMediaMixin, admin.ModelAdmin):
     """Адмінка для оптових клієнтів - тільки перегляд"""
     
+    actions = ['export_to_csv', 'export_csv_background']
+    export_class = WholesaleClientExport
     list_display = ['get_full_name_display', 'email', 'get_phone_display', 'get_orders_count', 'get_total_amount', 'get_avg_order', 'get_last_order_date', 'get_last_login_display']
     list_filter = ['email_verified', 'is_active', 'created_at', 'last_login']
     search_fields = ['username', 'email', 'first_name', 'last_name', 'middle_name', 'phone']
@@ -46,15 +52,21 @@ class WholesaleClientAdmin(AdminMediaMixin, admin.ModelAdmin):
     ]
     
     def get_queryset(self, request):
-        """Показуємо тільки оптових клієнтів з анотаціями"""
-        from django.db.models import Sum
+        """Показуємо тільки оптових клієнтів; статистика - з CustomerStats одним JOIN"""
         qs = super().get_queryset(request)
-        return qs.filter(is_wholesale=True).annotate(
-            orders_count=Count('order'),
-            total_spent=Sum('order__total'),
-            last_order_date=Max('order__created_at')
+        return qs.filter(is_wholesale=True).select_related('order_stats').annotate(
+            orders_count=Coalesce(F('order_stats__orders_count'), 0),
+            total_spent=F('order_stats__total_spent'),
+            last_order_date=F('order_stats__last_order_at')
         )
     
+    def _get_stats(self, obj):
+        """Рядок CustomerStats (вже завантажений через select_related)"""
+        try:
+            return obj.order_stats
+        except ObjectDoesNotExist:
+            return None
+    
     def get_full_name_display(self, obj):
         """Повне ім'я для таблиці"""
         parts = []
@@ -148,19 +160,16 @@ class WholesaleClientAdmin(AdminMediaMixin, admin.ModelAdmin):
     
     def get_orders_stats(self, obj):
         """Детальна статистика замовлень"""
-        from apps.orders.models import Order
+        stats = self._get_stats(obj)
         
-        orders = Order.objects.filter(user=obj)
-        count = orders.count()
-        
-        if not count:
+        if not stats or not stats.orders_count:
             return format_html('<p style="color: #6c757d;">Клієнт ще не робив замовлень</p>')
         
-        total = sum(float(o.total) for o in orders)
-        avg = total / count if count else 0
-        
-        paid_count = orders.filter(is_paid=True).count()
-        completed_count = orders.filter(status='completed').count()
+        count = stats.orders_count
+        total = float(stats.total_spent)
+        avg = float(stats.avg_order)
+        paid_count = stats.paid_count
+        completed_count = stats.completed_count
         
         html = f'''
         <div style="background: #f8f9fa; padding: 15px; border-radius: 8px; border-left: 4px solid #007bff;">
@@ -188,7 +197,7 @@ class WholesaleClientAdmin(AdminMediaMixin, admin.ModelAdmin):
         """Останні 5 замовлень"""
         from apps.orders.models import Order
         
-        orders = Order.objects.filter(user=obj).order_by('-created_at')[:5]
+        orders = list(Order.objects.filter(user=obj).order_by('-created_at')[:5])
         
         if not orders:
             return format_html('<p style="color: #6c757d;">Немає замовлень</p>')
@@ -219,7 +228,8 @@ class WholesaleClientAdmin(AdminMediaMixin, admin.ModelAdmin):
         
         html += '</table></div>'
         
-        if orders.count() == 5:
+        stats = self._get_stats(obj)
+        if stats and stats.orders_count > 5:
             from django.urls import reverse
             url = reverse('admin:orders_order_changelist') + f'?user__id__exact={obj.id}'
             html += f'<p style="margin-top: 10px;"><a href="{url}" style="color: #007bff;">Переглянути всі замовлення →</a></p>'
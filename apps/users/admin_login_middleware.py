@@ -3,6 +3,8 @@ Middleware для діагностики проблем з входом в Djang
 """
 import logging
 
+from .login_throttle import get_client_ip
+
 logger = logging.getLogger('apps.users')
 
 
@@ -31,11 +33,6 @@ class AdminLoginDebugMiddleware:
         return response
     
     def get_client_ip(self, request):
-        """Отримує IP адресу клієнта (враховуючи проксі Render)"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0].strip()
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        """Отримує IP адресу клієнта (враховуючи проксі Render, див. TRUSTED_PROXY_COUNT)"""
+        return get_client_ip(request)
 
@@ -0,0 +1,35 @@
+"""
+"Покоління" авторизації користувача.
+
+Номер покоління зберігається в CustomUser.auth_generation (спільний для всіх
+процесів - web, run_jobs, shell), а в сесії - номер, актуальний на момент входу.
+Деактивація користувача збільшує покоління (див. signals.py), і
+ValidateUserMiddleware виконує logout, порівнявши номер із сесії з полем
+request.user - того самого об'єкта, який і так завантажує AuthenticationMiddleware,
+тож окремого запиту до БД немає.
+"""
+from django.db.models import F
+
+from .models import CustomUser
+
+SESSION_KEY = '_auth_generation'
+INITIAL_GENERATION = 0
+
+
+def bump_generation(user):
+    """Анулює всі сесії користувача: нове покоління не збігається зі збереженими"""
+    CustomUser.objects.filter(pk=user.pk).update(auth_generation=F('auth_generation') + 1)
+    # Оновлюємо і екземпляр, щоб наступний save() не повернув старе значення
+    user.auth_generation = (
+        CustomUser.objects.filter(pk=user.pk).values_list('auth_generation', flat=True).first()
+        or INITIAL_GENERATION
+    )
+
+
+def stamp_session(request, user):
+    """Записує в сесію покоління, актуальне на момент входу"""
+    request.session[SESSION_KEY] = user.auth_generation
+
+
+def is_session_current(session, user):
+    return session.get(SESSION_KEY, INITIAL_GENERATION) == user.auth_generation
@@ -1,12 +1,75 @@
 """
 Custom authentication backends для входу
 """
+import re
+
 from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.db.models.functions import Lower
+from .login_throttle import is_throttled
 from .models import CustomUser
 import logging
 
 logger = logging.getLogger('apps.users')
 
+# Пріоритет збігу, якщо один ідентифікатор підходить кільком користувачам
+LOOKUP_PRIORITY = ('username', 'email', 'phone')
+
+
+def normalize_phone(value):
+    """
+    Приводить український номер до E.164 (+380XXXXXXXXX).
+    Приймає +380..., 380..., 0XX... та 9 цифр без коду; інакше повертає None.
+    """
+    digits = re.sub(r'\D', '', value or '')
+    if len(digits) == 12 and digits.startswith('380'):
+        return f'+{digits}'
+    if len(digits) == 10 and digits.startswith('0'):
+        return f'+38{digits}'
+    if len(digits) == 9:
+        return f'+380{digits}'
+    return None
+
+
+def resolve_user(identifier, lookups=LOOKUP_PRIORITY):
+    """
+    Знаходить користувача за username / email / телефоном ОДНИМ запитом.
+    username та email порівнюються в нижньому регістрі (функціональні індекси
+    LOWER(username), LOWER(email)), телефон - у нормалізованому E.164.
+    """
+    value = (identifier or '').strip()
+    if not value:
+        return None
+    lowered = value.lower()
+
+    conditions = Q()
+    if 'username' in lookups:
+        conditions |= Q(username_lower=lowered)
+    if 'email' in lookups and '@' in value:
+        conditions |= Q(email_lower=lowered)
+    phone = normalize_phone(value) if 'phone' in lookups else None
+    if phone:
+        conditions |= Q(phone=phone)
+    if not conditions:
+        return None
+
+    candidates = list(
+        CustomUser.objects
+        .alias(username_lower=Lower('username'), email_lower=Lower('email'))
+        .filter(conditions)
+        .order_by('pk')[:3]
+    )
+
+    def rank(user):
+        if 'username' in lookups and user.username.lower() == lowered:
+            return 0
+        if 'email' in lookups and (user.email or '').lower() == lowered:
+            return 1
+        return 2
+
+    return min(candidates, key=rank) if candidates else None
+
 
 class WholesaleClientBackend(ModelBackend):
     """
@@ -15,33 +78,55 @@ class WholesaleClientBackend(ModelBackend):
     - ЗАБОРОНЯЄ вхід адміністраторам (is_staff=True або is_superuser=True)
     - Призначений виключно для звичайних оптових клієнтів
     - НЕ обробляє запити від Django Admin (пропускає для AdminOnlyBackend)
+
+    Причина відмови зберігається у failure_reason - сторінка входу будує
+    повідомлення з неї без повторного пошуку користувача.
     """
-    
+
+    FAILURE_THROTTLED = 'throttled'
+    FAILURE_NOT_FOUND = 'not_found'
+    FAILURE_STAFF = 'staff'
+    FAILURE_INACTIVE = 'inactive'
+    FAILURE_PASSWORD = 'password'
+
+    failure_reason = None
+
     def authenticate(self, request, username=None, password=None, **kwargs):
+        self.failure_reason = None
         if username is None or password is None:
             return None
-        
+
         # Пропускаємо запити від Django Admin - дозволяємо AdminOnlyBackend обробити їх
         if request and request.path.startswith('/admin/'):
             return None
-        
-        user = None
-        
-        # Шукаємо користувача ТІЛЬКИ за email
-        try:
-            user = CustomUser.objects.get(email=username)
-        except CustomUser.DoesNotExist:
+
+        # Забагато невдалих спроб - відмовляємо без запиту до БД
+        if is_throttled(username, request):
+            raise PermissionDenied
+
+        # Шукаємо користувача ТІЛЬКИ за email (без урахування регістру)
+        user = resolve_user(username, lookups=('email',))
+        if user is None:
+            # Хешуємо пароль, щоб час відповіді не видавав відсутність акаунта
+            CustomUser().set_password(password)
+            self.failure_reason = self.FAILURE_NOT_FOUND
             return None
-        
+
         # ВАЖЛИВО: Перевіряємо що це НЕ адміністратор
-        if user and (user.is_staff or user.is_superuser):
+        if user.is_staff or user.is_superuser:
             # Адміністратори НЕ можуть заходити в особистий кабінет
+            self.failure_reason = self.FAILURE_STAFF
             return None
-        
+
         # Перевіряємо пароль
-        if user and user.check_password(password) and self.user_can_authenticate(user):
+        password_valid = user.check_password(password)
+        if not self.user_can_authenticate(user):
+            self.failure_reason = self.FAILURE_INACTIVE
+            return None
+        if password_valid:
             return user
-        
+
+        self.failure_reason = self.FAILURE_PASSWORD
         return None
 
 
@@ -52,46 +137,33 @@ class AdminOnlyBackend(ModelBackend):
     - Працює ТІЛЬКИ для адміністраторів (is_staff=True)
     - Використовується лише для /admin/
     """
-    
+
     def authenticate(self, request, username=None, password=None, **kwargs):
         if username is None or password is None:
             return None
-        
-        user = None
-        
-        # Спробуємо знайти користувача за username (для адмінів)
-        try:
-            user = CustomUser.objects.get(username=username)
-        except CustomUser.DoesNotExist:
-            pass
-        
-        # Якщо не username, спробуємо email
-        if not user:
-            try:
-                user = CustomUser.objects.get(email=username)
-            except CustomUser.DoesNotExist:
-                pass
-        
-        # Якщо не email, спробуємо телефон
-        if not user:
-            try:
-                user = CustomUser.objects.get(phone=username)
-            except CustomUser.DoesNotExist:
-                # Логуємо тільки невдалі спроби входу (для безпеки)
-                logger.warning(f"Невдала спроба входу в адмінку з невідомим обліковим записом")
-                return None
-        
+
+        if is_throttled(username, request):
+            logger.warning("Вхід в адмінку тимчасово заблоковано: забагато невдалих спроб")
+            raise PermissionDenied
+
+        # username, email або телефон - одним запитом
+        user = resolve_user(username)
+        if user is None:
+            # Логуємо тільки невдалі спроби входу (для безпеки)
+            logger.warning("Невдала спроба входу в адмінку з невідомим обліковим записом")
+            CustomUser().set_password(password)
+            return None
+
         # ВАЖЛИВО: Перевіряємо що це адміністратор
         if not (user.is_staff or user.is_superuser):
-            logger.warning(f"Спроба входу в адмінку неадміністраторським обліковим записом")
+            logger.warning("Спроба входу в адмінку неадміністраторським обліковим записом")
             return None
-        
+
         # Перевіряємо пароль
         if user.check_password(password) and self.user_can_authenticate(user):
-            logger.info(f"Успішний вхід адміністратора в систему")
+            logger.info("Успішний вхід адміністратора в систему")
             return user
         else:
-            logger.warning(f"Невдала спроба входу адміністратора (невірний пароль)")
-        
-        return None
+            logger.warning("Невдала спроба входу адміністратора (невірний пароль)")
 
+        return None
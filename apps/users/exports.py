@@ -0,0 +1,41 @@
+"""
+CSV-експорт оптових клієнтів (див. apps.core.exports)
+"""
+from django.utils import timezone
+
+from apps.core.exports import CSVExport
+
+
+def _format_date(value):
+    return timezone.localtime(value).strftime('%d.%m.%Y %H:%M') if value else ''
+
+
+class WholesaleClientExport(CSVExport):
+    """Оптові клієнти зі статистикою замовлень (CustomerStats)"""
+
+    name = 'wholesale_clients'
+    header = [
+        'ПІБ', 'Email', 'Телефон', 'Компанія', 'Замовлень', 'Загальна сума',
+        'Останнє замовлення', 'Дата реєстрації', 'Останній вхід', 'Email підтверджено'
+    ]
+
+    def prepare(self, queryset):
+        return queryset.select_related('order_stats', 'profile')
+
+    def rows(self, clients):
+        for client in clients:
+            # RelatedObjectDoesNotExist - підклас AttributeError, тож getattr повертає None
+            stats = getattr(client, 'order_stats', None)
+            profile = getattr(client, 'profile', None)
+            yield [
+                ' '.join(filter(None, [client.last_name, client.first_name, client.middle_name])),
+                client.email,
+                client.phone or '',
+                profile.company_name if profile else '',
+                stats.orders_count if stats else 0,
+                stats.total_spent if stats else 0,
+                _format_date(stats.last_order_at if stats else None),
+                _format_date(client.date_joined),
+                _format_date(client.last_login),
+                'Так' if client.email_verified else 'Ні',
+            ]
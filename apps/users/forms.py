@@ -167,6 +167,39 @@ class CustomLoginForm(AuthenticationForm):
             'autocomplete': 'current-password'
         })
     )
+    
+    failure_reason = None
+    
+    def clean(self):
+        """
+        Аутентифікація ТІЛЬКИ через WholesaleClientBackend: один пошук користувача
+        на спробу (без AdminOnlyBackend/ModelBackend), причина відмови - у failure_reason
+        """
+        from django.core.exceptions import PermissionDenied
+        from .backends import WholesaleClientBackend
+        from .login_throttle import register_failure
+        
+        username = self.cleaned_data.get('username')
+        password = self.cleaned_data.get('password')
+        if username is None or not password:
+            return self.cleaned_data
+        
+        backend = WholesaleClientBackend()
+        try:
+            self.user_cache = backend.authenticate(self.request, username=username, password=password)
+        except PermissionDenied:
+            self.failure_reason = backend.FAILURE_THROTTLED
+            raise self.get_invalid_login_error()
+        
+        if self.user_cache is None:
+            # Backend викликається напряму, тож сигнал user_login_failed не надсилається
+            register_failure(username, self.request)
+            self.failure_reason = backend.failure_reason
+            raise self.get_invalid_login_error()
+        
+        self.user_cache.backend = 'apps.users.backends.WholesaleClientBackend'
+        self.confirm_login_allowed(self.user_cache)
+        return self.cleaned_data
 
 
 class CustomPasswordResetForm(PasswordResetForm):
@@ -0,0 +1,78 @@
+"""
+Обмеження невдалих спроб входу (лічильники в кеші)
+
+Рахуються у фіксованому вікні за парою (ідентифікатор, IP) і окремо за IP.
+Пара, а не сам ідентифікатор: інакше будь-хто міг би заблокувати адміністратора
+п'ятьма невдалими спробами з власної адреси.
+Поки ліміт перевищено, бекенди відмовляють одразу - без запиту до БД і без
+перевірки хешу пароля, тож credential stuffing не навантажує базу.
+
+IP клієнта береться з X-Forwarded-For лише на глибину TRUSTED_PROXY_COUNT
+(запис, доданий нашим проксі, рахуючи справа) - ліві записи задає сам клієнт.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+KEY_IDENTIFIER = 'login_fail:id:{}:{}'
+KEY_IP = 'login_fail:ip:{}'
+
+
+def _limits():
+    return (
+        getattr(settings, 'LOGIN_FAILURE_LIMIT', 5),
+        getattr(settings, 'LOGIN_IP_FAILURE_LIMIT', 30),
+        getattr(settings, 'LOGIN_FAILURE_WINDOW', 15 * 60),
+    )
+
+
+def get_client_ip(request):
+    if request is None:
+        return None
+    proxies = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if proxies and forwarded:
+        hops = [hop.strip() for hop in forwarded.split(',') if hop.strip()]
+        if len(hops) >= proxies:
+            return hops[-proxies]
+    return request.META.get('REMOTE_ADDR')
+
+
+def _identifier_key(identifier, ip):
+    return KEY_IDENTIFIER.format(identifier.strip().lower(), ip or '-')
+
+
+def _keys(identifier, request):
+    ip = get_client_ip(request)
+    keys = []
+    if identifier:
+        keys.append(_identifier_key(identifier, ip))
+    if ip:
+        keys.append(KEY_IP.format(ip))
+    return keys
+
+
+def is_throttled(identifier, request=None):
+    """Чи перевищено ліміт невдалих спроб для ідентифікатора з цієї IP або для самої IP"""
+    identifier_limit, ip_limit, _ = _limits()
+    ip = get_client_ip(request)
+    counts = cache.get_many(_keys(identifier, request))
+    if identifier and counts.get(_identifier_key(identifier, ip), 0) >= identifier_limit:
+        return True
+    return bool(ip) and counts.get(KEY_IP.format(ip), 0) >= ip_limit
+
+
+def register_failure(identifier, request=None):
+    _, _, window = _limits()
+    for key in _keys(identifier, request):
+        # add() задає вікно лише при першій невдачі, incr() його не подовжує
+        cache.add(key, 0, window)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, window)
+
+
+def reset_failures(identifier, request=None):
+    """Успішний вхід скидає лічильник ідентифікатора з цієї IP (IP-лічильник лишається)"""
+    if identifier:
+        cache.delete(_identifier_key(identifier, get_client_ip(request)))
@@ -1,9 +1,9 @@
 """
 Middleware для перевірки валідності користувача в сесії.
 """
-from django.contrib.auth import logout
+from django.contrib.auth import SESSION_KEY, logout
 from django.contrib.auth.models import AnonymousUser
-from apps.users.models import CustomUser
+from .auth_generation import is_session_current
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,34 +11,33 @@ logger = logging.getLogger(__name__)
 
 class ValidateUserMiddleware:
     """
-    Middleware для перевірки, чи існує користувач в базі даних.
-    Якщо користувач видалений, але сесія все ще активна - виконується logout.
+    Middleware для перевірки, чи користувач сесії досі валідний.
+    Якщо користувача видалено або деактивовано, але сесія все ще активна - виконується logout.
+    
+    Перевірка без окремого запиту до БД: покоління авторизації із сесії
+    порівнюється з полем request.user, який завантажує AuthenticationMiddleware
+    (див. apps.users.auth_generation). Видалений або неактивний користувач
+    приходить як AnonymousUser - його сесію теж завершуємо.
     """
     
     def __init__(self, get_response):
         self.get_response = get_response
     
     def __call__(self, request):
-        # Перевіряємо, чи користувач залогінений
-        if hasattr(request, 'user') and request.user.is_authenticated:
+        session = getattr(request, 'session', None)
+        # id із сесії - щоб не чіпати request.user для анонімних відвідувачів
+        user_id = session.get(SESSION_KEY) if session is not None else None
+        
+        if user_id is not None:
             try:
-                # Перевіряємо, чи користувач існує в БД
-                if request.user.pk:
-                    user = CustomUser.objects.get(pk=request.user.pk)
-                    # Перевіряємо чи активний
-                    if not user.is_active:
-                        logger.warning(f"User {user.email} is inactive, logging out")
-                        logout(request)
-                        request.user = AnonymousUser()
-            except CustomUser.DoesNotExist:
-                # Користувача не існує в БД - виходимо з системи
-                logger.warning(f"User with pk={request.user.pk} does not exist, logging out")
-                logout(request)
-                request.user = AnonymousUser()
+                user = request.user
+                if not user.is_authenticated or not is_session_current(session, user):
+                    logger.warning(f"User with pk={user_id} was deactivated or deleted, logging out")
+                    logout(request)
+                    request.user = AnonymousUser()
             except Exception as e:
-                # Інші помилки НЕ призводять до logout
+                # Інші помилки (наприклад, недоступна БД) НЕ призводять до logout
                 logger.error(f"Error in ValidateUserMiddleware: {e}")
         
         response = self.get_response(request)
         return response
-
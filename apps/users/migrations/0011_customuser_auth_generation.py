@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-19 19:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_login_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='auth_generation',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Покоління авторизації'),
+        ),
+    ]
@@ -3,6 +3,7 @@
 """
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils import timezone
 from django.core.validators import RegexValidator
 from decimal import Decimal
@@ -56,10 +57,27 @@ class CustomUser(AbstractUser):
         help_text='Встановлюється True після підтвердження email'
     )
     created_at = models.DateTimeField('Дата реєстрації', auto_now_add=True)
+    # Збільшується при деактивації - сесії зі старим значенням анулюються (apps.users.auth_generation)
+    auth_generation = models.PositiveIntegerField('Покоління авторизації', default=0, editable=False)
     
     class Meta:
         verbose_name = 'Користувач'
         verbose_name_plural = 'Користувачі'
+        indexes = [
+            # Вхід порівнює логін та email без урахування регістру (apps.users.backends.resolve_user)
+            models.Index(Lower('username'), name='users_username_lower_idx'),
+            models.Index(Lower('email'), name='users_email_lower_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Деактивацію (True -> False) відрізняємо від повторного збереження неактивного
+        instance._loaded_is_active = instance.__dict__.get('is_active')
+        # Щоб при збереженні скидати кеш аудиторії розсилок лише при зміні її полів
+        from apps.orders.recipients import user_audience_snapshot
+        instance._audience_snapshot = user_audience_snapshot(instance)
+        return instance
     
     def generate_email_verification_token(self):
         """Генерує токен для верифікації email (старий метод)"""
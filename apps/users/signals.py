@@ -0,0 +1,48 @@
+"""
+Сигнали користувачів: оновлення покоління авторизації, лічильники невдалих входів
+"""
+from django.contrib.auth.signals import user_logged_in, user_login_failed
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .auth_generation import bump_generation, stamp_session
+from .login_throttle import register_failure, reset_failures
+from .models import CustomUser
+
+
+@receiver(user_logged_in)
+def stamp_auth_generation(sender, request, user, **kwargs):
+    """При вході запам'ятовуємо покоління в сесії"""
+    if request is not None and hasattr(request, 'session'):
+        stamp_session(request, user)
+
+
+@receiver(user_logged_in)
+def reset_login_failures(sender, request, user, **kwargs):
+    """Успішний вхід скидає лічильник невдалих спроб"""
+    for identifier in {user.username, user.email}:
+        reset_failures(identifier, request)
+
+
+@receiver(user_login_failed)
+def count_login_failure(sender, credentials, request=None, **kwargs):
+    register_failure(credentials.get('username'), request)
+
+
+# Без sender: адмінка зберігає проксі-моделі (WholesaleClient, RetailClient)
+@receiver(post_save)
+def revoke_sessions_on_deactivate(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Деактивований користувач втрачає всі активні сесії. Покоління збільшується
+    лише при переході True -> False (порівняння зі значенням при завантаженні),
+    а не при кожному збереженні вже неактивного акаунта
+    """
+    if not isinstance(instance, CustomUser):
+        return
+    if update_fields is not None and 'is_active' not in update_fields:
+        return
+    was_active = getattr(instance, '_loaded_is_active', None)
+    instance._loaded_is_active = instance.is_active
+    # None - попереднє значення невідоме (екземпляр не з БД): деактивуємо про всяк випадок
+    if not created and not instance.is_active and was_active is not False:
+        bump_generation(instance)
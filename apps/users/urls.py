@@ -28,6 +28,7 @@ urlpatterns = [
     path('profile/', views.ProfileView.as_view(), name='profile'),
     path('profile/edit/', views.ProfileEditView.as_view(), name='profile_edit'),
     path('orders/', views.UserOrdersView.as_view(), name='orders'),
+    path('orders/history.json', views.UserOrdersJSONView.as_view(), name='orders_json'),
     
     # Відновлення паролю з кодом
     path('password/reset/', 
@@ -1,13 +1,15 @@
 """
 Утиліти для роботи з користувачами
+
+Листи не відправляються під час запиту: код і лист у черзі outbox
+пишуться в одній транзакції, відправляє apps.core.outbox.
 """
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-from django.conf import settings
+from django.db import transaction
 from django.urls import reverse
 import logging
 
+from apps.core.outbox import enqueue_template_email
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,33 +17,21 @@ def send_verification_code_email(user, request):
     """
     Надсилає лист з 6-значним кодом підтвердження email
     """
-    # Генеруємо код
-    code = user.generate_email_verification_code()
-    
-    # Контекст для шаблону
-    context = {
-        'user': user,
-        'code': code,
-    }
-    
-    # Рендеримо HTML версію
-    html_message = render_to_string('emails/email_verification_code.html', context)
-    plain_message = strip_tags(html_message)
-    
-    # Надсилаємо лист
     try:
-        send_mail(
-            subject='Підтвердження e-mail - BeautyShop',
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        logger.info(f"Verification code sent to {user.email}")
+        with transaction.atomic():
+            # Генеруємо код і ставимо лист у чергу атомарно
+            code = user.generate_email_verification_code()
+            enqueue_template_email(
+                user.email,
+                'Підтвердження e-mail - BeautyShop',
+                'emails/email_verification_code.html',
+                {'user': user, 'code': code},
+                kind='verification_code',
+            )
+        logger.info(f"Verification code queued for {user.email}")
         return True
     except Exception as e:
-        logger.error(f"Failed to send verification code to {user.email}: {str(e)}")
+        logger.error(f"Failed to queue verification code for {user.email}: {str(e)}")
         return False
 
 
@@ -58,33 +48,21 @@ def send_password_reset_code_email(user):
     """
     Надсилає лист з 6-значним кодом відновлення паролю
     """
-    # Генеруємо код
-    code = user.generate_password_reset_code()
-    
-    # Контекст для шаблону
-    context = {
-        'user': user,
-        'code': code,
-    }
-    
-    # Рендеримо HTML версію
-    html_message = render_to_string('emails/password_reset_code.html', context)
-    plain_message = strip_tags(html_message)
-    
-    # Надсилаємо лист
     try:
-        send_mail(
-            subject='Відновлення паролю - BeautyShop',
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=False,
-        )
-        logger.info(f"Password reset code sent to {user.email}")
+        with transaction.atomic():
+            # Генеруємо код і ставимо лист у чергу атомарно
+            code = user.generate_password_reset_code()
+            enqueue_template_email(
+                user.email,
+                'Відновлення паролю - BeautyShop',
+                'emails/password_reset_code.html',
+                {'user': user, 'code': code},
+                kind='password_reset_code',
+            )
+        logger.info(f"Password reset code queued for {user.email}")
         return True
     except Exception as e:
-        logger.error(f"Failed to send password reset code to {user.email}: {str(e)}")
+        logger.error(f"Failed to queue password reset code for {user.email}: {str(e)}")
         return False
 
 
@@ -101,29 +79,17 @@ def send_password_reset_email(user, request, token, uidb64):
         })
     )
     
-    # Контекст для шаблону
-    context = {
-        'user': user,
-        'reset_url': reset_url,
-    }
-    
-    # Рендеримо HTML версію
-    html_message = render_to_string('emails/password_reset.html', context)
-    plain_message = strip_tags(html_message)
-    
-    # Надсилаємо лист
     try:
-        send_mail(
-            subject='Відновлення паролю - BeautyShop',
-            message=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            html_message=html_message,
-            fail_silently=False,
+        enqueue_template_email(
+            user.email,
+            'Відновлення паролю - BeautyShop',
+            'emails/password_reset.html',
+            {'user': user, 'reset_url': reset_url},
+            kind='password_reset',
         )
-        logger.info(f"Password reset email sent to {user.email}")
+        logger.info(f"Password reset email queued for {user.email}")
         return True
     except Exception as e:
-        logger.error(f"Failed to send password reset email to {user.email}: {str(e)}")
+        logger.error(f"Failed to queue password reset email for {user.email}: {str(e)}")
         return False
 
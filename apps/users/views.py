@@ -7,8 +7,10 @@ from django.contrib.auth import login, authenticate
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import LoginView as DjangoLoginView, PasswordResetView
 from django.contrib import messages
+from django.db import transaction
 from django.urls import reverse_lazy
 from django.http import JsonResponse
+from .backends import WholesaleClientBackend
 from .models import CustomUser
 from .forms import (
     WholesaleRegistrationForm, CustomLoginForm, CustomPasswordResetForm, 
@@ -29,16 +31,17 @@ class WholesaleRegisterView(CreateView):
     
     def form_valid(self, form):
         try:
-            # Зберігаємо користувача (is_active=False)
-            user = form.save()
+            # Користувач (is_active=False) і лист з кодом у черзі - в одній транзакції
+            with transaction.atomic():
+                user = form.save()
+                queued = send_verification_code_email(user, self.request)
             logger.info(f"📝 New user registered: {user.email} (username: {user.username})")
             
             # Зберігаємо email в сесії для верифікації
             self.request.session['pending_verification_email'] = user.email
             
-            # Надсилаємо лист з кодом підтвердження
-            if send_verification_code_email(user, self.request):
-                logger.info(f"✅ Verification code sent successfully to: {user.email}")
+            if queued:
+                logger.info(f"✅ Verification code queued for: {user.email}")
             else:
                 logger.error(f"❌ Failed to send verification code to: {user.email}")
                 messages.warning(
@@ -193,14 +196,11 @@ class ProfileView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         user = self.request.user
         
-        # Отримуємо останні 3 замовлення для відображення в профілі
-        from apps.orders.models import Order
-        recent_orders = Order.objects.filter(user=user).order_by('-created_at')[:3]
-        
+        # Останні замовлення підвантажуються окремим JSON-запитом (users:orders_json)
         context.update({
             'user': user,
             'is_wholesale': user.is_wholesale,
-            'recent_orders': recent_orders,
+            'recent_orders_limit': 3,
         })
         return context
 
@@ -222,14 +222,45 @@ class UserOrdersView(LoginRequiredMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        from apps.orders.models import Order
+        from apps.orders.history import InvalidCursor, get_order_page
+        
+        try:
+            orders, next_cursor = get_order_page(self.request.user, cursor=self.request.GET.get('after'))
+        except InvalidCursor:
+            orders, next_cursor = get_order_page(self.request.user)
         
-        context['orders'] = Order.objects.filter(
-            user=self.request.user
-        ).order_by('-created_at')
+        context['orders'] = orders
+        context['next_cursor'] = next_cursor
+        context['is_first_page'] = not self.request.GET.get('after')
         return context
 
 
+class UserOrdersJSONView(LoginRequiredMixin, View):
+    """Історія замовлень у компактному JSON (для лінивого завантаження в профілі)"""
+    
+    def get(self, request, *args, **kwargs):
+        from apps.orders.history import DEFAULT_PAGE_SIZE, InvalidCursor, get_order_page, serialize_order
+        
+        if request.user.is_staff or request.user.is_superuser:
+            return JsonResponse({'error': 'forbidden'}, status=403)
+        
+        try:
+            limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+            orders, next_cursor = get_order_page(
+                request.user,
+                cursor=request.GET.get('after'),
+                limit=limit,
+                with_items=False,
+            )
+        except (InvalidCursor, ValueError):
+            return JsonResponse({'error': 'invalid cursor'}, status=400)
+        
+        return JsonResponse({
+            'orders': [serialize_order(order) for order in orders],
+            'next': next_cursor,
+        })
+
+
 class ProfileEditView(LoginRequiredMixin, UpdateView):
     """Редагування профілю користувача"""
     
@@ -266,61 +297,24 @@ class CustomLoginView(DjangoLoginView):
     authentication_form = CustomLoginForm
     template_name = 'users/login.html'
     
+    # Повідомлення за причиною відмови WholesaleClientBackend (CustomLoginForm.failure_reason)
+    FAILURE_MESSAGES = {
+        WholesaleClientBackend.FAILURE_THROTTLED: 'Забагато невдалих спроб входу. Спробуйте знову через кілька хвилин.',
+        WholesaleClientBackend.FAILURE_NOT_FOUND: 'Користувача з таким email не зареєстровано. Будь ласка, зареєструйтеся.',
+        WholesaleClientBackend.FAILURE_STAFF: '🔒 Доступ заборонено. Адміністратори можуть входити тільки через /admin/',
+        WholesaleClientBackend.FAILURE_INACTIVE: 'Ваш акаунт ще не активовано. Будь ласка, перевірте вашу пошту та підтвердіть email.',
+        WholesaleClientBackend.FAILURE_PASSWORD: 'Невірний пароль. Перевірте правильність введення паролю.',
+    }
+    
     def form_valid(self, form):
         """
-        БЕЗПЕКА: Використовуємо ТІЛЬКИ WholesaleClientBackend
-        Забороняємо вхід адміністраторам
+        БЕЗПЕКА: форма вже аутентифікувала ТІЛЬКИ через WholesaleClientBackend,
+        адміністраторам вхід заборонено
         """
-        username = form.cleaned_data.get('username')
-        password = form.cleaned_data.get('password')
-        
-        # Імпортуємо наш backend
-        from apps.users.backends import WholesaleClientBackend
-        
-        # Аутентифікуємо ТІЛЬКИ через WholesaleClientBackend
-        backend = WholesaleClientBackend()
-        user = backend.authenticate(self.request, username=username, password=password)
-        
-        if user is None:
-            # Перевіряємо чому не вдалося ввійти
-            try:
-                found_user = CustomUser.objects.filter(email=username).first()
-                
-                if not found_user:
-                    messages.error(
-                        self.request,
-                        'Користувача з таким email не зареєстровано. Будь ласка, зареєструйтеся.'
-                    )
-                elif found_user.is_staff or found_user.is_superuser:
-                    messages.error(
-                        self.request,
-                        '🔒 Доступ заборонено. Адміністратори можуть входити тільки через /admin/'
-                    )
-                elif not found_user.is_active:
-                    messages.error(
-                        self.request,
-                        'Ваш акаунт ще не активовано. Будь ласка, перевірте вашу пошту та підтвердіть email.'
-                    )
-                else:
-                    messages.error(
-                        self.request,
-                        'Невірний пароль. Перевірте правильність введення паролю.'
-                    )
-            except Exception:
-                messages.error(
-                    self.request,
-                    'Користувача не знайдено. Особистий кабінет доступний тільки зареєстрованим оптовим клієнтам.'
-                )
-            
-            return self.form_invalid(form)
-        
-        # Якщо аутентифікація успішна - логінимо користувача
-        login(self.request, user, backend='apps.users.backends.WholesaleClientBackend')
-        
         # Оновлюємо сесію для iOS Safari
+        response = super().form_valid(form)
         self.request.session.modified = True
-        
-        return super().form_valid(form)
+        return response
     
     def form_invalid(self, form):
         # Якщо форма невалідна (не заповнені поля)
@@ -328,6 +322,8 @@ class CustomLoginView(DjangoLoginView):
             messages.error(self.request, 'Будь ласка, введіть email.')
         elif not form.data.get('password'):
             messages.error(self.request, 'Будь ласка, введіть пароль.')
+        elif form.failure_reason:
+            messages.error(self.request, self.FAILURE_MESSAGES[form.failure_reason])
         
         return super().form_invalid(form)
 
@@ -2,6 +2,7 @@
 Список бажань (Wishlist) без реєстрації (session-based)
 """
 from django.conf import settings
+from apps.core.session_codec import pack_wishlist, unpack_wishlist
 from apps.products.models import Product
 
 
@@ -11,14 +12,13 @@ class Wishlist:
     def __init__(self, request):
         """Ініціалізація списку бажань"""
         self.session = request.session
-        wishlist = self.session.get(settings.WISHLIST_SESSION_ID)
-        if not wishlist:
-            wishlist = self.session[settings.WISHLIST_SESSION_ID] = []
-        self.wishlist = wishlist
+        # Порожній список не записуємо в сесію, щоб не створювати сесію для кожного відвідувача.
+        # У сесії - відсортований масив int id (старі str id конвертуються прозоро)
+        self.wishlist = unpack_wishlist(self.session.get(settings.WISHLIST_SESSION_ID))
     
     def add(self, product):
         """Додавання товару в список бажань"""
-        product_id = str(product.id)
+        product_id = product.id
         if product_id not in self.wishlist:
             self.wishlist.append(product_id)
             self.save()
@@ -27,7 +27,7 @@ class Wishlist:
     
     def remove(self, product):
         """Видалення товару зі списку бажань"""
-        product_id = str(product.id)
+        product_id = product.id
         if product_id in self.wishlist:
             self.wishlist.remove(product_id)
             self.save()
@@ -36,11 +36,16 @@ class Wishlist:
     
     def save(self):
         """Зберігання списку бажань в сесії"""
+        if self.wishlist:
+            self.wishlist = pack_wishlist(self.wishlist)
+            self.session[settings.WISHLIST_SESSION_ID] = self.wishlist
+        else:
+            self.session.pop(settings.WISHLIST_SESSION_ID, None)
         self.session.modified = True
     
     def clear(self):
         """Очищення списку бажань"""
-        del self.session[settings.WISHLIST_SESSION_ID]
+        self.wishlist = []
         self.save()
     
     def __iter__(self):
@@ -57,7 +62,7 @@ class Wishlist:
     
     def __contains__(self, product):
         """Перевірка чи товар є в списку бажань"""
-        return str(product.id) in self.wishlist
+        return product.id in self.wishlist
     
     def get_products(self):
         """Повертає всі товари зі списку бажань"""
@@ -52,10 +52,13 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'apps.core.middleware.MetricsMiddleware',
+    'apps.core.middleware.RequestInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.core.middleware.ProfilingMiddleware',
     'apps.users.middleware.ValidateUserMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -137,6 +140,13 @@ AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',  # Fallback (стандартний Django)
 ]
 
+# Обмеження невдалих спроб входу (apps.users.login_throttle)
+LOGIN_FAILURE_LIMIT = 5  # на один email/логін/телефон з однієї IP-адреси
+LOGIN_IP_FAILURE_LIMIT = 30  # з однієї IP-адреси
+LOGIN_FAILURE_WINDOW = 15 * 60  # секунд
+# Скільки проксі перед gunicorn дописують X-Forwarded-For (Render - 1); 0 - лише REMOTE_ADDR
+TRUSTED_PROXY_COUNT = config('TRUSTED_PROXY_COUNT', default=0, cast=int)
+
 # Login/Logout URLs
 LOGIN_URL = '/users/login/'
 LOGIN_REDIRECT_URL = '/users/profile/'
@@ -166,7 +176,9 @@ SESSION_COOKIE_SAMESITE = 'Lax'  # Захист від CSRF, сумісно з i
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False  # Сесія зберігається після закриття браузера
 SESSION_COOKIE_NAME = 'beautyshop_sessionid'  # Унікальна назва для запобігання конфліктів
 SESSION_COOKIE_PATH = '/'  # Доступна для всього сайту
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'  # Зберігаємо в БД
+SESSION_ENGINE = 'apps.core.session_backend'  # БД + write-through кеш, незмінні сесії не перезаписуються
+SESSION_REFRESH_INTERVAL = 60 * 60 * 24  # Термін дії в БД оновлюється не частіше ніж раз на добу
+SESSION_CACHE_ALIAS = 'sessions'  # Окремий спільний кеш (Redis) або DummyCache; LocMemCache заборонено перевіркою core.E003
 
 # Окремі налаштування для адмінки
 # Адмін сесія коротша для безпеки
@@ -178,6 +190,83 @@ CART_SESSION_ID = 'cart'
 # Wishlist settings
 WISHLIST_SESSION_ID = 'wishlist'
 
+# Конвеєр зображень: завдання products.process_image у черзі apps.core.jobs
+# (False - тільки через process_product_images)
+IMAGE_PIPELINE_ASYNC = True
+
+# Статистика над списком замовлень в адмінці кешується на цей час (секунд)
+ORDER_DASHBOARD_CACHE_TTL = 30
+
+# Фонові CSV-експорти адмінки (поза MEDIA_ROOT - містять персональні дані)
+EXPORTS_ROOT = BASE_DIR / 'exports'
+EXPORTS_RETENTION_DAYS = 7
+
+# Email-розсилки: розмір пакета на одне SMTP-з'єднання, потоки, повтори
+# та ліміти швидкості (листів/сек) на поштового провайдера отримувача (0 - без обмежень)
+CAMPAIGN_ASYNC = True
+CAMPAIGN_BATCH_SIZE = 100
+CAMPAIGN_WORKERS = 4
+CAMPAIGN_MAX_ATTEMPTS = 3
+CAMPAIGN_LEASE_TIMEOUT = 10 * 60  # секунд без активності, після яких --resume може забрати розсилку в 'sending'
+CAMPAIGN_RECIPIENTS_CACHE_TTL = 60 * 60  # кількість отримувачів; скидається сигналами при зміні аудиторії
+CAMPAIGN_RATE_LIMITS = {
+    'default': 10,
+    'ukr.net': 3,
+    'i.ua': 3,
+    'gmail.com': 20,
+}
+
+# Черга транзакційних листів (apps.core.outbox): пачка відправляється у фоні після коміту,
+# решту (повтори з експоненційною затримкою) дообробляє drain_email_outbox
+EMAIL_OUTBOX_ASYNC = True
+EMAIL_OUTBOX_BATCH_SIZE = 50
+EMAIL_OUTBOX_MAX_ATTEMPTS = 8
+EMAIL_OUTBOX_BACKOFF_BASE = 30  # секунд, подвоюється з кожною спробою
+EMAIL_OUTBOX_BACKOFF_MAX = 60 * 60
+EMAIL_OUTBOX_RETENTION_DAYS = 14
+
+# Черга фонових завдань (apps.core.jobs, обробник - run_jobs).
+# JOBS_RUN_IN_PROCESS: веб-процес сам виконує щойно поставлені завдання у фоновому потоці
+JOBS_RUN_IN_PROCESS = True
+JOBS_IN_PROCESS_BATCH = 5
+JOBS_MAX_ATTEMPTS = 3
+JOBS_BACKOFF_BASE = 60  # секунд, подвоюється з кожною спробою
+JOBS_STALE_AFTER = 30 * 60  # "running" довше - обробник вважається мертвим
+JOBS_RETENTION_DAYS = 7
+# Періодичні management-команди, які планує run_jobs: {команда: інтервал, секунд}
+JOBS_PERIODIC = {
+    'update_promotions': 15 * 60,
+    'send_scheduled_campaigns': 60,
+    'drain_email_outbox': 60,
+    'monitor_payments': 6 * 60 * 60,
+    'process_product_images': 60 * 60,  # зображення "В черзі", що не отримали завдання
+}
+
+# Інструментування запитів (apps.core.instrumentation): частка запитів, що вимірюються (0 - вимкнено)
+INSTRUMENTATION_SAMPLE_RATE = config('INSTRUMENTATION_SAMPLE_RATE', default=0.0, cast=float)
+INSTRUMENTATION_SLOW_MS = 800  # пороги для структурованого логу
+INSTRUMENTATION_MAX_QUERIES = 40
+INSTRUMENTATION_DUPLICATE_QUERIES = 5  # однаковий SQL стільки разів за запит - ймовірно N+1
+INSTRUMENTATION_WINDOW = 500  # вимірів на view для перцентилів
+
+# Метрики Prometheus (apps.core.metrics): /metrics для персоналу або з Authorization: Bearer METRICS_TOKEN
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Каталог для агрегації між воркерами gunicorn (порожньо - лише поточний процес)
+METRICS_MULTIPROCESS_DIR = config('METRICS_MULTIPROCESS_DIR', default='')
+METRICS_FLUSH_INTERVAL = 5  # секунд між записами знімка процесу
+METRICS_STALE_AFTER = 24 * 60 * 60  # знімки завершених процесів видаляються
+
+# Профілювання запитів (apps.core.profiling): без PROFILING_ENABLED middleware не підключається
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_SAMPLE_EVERY = config('PROFILING_SAMPLE_EVERY', default=0, cast=int)  # кожен N-й запит view, 0 - лише на вимогу
+PROFILING_SAMPLE_INTERVAL = 0.005  # період семплера стеків, секунд
+PROFILING_TOP_N = 40
+PROFILING_KEEP = 200  # скільки профілів зберігати
+
+# Нова Пошта: адресу API можна підмінити заглушкою (навантажувальні тести - load_test --np-stub)
+NOVA_POSHTA_API_URL = config('NOVA_POSHTA_API_URL', default='https://api.novaposhta.ua/v2.0/json/')
+
 # LiqPay налаштування (fallback на sandbox для розробки)
 LIQPAY_PUBLIC_KEY = os.getenv('LIQPAY_PUBLIC_KEY', 'sandbox_i69925457912')
 LIQPAY_PRIVATE_KEY = os.getenv('LIQPAY_PRIVATE_KEY', 'sandbox_d7fYUF83CUeVdBqHyEeYbjNM65B77RcjnWAIVkUm')
@@ -77,5 +77,8 @@ STORAGES = {
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
-    }
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
 }
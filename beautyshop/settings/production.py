@@ -91,6 +91,7 @@ MIDDLEWARE.append('apps.core.middleware.PrivatePagesCacheMiddleware')
 # Security settings для продакшну
 SECURE_SSL_REDIRECT = True
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', '1'))  # Проксі Render дописує IP клієнта в X-Forwarded-For
 SECURE_HSTS_SECONDS = 31536000
 SECURE_HSTS_INCLUDE_SUBDOMAINS = True
 SECURE_HSTS_PRELOAD = True
@@ -204,17 +205,32 @@ LOGGING = {
     },
 }
 
-# Кешування (обмежено для економії пам'яті)
+REDIS_URL = os.getenv('REDIS_URL', '')
+
+# Кешування (обмежено для економії пам'яті); MeteredLocMemCache - LocMemCache з метриками hit/miss
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'apps.core.cache.MeteredLocMemCache',
         'LOCATION': 'unique-snowflake',
         'OPTIONS': {
             'MAX_ENTRIES': 500,  # Обмежуємо кількість кешованих записів
         }
-    }
+    },
+    # Кеш сесій має бути спільним для всіх процесів (web, run_jobs) - інакше застарілі
+    # читання і втрачені зміни кошика. Без REDIS_URL сесії читаються з БД, а незмінні
+    # все одно не перезаписуються (apps.core.session_backend)
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
 }
 
+# Фонові завдання та періодичні команди виконує окремий worker (run_jobs у render.yaml);
+# True - лише для розгортання без worker (завдання виконує фоновий потік веб-процесу)
+JOBS_RUN_IN_PROCESS = os.getenv('JOBS_RUN_IN_PROCESS', 'False').lower() == 'true'
+
 # Оптимізація пам'яті для Django
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB замість 2.5MB за замовчуванням
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
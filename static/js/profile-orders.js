@@ -0,0 +1,62 @@
+/**
+ * Ліниве завантаження останніх замовлень в особистому кабінеті
+ */
+
+document.addEventListener('DOMContentLoaded', function() {
+    const container = document.getElementById('recentOrders');
+    if (!container) {
+        return;
+    }
+
+    fetch(container.dataset.url, {
+        credentials: 'same-origin',
+        headers: { 'Accept': 'application/json' }
+    })
+        .then(function(response) {
+            if (!response.ok) {
+                throw new Error('HTTP ' + response.status);
+            }
+            return response.json();
+        })
+        .then(function(data) {
+            renderOrders(container, data.orders || []);
+        })
+        .catch(function() {
+            container.innerHTML = '<p class="text-center text-muted">Не вдалося завантажити замовлення</p>';
+        });
+});
+
+function renderOrders(container, orders) {
+    if (!orders.length) {
+        container.innerHTML = '<p class="text-center text-muted">У вас поки немає замовлень</p>';
+        return;
+    }
+
+    container.innerHTML = '';
+    orders.forEach(function(order) {
+        const row = document.createElement('div');
+        row.className = 'order-row';
+
+        const info = document.createElement('div');
+        info.className = 'order-info';
+        const number = document.createElement('strong');
+        number.textContent = 'Замовлення #' + order.number;
+        const date = document.createElement('span');
+        date.className = 'order-date';
+        date.textContent = new Date(order.created_at).toLocaleDateString('uk-UA');
+        info.append(number, date);
+
+        const details = document.createElement('div');
+        details.className = 'order-details';
+        const status = document.createElement('span');
+        status.className = 'order-status status-' + order.status;
+        status.textContent = order.status_display;
+        const total = document.createElement('span');
+        total.className = 'order-total';
+        total.textContent = order.total + ' ₴';
+        details.append(status, total);
+
+        row.append(info, details);
+        container.appendChild(row);
+    });
+}